@@ -0,0 +1,107 @@
+"""Legacy per-row iloc/Decimal backtest vs. the vectorized float64 engine and its Decimal reconciliation.
+
+Usage: python benchmarks/bench_backtest.py [--bars 10000] [--repeat 3]
+"""
+import argparse
+import time
+from decimal import Decimal
+
+import pandas as pd
+
+from common import setup_django, synthetic_closes, trading_days
+
+setup_django()
+
+from services.backtesting_service import BacktestingService
+
+
+def legacy_backtest(data, initial_investment, long_window):
+    # The pre-vectorization loop from BacktestingService.run_backtest, kept as the reference.
+    investment = Decimal(initial_investment)
+    position = 0
+    cash = Decimal(investment)
+    shares_held = Decimal(0)
+    trade_count = 0
+    max_drawdown = Decimal(0)
+    peak_value = Decimal(investment)
+
+    for i in range(long_window, len(data)):
+        short_ma = Decimal(data.iloc[i]['short_ma'])
+        long_ma = Decimal(data.iloc[i]['long_ma'])
+
+        if position == 0 and short_ma < long_ma:
+            shares_held = cash / Decimal(data.iloc[i]['close_price'])
+            cash = Decimal(0)
+            position = 1
+            trade_count += 1
+        elif position == 1 and short_ma > long_ma:
+            cash = shares_held * Decimal(data.iloc[i]['close_price'])
+            shares_held = Decimal(0)
+            position = 0
+            trade_count += 1
+
+        current_value = cash + shares_held * Decimal(data.iloc[i]['close_price'])
+        if current_value > peak_value:
+            peak_value = current_value
+        drawdown = (peak_value - current_value) / peak_value
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+
+    final_value = cash + shares_held * Decimal(data.iloc[-1]['close_price'])
+    return {'final_value': final_value, 'max_drawdown': max_drawdown, 'trades_executed': trade_count}
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bars', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--short-window', type=int, default=50)
+    parser.add_argument('--long-window', type=int, default=200)
+    args = parser.parse_args()
+
+    data = pd.DataFrame(
+        {'close_price': synthetic_closes(args.bars, seed=42)},
+        index=trading_days(args.bars),
+    )
+    data = BacktestingService.calculate_moving_average(data, args.short_window, 'short_ma')
+    data = BacktestingService.calculate_moving_average(data, args.long_window, 'long_ma')
+    prices = data['close_price'].to_numpy()
+
+    def vectorized():
+        return BacktestingService.simulate_crossover(
+            prices.reshape(-1, 1),
+            data['short_ma'].to_numpy().reshape(-1, 1),
+            data['long_ma'].to_numpy().reshape(-1, 1),
+            args.long_window,
+            10000,
+        )
+
+    def exact():
+        result = vectorized()
+        return BacktestingService.reconcile_decimal(prices, result['positions'][:, 0], args.long_window, 10000)
+
+    legacy_time, legacy = best_of(1, lambda: legacy_backtest(data, 10000, args.long_window))
+    vector_time, vector = best_of(args.repeat, vectorized)
+    exact_time, reconciled = best_of(args.repeat, exact)
+
+    print(f"{args.bars} bars, windows {args.short_window}/{args.long_window}")
+    print(f"legacy loop     {legacy_time * 1000:10.2f} ms  final={float(legacy['final_value']):.6f} "
+          f"trades={legacy['trades_executed']}")
+    print(f"vectorized f64  {vector_time * 1000:10.2f} ms  final={vector['final_value'][0]:.6f} "
+          f"trades={vector['trades_executed'][0]}  speedup={legacy_time / vector_time:.0f}x")
+    print(f"exact Decimal   {exact_time * 1000:10.2f} ms  final={float(reconciled['final_value']):.6f} "
+          f"trades={reconciled['trades_executed']}  speedup={legacy_time / exact_time:.0f}x")
+    print(f"exact matches legacy: {reconciled == legacy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Stored size and get/set latency of report payloads in the cache backends.
+
+Caches a rendered chart (PNG), a PDF report and a 2500-day price series per symbol and reports,
+for each backend, the bytes held and the median latency of a set and a get. The PNG is
+incompressible and stays raw; the PDF and price series go through zlib above the threshold.
+
+Usage: python benchmarks/bench_cache.py [--symbols 50] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from common import setup_django, synthetic_closes
+
+setup_django()
+
+import numpy as np
+from django.core.cache.backends.locmem import LocMemCache
+from services.cache_backends import SQLiteCache
+from services.report_service import ReportService
+
+REPORT = {'symbol': 'BENCH', 'version': 1, 'total_return': 12.5, 'max_drawdown': 4.2, 'trades_executed': 7}
+
+
+def payloads():
+    start = date(2024, 1, 1)
+    closes = synthetic_closes(60).tolist()
+    chart = ReportService.generate_graph(
+        [start + timedelta(days=i) for i in range(30)], closes[:30],
+        [start + timedelta(days=30 + i) for i in range(30)], closes[30:],
+    )
+    pdf = ReportService.build_pdf_report(REPORT, chart)
+    dates = np.arange(730000, 732500, dtype=np.int32)
+    series = (dates, np.round(synthetic_closes(2500), 2))
+    return {'chart': chart, 'pdf': pdf, 'series': series}
+
+
+def stored_bytes(cache):
+    if isinstance(cache, LocMemCache):
+        return sum(len(value) for value in cache._cache.values())
+    return cache.stats()['bytes']
+
+
+def run(name, cache, items, symbols, repeat):
+    for kind, value in items.items():
+        sets, gets = [], []
+        for _ in range(repeat):
+            cache.clear()
+            start = time.perf_counter()
+            for i in range(symbols):
+                cache.set(f"{kind}_{i}", value, timeout=None)
+            sets.append((time.perf_counter() - start) / symbols)
+            start = time.perf_counter()
+            for i in range(symbols):
+                cache.get(f"{kind}_{i}")
+            gets.append((time.perf_counter() - start) / symbols)
+        print(
+            f"{name:10} {kind:8} {stored_bytes(cache) / symbols / 1024:10.1f} KiB/entry "
+            f"{statistics.median(sets) * 1e6:10.0f} us set {statistics.median(gets) * 1e6:8.0f} us get"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    items = payloads()
+    with tempfile.TemporaryDirectory() as directory:
+        backends = [
+            ('locmem', LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': 100_000}})),
+            ('sqlite', SQLiteCache(os.path.join(directory, 'cache.sqlite3'), {})),
+        ]
+        for name, cache in backends:
+            run(name, cache, items, args.symbols, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
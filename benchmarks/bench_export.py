@@ -0,0 +1,72 @@
+"""Peak memory and throughput of exporting many symbols' full history.
+
+Compares building one JSON document of every row in memory (what `fetch_data_view` does for a
+single symbol) with the streaming export in each format. The stream is consumed chunk by chunk
+and discarded, the way a WSGI server would write it to the socket.
+
+Usage: python benchmarks/bench_export.py [--rows 1000000] [--days 2500]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from bench_indexes import fill
+from services.export_service import EXPORT_FIELDS, ExportService
+from stocks_app.models import StockData
+
+
+def materialized(symbols):
+    rows = list(StockData.objects.filter(stock_symbol__in=symbols).order_by('stock_symbol', 'date').values(
+        'stock_symbol', 'date', *EXPORT_FIELDS
+    ))
+    return [json.dumps({'data': rows}, cls=DjangoJSONEncoder).encode()]
+
+
+def streamed(export_format):
+    def run(symbols):
+        for chunk in ExportService.stream(export_format, symbols, list(EXPORT_FIELDS)):
+            yield chunk if isinstance(chunk, bytes) else chunk.encode()
+    return run
+
+
+def measure(produce, symbols):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in produce(symbols))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=2500)
+    args = parser.parse_args()
+    count = max(1, args.rows // args.days)
+    symbols = [f"S{i:05d}" for i in range(count)]
+
+    with test_database():
+        fill(count, args.days)
+        print(f"backend: {connection.vendor}, {count * args.days:,} rows ({count} symbols x {args.days} days)")
+        runs = [
+            ('materialized JSON', materialized),
+            ('stream csv', streamed('csv')),
+            ('stream ndjson', streamed('ndjson')),
+            ('stream npy', streamed('npy')),
+        ]
+        for name, produce in runs:
+            elapsed, peak, size = measure(produce, symbols)
+            print(f"{name:18} {elapsed:8.2f} s {peak / 2 ** 20:10.1f} MiB peak {size / 2 ** 20:10.1f} MiB out")
+
+
+if __name__ == '__main__':
+    main()
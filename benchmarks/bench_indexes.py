@@ -0,0 +1,127 @@
+"""Per-symbol StockData lookups on a large synthetic table, with and without the (stock_symbol, date) index.
+
+Runs the querysets the services issue (latest-N tail, high-water mark, full series, date-range diff)
+and prints the planner's chosen plan and the median latency for each, first at migration 0001
+(no index) and then after applying 0002 (dedup step plus the unique constraint).
+
+Usage: python benchmarks/bench_indexes.py [--rows 10000000] [--days 2500] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+from datetime import date, timedelta
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from stocks_app.models import StockData
+
+START_DATE = date(2000, 1, 3)
+
+POSTGRES_FILL = """
+    INSERT INTO stocks_app_stockdata
+        (stock_symbol, date, open_price, close_price, high_price, low_price, volume, timestamp)
+    SELECT 'S' || lpad(s::text, 5, '0'), %s::date + d, p, p, p + 1, p - 1, 100000 + s, now()
+    FROM generate_series(0, %s - 1) AS d
+    CROSS JOIN generate_series(0, %s - 1) AS s
+    CROSS JOIN LATERAL (SELECT round((100 + (s * 7 + d) %% 50)::numeric, 2) AS p) AS price
+"""
+
+SQLITE_FILL = """
+    WITH RECURSIVE
+        d(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM d WHERE n + 1 < %s),
+        s(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM s WHERE n + 1 < %s)
+    INSERT INTO stocks_app_stockdata
+        (stock_symbol, date, open_price, close_price, high_price, low_price, volume, timestamp)
+    SELECT printf('S%%05d', s.n), date(%s, '+' || d.n || ' days'),
+           100 + (s.n * 7 + d.n) %% 50, 100 + (s.n * 7 + d.n) %% 50,
+           101 + (s.n * 7 + d.n) %% 50, 99 + (s.n * 7 + d.n) %% 50,
+           100000 + s.n, datetime('now')
+    FROM d CROSS JOIN s
+"""
+
+
+def fill(symbols, days):
+    # Day-major order, like daily incremental ingestion, so one symbol's rows are spread over the heap.
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRES_FILL, [START_DATE, days, symbols])
+        else:
+            cursor.execute(SQLITE_FILL, [days, symbols, START_DATE.isoformat()])
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE stocks_app_stockdata')
+
+
+def workload(symbol, days):
+    last_date = START_DATE + timedelta(days=days - 1)
+    return {
+        'tail 60 (predict)': StockData.objects.filter(stock_symbol=symbol).order_by('-date')[:60],
+        'high-water mark': StockData.objects.filter(stock_symbol=symbol).values('stock_symbol').annotate(
+            last_date=Max('date')
+        ),
+        'full series (backtest)': StockData.objects.filter(stock_symbol=symbol).order_by('date').values_list(
+            'date', 'close_price'
+        ),
+        'range diff (ingest)': StockData.objects.filter(
+            stock_symbol=symbol, date__gte=last_date - timedelta(days=100), date__lte=last_date
+        ),
+    }
+
+
+def plan_summary(queryset):
+    if connection.vendor == 'postgresql':
+        lines = queryset.explain(analyze=True).splitlines()
+        scans = [line.strip().lstrip('-> ').split('  ')[0] for line in lines if 'Scan' in line]
+        timing = next((line for line in lines if line.startswith('Execution Time')), '')
+        return f"{'; '.join(scans)} ({timing})"
+    return '; '.join(line.split(' ', 3)[-1] for line in queryset.explain().splitlines())
+
+
+def run(label, symbol, days, repeat):
+    print(f"\n{label}")
+    for name, queryset in workload(symbol, days).items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append(time.perf_counter() - start)
+        print(f"  {name:24} {statistics.median(timings) * 1000:10.2f} ms   {plan_summary(queryset)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    symbols = max(1, args.rows // args.days)
+
+    with test_database():
+        call_command('migrate', 'stocks_app', '0001', verbosity=0)
+
+        start = time.perf_counter()
+        fill(symbols, args.days)
+        analyze()
+        print(
+            f"backend: {connection.vendor}, {symbols * args.days:,} rows "
+            f"({symbols} symbols x {args.days} days), filled in {time.perf_counter() - start:.1f}s"
+        )
+        probe = f"S{symbols // 2:05d}"
+        run('without (stock_symbol, date) index', probe, args.days, args.repeat)
+
+        start = time.perf_counter()
+        call_command('migrate', 'stocks_app', verbosity=0)
+        analyze()
+        print(f"\napplied 0002_stock_symbol_date_unique in {time.perf_counter() - start:.1f}s")
+        run('with (stock_symbol, date) index', probe, args.days, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Per-symbol ingest time and query count: per-row update_or_create vs. bulk diff/upsert.
+
+Usage: python benchmarks/bench_ingest.py [--days 500] [--symbols 5]
+"""
+import argparse
+import time
+from unittest.mock import patch
+
+from common import setup_django, synthetic_time_series, test_database
+
+setup_django()
+
+from django.db import connection
+from services.financial_data_service import FinancialDataService
+from stocks_app.models import StockData
+
+
+def ingest(symbol, payload, bulk):
+    queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with patch('services.financial_data_service.requests.get') as mock_get:
+        mock_get.return_value.json.return_value = payload
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            FinancialDataService.fetch_stock_data(symbol, bulk=bulk)
+            elapsed = time.perf_counter() - start
+    return elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=500)
+    parser.add_argument('--symbols', type=int, default=5)
+    args = parser.parse_args()
+
+    with test_database():
+        for bulk in (False, True):
+            mode = 'bulk' if bulk else 'per-row'
+            for phase in ('initial', 'refresh'):
+                timings, query_counts = [], []
+                for n in range(args.symbols):
+                    payload = synthetic_time_series(args.days, seed=n)
+                    if phase == 'initial':
+                        # Hold back the latest day so the refresh run has one new row to add.
+                        latest = next(iter(payload['Time Series (Daily)']))
+                        del payload['Time Series (Daily)'][latest]
+                    elapsed, count = ingest(f"SYM{n}", payload, bulk)
+                    timings.append(elapsed)
+                    query_counts.append(count)
+                print(
+                    f"{mode:8} {phase:8} {sum(timings) / len(timings) * 1000:9.1f} ms/symbol "
+                    f"{sum(query_counts) / len(query_counts):8.0f} queries/symbol"
+                )
+            StockData.objects.all().delete()
+
+
+if __name__ == '__main__':
+    main()
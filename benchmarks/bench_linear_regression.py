@@ -0,0 +1,49 @@
+"""LinearRegression fit time and accuracy per solver on a synthetic day-index -> price series.
+
+The legacy 1000-iteration gradient descent is run on the raw day indices the training script uses;
+SGD runs on the same feature scaled to [0, 1], since a fixed learning rate cannot handle raw indices.
+
+Usage: python benchmarks/bench_linear_regression.py [--rows 1000000]
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+from ml.linear_regression import LinearRegression
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        X = np.arange(rows, dtype=np.float64).reshape(-1, 1)
+        Y = 0.05 * X[:, 0] + 100 + rng.normal(0, 1, rows)
+        scale = max(rows - 1, 1)
+        runs = [
+            ('gd (legacy)', LinearRegression(learning_rate=0.0001, iterations=1000), X, 1),
+            ('lstsq', LinearRegression(solver='lstsq'), X, 1),
+            ('sgd x3 epochs', LinearRegression(learning_rate=0.1, iterations=3, solver='sgd', batch_size=4096,
+                                               random_state=0), X / scale, scale),
+        ]
+        print(f"\n{rows:,} rows (true slope 0.05, intercept 100)")
+        for name, model, features, feature_scale in runs:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                start = time.perf_counter()
+                model.fit(features, Y)
+                elapsed = time.perf_counter() - start
+                mse = model.mean_squared_error(Y, model.predict(features))
+            print(
+                f"  {name:14} {elapsed * 1000:10.1f} ms   slope {model.W[0] / feature_scale:12.6g}   "
+                f"intercept {model.b:12.6g}   mse {mse:.4g}"
+            )
+
+
+if __name__ == '__main__':
+    main()
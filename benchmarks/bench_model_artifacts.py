@@ -0,0 +1,78 @@
+"""Model artifact size and load time: legacy joblib pickle vs. the .npy coefficient artifact.
+
+Also maps many per-symbol artifacts into one process and reports the resident memory they add.
+
+Usage: python benchmarks/bench_model_artifacts.py [--models 5000]
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+import common  # noqa: F401  (puts the repository root on sys.path)
+from ml.linear_regression import LinearRegression
+
+
+def legacy_model():
+    # What LinearRegression.fit used to keep on the instance: the training data and a loss list.
+    X = np.arange(300, dtype=np.float64).reshape(-1, 1)
+    Y = 100 + 0.5 * X[:, 0]
+    model = LinearRegression(solver='lstsq').fit(X, Y)
+    model.X, model.Y, model.loss = X, Y, [0.0] * 1000
+    return model
+
+
+def time_loads(loader, path, repeat=2000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        loader(path)
+    return (time.perf_counter() - start) / repeat
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', type=int, default=5000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        model = legacy_model()
+        pickle_path = os.path.join(tmpdir, 'model.pkl')
+        joblib.dump(model, pickle_path)
+        npy_path = model.save(os.path.join(tmpdir, 'model.npy'))
+
+        print(f"{'format':18} {'bytes':>8} {'load':>10}")
+        print(f"{'joblib pickle':18} {os.path.getsize(pickle_path):8} {time_loads(joblib.load, pickle_path) * 1e6:8.1f} us")
+        print(f"{'.npy (mmap)':18} {os.path.getsize(npy_path):8} "
+              f"{time_loads(LinearRegression.load, npy_path) * 1e6:8.1f} us")
+
+        paths = []
+        for i in range(args.models):
+            model.W, model.b = np.array([0.5 + i * 1e-4]), 100.0 + i
+            paths.append(model.save(os.path.join(tmpdir, f"S{i:05}.npy")))
+
+        X = np.array([[301.0]])
+        rss = max_rss_mb()
+        start = time.perf_counter()
+        models = [LinearRegression.load(path) for path in paths]
+        predictions = [m.predict(X)[0] for m in models]
+        elapsed = time.perf_counter() - start
+        print(
+            f"\nmapped {len(models)} models and predicted with each in {elapsed * 1000:.1f} ms "
+            f"(+{max_rss_mb() - rss:.1f} MB max RSS), last prediction {predictions[-1]:.2f}"
+        )
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
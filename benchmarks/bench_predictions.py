@@ -0,0 +1,63 @@
+"""Prediction persistence for 30/365/3650-day horizons: per-day update_or_create vs. set-based upsert.
+
+Usage: python benchmarks/bench_predictions.py [--horizons 30 365 3650]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from common import setup_django, test_database
+
+setup_django()
+
+from django.db import connection
+from services.prediction_service import PredictionService
+from stocks_app.models import PredictionData
+
+
+def legacy_store_predictions(symbol, last_date, predicted_prices):
+    # The pre-bulk store_predictions loop, kept as the reference.
+    for i, predicted_price in enumerate(predicted_prices):
+        PredictionData.objects.update_or_create(
+            stock_symbol=symbol,
+            date=last_date + timedelta(days=i + 1),
+            defaults={'predicted_price': predicted_price}
+        )
+
+
+def measure(func, *args):
+    queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_queries):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+    return elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--horizons', type=int, nargs='+', default=[30, 365, 3650])
+    args = parser.parse_args()
+
+    last_date = date(2024, 1, 1)
+    rng = np.random.default_rng(0)
+    with test_database():
+        print(f"backend: {connection.vendor}")
+        for horizon in args.horizons:
+            for name, store in (('per-row', legacy_store_predictions), ('bulk', PredictionService.store_predictions)):
+                for phase in ('insert', 'update'):
+                    prices = np.round(rng.uniform(100, 200, horizon), 2)
+                    elapsed, queries = measure(store, 'BENCH', last_date, prices)
+                    print(f"horizon {horizon:5}  {name:8} {phase:6} {elapsed * 1000:10.1f} ms {queries:7} queries")
+                PredictionData.objects.all().delete()
+
+
+if __name__ == '__main__':
+    main()
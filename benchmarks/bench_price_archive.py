@@ -0,0 +1,81 @@
+"""Time to load many symbols' full close series from the table vs. the memory-mapped price archive.
+
+Fills a throwaway database with synthetic daily rows, builds the archive in a temporary PRICE_ARCHIVE_DIR,
+then loads every symbol's series the way PriceSeriesRepository does on a miss: one query per batch of
+symbols, or one current.json read and two np.load(mmap_mode='r') calls per symbol. Table loads are
+timed both with the Decimal and date objects the ORM returns by default and with PriceLoader's
+integer cents and ordinals. Every close is summed, so the archive's mapped pages are actually read.
+
+Usage: python benchmarks/bench_price_archive.py [--symbols 200] [--days 2500] [--batch 50]
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from common import setup_django, test_database
+
+setup_django()
+
+from django.conf import settings
+from django.db import connection
+from bench_indexes import fill
+from services.price_archive import PriceArchive
+from services.price_series_repository import PriceSeries, PriceSeriesRepository
+from stocks_app.models import StockData
+
+
+def decimal_load(symbols):
+    # The loader PriceSeriesRepository used before PriceLoader: Decimal and date objects per row.
+    rows = StockData.objects.filter(stock_symbol__in=symbols).order_by('stock_symbol', 'date', 'id').values_list(
+        'stock_symbol', 'date', 'close_price'
+    )
+    grouped = {}
+    for symbol, day, close in rows.iterator(chunk_size=5000):
+        dates, closes = grouped.setdefault(symbol, ([], []))
+        dates.append(day.toordinal())
+        closes.append(close)
+    return {symbol: PriceSeries(symbol, dates, np.array(closes, dtype=np.float64))
+            for symbol, (dates, closes) in grouped.items()}
+
+
+def timed(load, symbols, batch):
+    start = time.perf_counter()
+    total = 0.0
+    rows = 0
+    for i in range(0, len(symbols), batch):
+        for series in load(symbols[i:i + batch]).values():
+            total += float(series.close.sum())
+            rows += len(series)
+    return time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+    symbols = [f"S{i:05d}" for i in range(args.symbols)]
+
+    with tempfile.TemporaryDirectory() as archive_dir, test_database():
+        settings.PRICE_ARCHIVE_DIR = archive_dir
+        fill(args.symbols, args.days)
+        print(f"backend: {connection.vendor}, {args.symbols * args.days:,} rows "
+              f"({args.symbols} symbols x {args.days} days), batches of {args.batch}")
+
+        start = time.perf_counter()
+        PriceArchive.rebuild_many(symbols)
+        print(f"{'build archive':16} {time.perf_counter() - start:8.3f} s")
+
+        for name, load in (
+            ('table (Decimal)', decimal_load),
+            ('table (cents)', PriceSeriesRepository.load_many),
+            ('archive (mmap)', PriceSeriesRepository.load_archived),
+        ):
+            elapsed, rows = timed(load, symbols, args.batch)
+            print(f"{name:16} {elapsed:8.3f} s {rows / elapsed:14,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Render time and memory for one JSON + one PDF report of the same symbol.
+
+Compares the legacy path (each format renders its own pyplot chart and the PDF base64-decodes the
+chart it had just encoded) with the shared-chart path (one Figure render cached as PNG bytes, base64
+only for the JSON response). Data fetching, backtest and prediction are excluded; only the rendering
+and serialization that differ are measured.
+
+Usage: python benchmarks/bench_reports.py [--repeat 10]
+"""
+import argparse
+import base64
+import io
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from common import setup_django, synthetic_closes
+
+setup_django()
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from django.core.cache import cache
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from services.report_service import ReportService
+
+REPORT = {'symbol': 'BENCH', 'total_return': 12.5, 'max_drawdown': 4.2, 'trades_executed': 7}
+
+
+def legacy_graph(actual_dates, actual_prices, predicted_dates, predicted_prices):
+    # The pre-change ReportService.generate_graph, kept as the reference.
+    fig, ax1 = plt.subplots(figsize=(10, 5))
+    ax1.plot(actual_dates, actual_prices, label='Actual Prices', color='blue', marker='o')
+    ax1.set_xlabel('Date')
+    ax1.set_ylabel('Actual Prices', color='blue')
+    ax1.tick_params(axis='y', labelcolor='blue')
+    ax2 = ax1.twinx()
+    ax2.plot(predicted_dates, predicted_prices, label='Predicted Prices', color='red', linestyle='--', marker='x')
+    ax2.set_ylabel('Predicted Prices', color='red')
+    ax2.tick_params(axis='y', labelcolor='red')
+    plt.title('Actual vs Predicted Stock Prices')
+    plt.xticks(rotation=45)
+    plt.grid(True)
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png')
+    buffer.seek(0)
+    graph_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    plt.close()
+    buffer.close()
+    return graph_base64
+
+
+def legacy_pdf(graph_base64):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    pdf.drawString(100, 750, f"Stock Report for {REPORT['symbol']}")
+    image = ImageReader(io.BytesIO(base64.b64decode(graph_base64)))
+    pdf.drawImage(image, 100, 400, width=400, height=200)
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def legacy_reports(data):
+    json_report = {**REPORT, 'graph': legacy_graph(*data)}
+    pdf_report = legacy_pdf(legacy_graph(*data))
+    return json_report, pdf_report
+
+
+def shared_reports(data):
+    chart_key = ReportService.get_chart('BENCH', 1, *data)
+    chart = cache.get(chart_key)
+    json_report = {**REPORT, 'graph': base64.b64encode(chart).decode('ascii')}
+    pdf_report = ReportService.build_pdf_report(REPORT, chart)
+    return json_report, pdf_report
+
+
+def measure(func, data, repeat, before=None):
+    timings = []
+    peaks = []
+    for _ in range(repeat):
+        if before:
+            before()
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(timings), statistics.median(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    start = date(2024, 1, 1)
+    closes = synthetic_closes(60).tolist()
+    data = (
+        [start + timedelta(days=i) for i in range(30)], closes[:30],
+        [start + timedelta(days=30 + i) for i in range(30)], closes[30:],
+    )
+
+    legacy_reports(data)  # warm up matplotlib's font cache
+    runs = [
+        ('legacy: 2 renders + b64 round trip', legacy_reports, None),
+        ('shared chart, cold cache', shared_reports, cache.clear),
+        ('shared chart, chart cached', shared_reports, None),
+    ]
+    print(f"{'json + pdf for one symbol':36} {'time':>10} {'peak alloc':>12}")
+    for name, func, before in runs:
+        elapsed, peak = measure(func, data, args.repeat, before)
+        print(f"{name:36} {elapsed * 1000:8.1f} ms {peak / 1024:9.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""End-to-end timings of the ingest, backtest, prediction and report hot paths, with baseline comparison.
+
+Loads N seeded synthetic symbols x M years of daily OHLCV through a stubbed Alpha Vantage (requests.get
+returns the pre-serialized payload, so JSON parsing is still measured) into a throwaway test database,
+then times, per symbol:
+
+  fetch_full          FinancialDataService.fetch_stock_data into an empty table
+  fetch_incremental   the same call when every row is already stored
+  backtest_cold       BacktestingService.run_backtest with the in-process caches cleared (indicators from the table)
+  backtest_warm       run_backtest again, series cached
+  predict             PredictionService.predict_stock_prices (combined model)
+  report_json         ReportService.generate_json_report with every cache cleared: backtest, chart render
+  report_pdf          ReportService.generate_pdf_report with every cache cleared, plus the PDF build
+  report_json_cached  generate_json_report served from the report cache
+
+Prices and volumes depend only on --seed; dates end at today, so incremental fetches stay no-ops.
+After one untimed pass, each case records the median, min and max of --repeat x --symbols samples,
+and the database queries of one timed call. Query counts are machine independent and are compared
+exactly. Times are compared by their minimum, the least noisy statistic on a shared machine, within
+--tolerance and ignoring differences under --min-delta-ms.
+
+Usage:
+  python benchmarks/bench_suite.py --output results.json
+  python benchmarks/bench_suite.py --baseline results.json [--tolerance 0.25] [--min-delta-ms 1]
+Runs against the configured database (SQLite or PostgreSQL). Exits with 1 when a case regressed.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from common import setup_django, synthetic_time_series, test_database
+
+setup_django()
+
+import django
+import numpy as np
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from services.backtesting_service import BacktestingService
+from services.financial_data_service import FinancialDataService
+from services.indicator_store import IndicatorStore
+from services.prediction_service import PredictionService
+from services.price_series_repository import PriceSeriesRepository
+from services.report_service import ReportService
+from stocks_app.models import PredictionData, StockData
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class StubResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class StubAlphaVantage:
+    """Stands in for requests.get against Alpha Vantage, answering from pre-serialized payloads."""
+
+    def __init__(self, payloads):
+        self.bodies = {symbol: json.dumps(payload) for symbol, payload in payloads.items()}
+        self.calls = 0
+
+    def get(self, url, params=None, **kwargs):
+        self.calls += 1
+        return StubResponse(self.bodies[params['symbol']])
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def clear_caches():
+    PriceSeriesRepository.clear()
+    IndicatorStore.clear()
+    cache.clear()
+
+
+def reset_stock_data(symbol):
+    StockData.objects.filter(stock_symbol=symbol).delete()
+    PredictionData.objects.filter(stock_symbol=symbol).delete()
+    clear_caches()
+
+
+# name -> (prepare, run); prepare is untimed and runs before every sample.
+CASES = {
+    'fetch_full': (reset_stock_data, lambda symbol: FinancialDataService.fetch_stock_data(symbol)),
+    'fetch_incremental': (None, lambda symbol: FinancialDataService.fetch_stock_data(symbol)),
+    'backtest_cold': (lambda symbol: clear_caches(), lambda symbol: BacktestingService.run_backtest(symbol, 10000)),
+    'backtest_warm': (None, lambda symbol: BacktestingService.run_backtest(symbol, 10000)),
+    'predict': (None, lambda symbol: PredictionService.predict_stock_prices(symbol)),
+    'report_json': (lambda symbol: clear_caches(), lambda symbol: ReportService.generate_json_report(symbol)),
+    'report_pdf': (lambda symbol: clear_caches(), lambda symbol: ReportService.generate_pdf_report(symbol)),
+    'report_json_cached': (None, lambda symbol: ReportService.generate_json_report(symbol)),
+}
+
+
+def run_once(name, symbol):
+    prepare, run = CASES[name]
+    if prepare:
+        prepare(symbol)
+    counter = QueryCounter()
+    # The services print progress; keep it out of the results.
+    with contextlib.redirect_stdout(io.StringIO()), connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        result = run(symbol)
+        elapsed = time.perf_counter() - start
+    if result is None or isinstance(result, str) or (isinstance(result, dict) and 'error' in result):
+        raise RuntimeError(f"{name} failed for {symbol}: {result!r}")
+    return elapsed, counter.count
+
+
+def run_case(name, symbols, repeat):
+    # One untimed pass first, so warm cases are measured warm.
+    for symbol in symbols:
+        run_once(name, symbol)
+    runs = [run_once(name, symbol) for _ in range(repeat) for symbol in symbols]
+    samples = [elapsed for elapsed, _ in runs]
+    return {
+        'median_s': statistics.median(samples),
+        'min_s': min(samples),
+        'max_s': max(samples),
+        'samples': len(samples),
+        'queries': runs[0][1],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Print each case against the baseline; return the names of the cases that regressed."""
+    regressions = []
+    print(f"\n{'case':20} {'baseline':>10} {'current':>10} {'ratio':>7} {'queries':>11}  (min times)")
+    for name, current in results['cases'].items():
+        previous = baseline['cases'].get(name)
+        if previous is None:
+            print(f"{name:20} {'-':>10} {current['min_s'] * 1000:8.2f}ms {'new':>7}")
+            continue
+        ratio = current['min_s'] / previous['min_s'] if previous['min_s'] else float('inf')
+        slower = ratio > 1 + tolerance and current['min_s'] - previous['min_s'] > min_delta
+        more_queries = current['queries'] > previous['queries']
+        flag = '  REGRESSED' if slower or more_queries else ''
+        print(
+            f"{name:20} {previous['min_s'] * 1000:8.2f}ms {current['min_s'] * 1000:8.2f}ms {ratio:7.2f} "
+            f"{previous['queries']:>5}->{current['queries']:<5}{flag}"
+        )
+        if flag:
+            regressions.append(name)
+    for key in ('backend', 'symbols', 'years', 'seed'):
+        if baseline['meta'].get(key) != results['meta'][key]:
+            print(f"note: baseline {key} is {baseline['meta'].get(key)!r}, this run {results['meta'][key]!r}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=3)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated subset, run in the listed order')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results previously written with --output')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    cases = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases {unknown}, expected some of: {', '.join(CASES)}")
+
+    symbols = [f"BENCH{i}" for i in range(args.symbols)]
+    days = args.years * TRADING_DAYS_PER_YEAR
+    stub = StubAlphaVantage({
+        symbol: synthetic_time_series(days, seed=args.seed + i) for i, symbol in enumerate(symbols)
+    })
+
+    results = {
+        'meta': {
+            'backend': connection.vendor,
+            'symbols': args.symbols,
+            'years': args.years,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'commit': git_commit(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'cases': {},
+    }
+
+    with tempfile.TemporaryDirectory() as model_dir, test_database(), patch.object(requests, 'get', stub.get):
+        # Only the combined model, so no per-symbol artifacts from a local MODEL_DIR change the prediction path.
+        for filename in os.listdir(settings.MODEL_DIR):
+            if filename.startswith('combined_stock_price_model'):
+                shutil.copy(os.path.join(settings.MODEL_DIR, filename), model_dir)
+        settings.MODEL_DIR = model_dir
+
+        print(f"backend: {connection.vendor}, {args.symbols} symbols x {days} days, seed {args.seed}, repeat {args.repeat}")
+        if 'fetch_full' not in cases:
+            for symbol in symbols:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    FinancialDataService.fetch_stock_data(symbol)
+        for name in cases:
+            result = results['cases'][name] = run_case(name, symbols, args.repeat)
+            print(
+                f"{name:20} {result['median_s'] * 1000:10.2f} ms median {result['min_s'] * 1000:10.2f} ms min "
+                f"{result['queries']:6} queries"
+            )
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance, args.min_delta_ms / 1000)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def setup_django():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trial_task.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Run the block against a throwaway test database so benchmarks never touch real data."""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def trading_days(count, end=None):
+    end = end or date.today()
+    days = []
+    current = end
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append(current)
+        current -= timedelta(days=1)
+    return days[::-1]
+
+
+def synthetic_closes(count, seed=0, start_price=100.0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.015, count)
+    return np.round(start_price * np.exp(np.cumsum(returns)), 2)
+
+
+def synthetic_time_series(count, seed=0, end=None):
+    """Alpha Vantage TIME_SERIES_DAILY payload for `count` trading days ending at `end`."""
+    rng = np.random.default_rng(seed + 1)
+    closes = synthetic_closes(count, seed)
+    time_series = {}
+    for day, close in zip(trading_days(count, end), closes):
+        spread = close * 0.01
+        time_series[day.strftime('%Y-%m-%d')] = {
+            '1. open': f"{close - spread / 2:.4f}",
+            '2. high': f"{close + spread:.4f}",
+            '3. low': f"{close - spread:.4f}",
+            '4. close': f"{close:.4f}",
+            '5. volume': str(int(rng.integers(100_000, 10_000_000))),
+        }
+    return {'Time Series (Daily)': dict(reversed(time_series.items()))}
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
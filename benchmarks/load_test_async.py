@@ -0,0 +1,178 @@
+"""Concurrent fetch requests against a slow stub Alpha Vantage, served by one uvicorn process.
+
+Starts a local stub upstream that answers after --upstream-delay seconds and an in-process uvicorn
+server for the ASGI app, then fires --requests concurrent GETs for distinct symbols at:
+
+  /async/<symbol>/  the async fetch_data_view (httpx upstream call, ORM on the bounded executor)
+  /sync/<symbol>/   the previous sync view, which Django runs under ASGI on a dedicated thread per
+                    request, holding that thread (and its database connection) for the upstream round trip
+
+Both overlap the upstream waits. The difference is in the peak database connections (sampled on
+PostgreSQL), which grow with concurrency for the sync view until the server refuses them, and stay at
+the executor bound for the async one.
+
+Usage: python benchmarks/load_test_async.py [--requests 50] [--upstream-delay 0.5]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import setup_django, synthetic_time_series, test_database
+
+STUB_PORT = 8765
+APP_PORT = 8766
+os.environ['ALPHA_VANTAGE_BASE_URL'] = f"http://127.0.0.1:{STUB_PORT}/query"
+
+setup_django()
+
+import httpx
+import uvicorn
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+from django.urls import path
+from services.financial_data_service import FinancialDataService
+from stocks_app.views import fetch_data_view
+from trial_task.asgi import application
+
+
+def legacy_fetch_data_view(request, symbol):
+    # The pre-change sync fetch_data_view, kept as the reference.
+    stock_data = FinancialDataService.fetch_stock_data(symbol.upper())
+    if isinstance(stock_data, str):
+        return JsonResponse({'error': stock_data}, status=500)
+    return JsonResponse({'data': stock_data}, status=200)
+
+
+urlpatterns = [
+    path('async/<str:symbol>/', fetch_data_view),
+    path('sync/<str:symbol>/', legacy_fetch_data_view),
+]
+
+
+def serve_stub(delay, payload):
+    body = json.dumps(payload).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', STUB_PORT), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def start_stub(delay, payload):
+    # A separate process, so its threads don't count against (or compete with) the app's.
+    stub = multiprocessing.Process(target=serve_stub, args=(delay, payload), daemon=True)
+    stub.start()
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', STUB_PORT)).close()
+            return stub
+        except OSError:
+            time.sleep(0.05)
+
+
+def start_app():
+    server = uvicorn.Server(uvicorn.Config(application, host='127.0.0.1', port=APP_PORT, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+class Sampler:
+    """Peak thread count in this process and, on PostgreSQL, peak server backends, while the block runs."""
+
+    def __init__(self):
+        self.threads = 0
+        self.backends = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        monitor = None
+        if connection.vendor == 'postgresql':
+            monitor = connection.get_new_connection(connection.get_connection_params())
+            monitor.autocommit = True
+        while self.running:
+            self.threads = max(self.threads, threading.active_count())
+            if monitor is not None:
+                with monitor.cursor() as cursor:
+                    cursor.execute("SELECT count(*) FROM pg_stat_activity WHERE backend_type = 'client backend'")
+                    self.backends = max(self.backends, cursor.fetchone()[0] - 1)
+            time.sleep(0.01)
+        if monitor is not None:
+            monitor.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+
+
+async def load(prefix, count):
+    async def one(client, i):
+        start = time.perf_counter()
+        response = await client.get(f"http://127.0.0.1:{APP_PORT}/{prefix}/{prefix.upper()}{i}/")
+        return response.status_code, time.perf_counter() - start
+
+    async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=count)) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(client, i) for i in range(count)))
+        return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--upstream-delay', type=float, default=0.5)
+    parser.add_argument('--days', type=int, default=300)
+    args = parser.parse_args()
+
+    settings.ROOT_URLCONF = __name__
+    with test_database():
+        stub = start_stub(args.upstream_delay, synthetic_time_series(args.days))
+        app = start_app()
+        print(
+            f"backend: {connection.vendor}, {args.requests} concurrent requests, "
+            f"upstream delay {args.upstream_delay}s, executor workers {settings.BLOCKING_EXECUTOR_WORKERS}"
+        )
+        try:
+            for prefix in ('async', 'sync'):
+                with Sampler() as peak:
+                    elapsed, results = asyncio.run(load(prefix, args.requests))
+                latencies = sorted(latency for _, latency in results)
+                ok = sum(status == 200 for status, _ in results)
+                print(
+                    f"{prefix:6} {elapsed:8.2f} s total {args.requests / elapsed:8.1f} req/s  "
+                    f"p50 {statistics.median(latencies):6.2f} s  p95 {latencies[int(len(latencies) * 0.95) - 1]:6.2f} s  "
+                    f"peak {peak.threads:4} threads {peak.backends:4} db connections  {ok}/{len(results)} ok"
+                )
+        finally:
+            app.should_exit = True
+            stub.terminate()
+            time.sleep(0.5)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,28 @@
+import json
+import os
 import numpy as np
 
+SOLVERS = ('gd', 'lstsq', 'sgd')
+ARTIFACT_FORMAT = 'linear-regression'
+ARTIFACT_FORMAT_VERSION = 1
+
 class LinearRegression() :
 
-    def __init__(self, learning_rate, iterations):
+    def __init__(self, learning_rate=0.0001, iterations=1000, solver='gd', batch_size=256,
+                 record_loss=True, random_state=None):
+
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of: {', '.join(SOLVERS)}")
 
         self.lr = learning_rate
         self.iterations = iterations
-        self.loss = []
+        self.solver = solver
+        self.batch_size = batch_size
+        self.record_loss = record_loss
+        self.random_state = random_state
+        self.W = None
+        self.b = 0.0
+        self._reset_loss(0)
 
     @staticmethod
     def mean_squared_error(y, y_hat):
@@ -15,38 +31,147 @@ class LinearRegression() :
 
     def fit(self, X, Y):
 
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64).reshape(-1)
         self.m, self.n = X.shape
 
         self.W = np.zeros(self.n)
-        self.b = 0
-        self.X = X
-        self.Y = Y
+        self.b = 0.0
 
-        for i in range(self.iterations):
+        if self.solver == 'lstsq':
+            self._fit_lstsq(X, Y)
+        elif self.solver == 'sgd':
+            self._fit_sgd(X, Y)
+        else:
+            self._fit_gd(X, Y)
+
+        return self
+
+    def partial_fit(self, X, Y):
+        """One shuffled mini-batch SGD pass over a chunk, for data streamed in pieces that don't fit in memory."""
+
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64).reshape(-1)
 
-            self.update()
+        if self.W is None:
+            self.n = X.shape[1]
+            self.W = np.zeros(self.n)
+            self.b = 0.0
+            self._reset_loss(self.iterations)
+        if getattr(self, '_rng', None) is None:
+            self._rng = np.random.default_rng(self.random_state)
+
+        self._record_loss(self._sgd_epoch(X, Y, self._rng.permutation(len(X))))
 
         return self
 
-    def update(self):
+    def _fit_gd(self, X, Y):
 
-        Y_pred = self.predict(self.X)
+        self._reset_loss(self.iterations)
 
-        mse = self.mean_squared_error(self.Y, Y_pred)
-        self.loss.append(mse)
+        for i in range(self.iterations):
 
+            residual = Y - (X.dot(self.W) + self.b)
+            self._record_loss(residual.dot(residual) / self.m)
 
-        dW = -(2 * (self.X.T).dot(self.Y - Y_pred)) / self.m
+            self.W = self.W + self.lr * 2 * X.T.dot(residual) / self.m
 
-        db = -2 * np.sum(self.Y - Y_pred) / self.m
+            self.b = self.b + self.lr * 2 * residual.sum() / self.m
 
+    def _fit_lstsq(self, X, Y):
 
-        self.W = self.W - self.lr * dW
+        # Centering first keeps the Gram matrix well conditioned for large raw features like day indices.
+        x_mean = X.mean(axis=0)
+        y_mean = Y.mean()
+        X_centered = X - x_mean
 
-        self.b = self.b - self.lr * db
+        self.W = np.linalg.lstsq(X_centered.T.dot(X_centered), X_centered.T.dot(Y - y_mean), rcond=None)[0]
+        self.b = float(y_mean - x_mean.dot(self.W))
 
-        return self
+        self._reset_loss(1)
+        if self.record_loss:
+            residual = Y - self.predict(X)
+            self._record_loss(residual.dot(residual) / self.m)
+
+    def _fit_sgd(self, X, Y):
+
+        self._reset_loss(self.iterations)
+        self._rng = np.random.default_rng(self.random_state)
+
+        for epoch in range(self.iterations):
+
+            self._record_loss(self._sgd_epoch(X, Y, self._rng.permutation(len(X))))
+
+    def _sgd_epoch(self, X, Y, order):
+
+        total = 0.0
+
+        for start in range(0, len(order), self.batch_size):
+
+            batch = order[start:start + self.batch_size]
+            X_batch = X[batch]
+            residual = Y[batch] - (X_batch.dot(self.W) + self.b)
+            total += residual.dot(residual)
+
+            self.W = self.W + self.lr * 2 * X_batch.T.dot(residual) / len(batch)
+
+            self.b = self.b + self.lr * 2 * residual.sum() / len(batch)
+
+        return total / max(len(order), 1)
+
+    def _reset_loss(self, size):
+
+        self._loss_buffer = np.empty(size if self.record_loss else 0)
+        self.loss = self._loss_buffer[:0]
+
+    def _record_loss(self, value):
+
+        if not self.record_loss:
+            return
+        count = len(self.loss)
+        if count == len(self._loss_buffer):
+            # Only partial_fit can outgrow the preallocated buffer; grow geometrically.
+            self._loss_buffer = np.resize(self._loss_buffer, max(2 * count, 16))
+        self._loss_buffer[count] = value
+        self.loss = self._loss_buffer[:count + 1]
 
     def predict(self, X):
 
         return X.dot(self.W) + self.b
+
+    def save(self, path, metadata=None):
+        """Write [b, W...] to `path` as a memory-mappable .npy and the hyperparameters plus `metadata` to a .json sidecar."""
+
+        stem = os.path.splitext(path)[0]
+        coefficients = np.concatenate(([self.b], np.asarray(self.W, dtype=np.float64)))
+        sidecar = {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'n_features': len(coefficients) - 1,
+            'solver': self.solver,
+            'learning_rate': self.lr,
+            'iterations': self.iterations,
+            **(metadata or {}),
+        }
+
+        # Write then rename so a process hot-reloading the file never maps a partial one.
+        with open(f"{stem}.npy.tmp", 'wb') as f:
+            np.save(f, coefficients)
+        os.replace(f"{stem}.npy.tmp", f"{stem}.npy")
+        with open(f"{stem}.json.tmp", 'w') as f:
+            json.dump(sidecar, f, indent=2, default=str)
+        os.replace(f"{stem}.json.tmp", f"{stem}.json")
+
+        return f"{stem}.npy"
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Map a saved model's coefficients; the sidecar is metadata only and is not read."""
+
+        coefficients = np.load(path, mmap_mode=mmap_mode)
+        model = cls(record_loss=False)
+        model.n = len(coefficients) - 1
+        model.W = coefficients[1:]
+        model.b = float(coefficients[0])
+
+        return model
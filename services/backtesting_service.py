@@ -1,11 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from decimal import Decimal
-from stocks_app.models import StockData
+import multiprocessing
+import threading
+import django
+import numpy as np
 import pandas as pd
+from django.conf import settings
 from services.financial_data_service import FinancialDataService
+from services.price_series_repository import PriceSeriesRepository
+from services.indicator_store import IndicatorStore
+from services.metrics import Metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Below this many window pairs, handing chunks to the sweep pool costs more than scoring inline.
+SWEEP_PARALLEL_THRESHOLD = 64
+# Window pairs scored per matrix pass, which bounds a sweep's working memory to a few chunks.
+SWEEP_CHUNK_SIZE = 512
+
+_sweep_pool = None
+_sweep_pool_lock = threading.Lock()
+
+
+def sweep_executor():
+    """The process pool shared by every sweep, started once per process with SWEEP_WORKERS workers.
+
+    Workers are spawned, not forked: forking a threaded server process can copy locks held by other
+    threads into the child, where they are never released.
+    """
+    global _sweep_pool
+    with _sweep_pool_lock:
+        if _sweep_pool is None:
+            _sweep_pool = ProcessPoolExecutor(
+                max_workers=settings.SWEEP_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _sweep_pool
+
+
+def discard_sweep_executor(executor):
+    global _sweep_pool
+    with _sweep_pool_lock:
+        if _sweep_pool is executor:
+            _sweep_pool = None
+    executor.shutdown(wait=False)
+
+
+def score_window_pairs(prices, moving_averages, pairs, initial_investment):
+    """Score a chunk of (short, long) window pairs in one matrix pass. Runs in sweep worker processes."""
+    short_ma = np.column_stack([moving_averages[short] for short, _ in pairs])
+    long_ma = np.column_stack([moving_averages[long] for _, long in pairs])
+    starts = np.array([long for _, long in pairs])
+
+    result = BacktestingService.simulate_crossover(
+        prices.reshape(-1, 1), short_ma, long_ma, starts, initial_investment
+    )
+
+    rows = []
+    for i, (short, long) in enumerate(pairs):
+        final_value = float(result['final_value'][i])
+        rows.append({
+            'short_window': short,
+            'long_window': long,
+            'final_value': final_value,
+            'total_return': (final_value - initial_investment) / initial_investment * 100,
+            'max_drawdown': float(result['max_drawdown'][i]),
+            'trades_executed': int(result['trades_executed'][i]),
+        })
+    return rows
+
+
 class BacktestingService:
     @staticmethod
     def calculate_moving_average(data, window, column_name):
@@ -13,68 +80,167 @@ class BacktestingService:
         return data
 
     @staticmethod
-    def run_backtest(symbol, initial_investment, short_window=50, long_window=200):
-        stock_data = StockData.objects.filter(stock_symbol=symbol)
+    def rolling_means(prices, windows):
+        """Simple moving averages for many windows from a single shared cumulative sum."""
+        cumsum = np.concatenate(([0.0], np.cumsum(prices, dtype=np.float64)))
+        means = {}
+        for window in windows:
+            ma = np.full(len(prices), np.nan)
+            if window <= len(prices):
+                ma[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+            means[window] = ma
+        return means
 
-        if not stock_data.exists():
-            logger.info(f"No data found for {symbol}. Fetching stock data.")
-            FinancialDataService.fetch_stock_data(symbol)
-            stock_data = StockData.objects.filter(stock_symbol=symbol)
+    @staticmethod
+    def crossover_positions(short_ma, long_ma, start):
+        """Position (1 = holding, 0 = flat) after each bar for every column of the MA matrices.
 
-        if not stock_data.exists():
-            logger.error(f"No data available for backtesting for {symbol}.")
-            return {
-                "error": f"No data available for backtesting for {symbol}."
-            }
+        Buying when flat and short < long, and selling when holding and short > long, means the
+        position simply follows the last strict crossover state, so it is a forward fill.
+        """
+        rows, cols = short_ma.shape
+        signal = np.full((rows, cols), np.nan)
+        with np.errstate(invalid='ignore'):
+            signal[short_ma < long_ma] = 1.0
+            signal[short_ma > long_ma] = 0.0
+        signal[np.arange(rows)[:, None] < np.asarray(start).reshape(1, -1)] = 0.0
 
-        data = pd.DataFrame(list(stock_data.values('date', 'close_price')))
-        data.set_index('date', inplace=True)
-        data['close_price'] = data['close_price'].astype(float)
+        last_valid = np.where(~np.isnan(signal), np.arange(rows)[:, None], 0)
+        np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+        positions = signal[last_valid, np.arange(cols)]
+        return np.nan_to_num(positions, nan=0.0)
 
-        if len(data) < long_window:
-            logger.error(f"Not enough data to run the backtest for {symbol}.")
-            return {
-                "error": f"Not enough data to run the backtest for {symbol}."
-            }
+    @staticmethod
+    def simulate_crossover(prices, short_ma, long_ma, start, initial_investment):
+        """Vectorized float64 MA-crossover backtest.
 
-        data = BacktestingService.calculate_moving_average(data, short_window, 'short_ma')
-        data = BacktestingService.calculate_moving_average(data, long_window, 'long_ma')
+        `prices` is (T, 1) or (T, N); `short_ma`/`long_ma` are (T, N); `start` is the first bar
+        (scalar or per column) at which trading is allowed. Returns per-column results.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        positions = BacktestingService.crossover_positions(short_ma, long_ma, start)
 
+        held = np.zeros_like(positions)
+        held[1:] = positions[:-1]
+        growth = np.ones(np.broadcast_shapes(prices.shape, positions.shape))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = prices[1:] / prices[:-1]
+        # Bars outside a series' date range (portfolio mode) have no price and leave equity flat.
+        ratio[~np.isfinite(ratio)] = 1.0
+        growth[1:] = np.where(held[1:] == 1.0, ratio, 1.0)
+
+        equity = float(initial_investment) * np.cumprod(growth, axis=0)
+        peak = np.maximum.accumulate(equity, axis=0)
+        drawdown = (peak - equity) / peak
+        trades = np.count_nonzero(np.diff(positions, axis=0, prepend=0.0), axis=0)
+
+        return {
+            'positions': positions,
+            'equity': equity,
+            'final_value': equity[-1],
+            'max_drawdown': drawdown.max(axis=0),
+            'trades_executed': trades,
+        }
+
+    @staticmethod
+    def reconcile_decimal(prices, positions, start, initial_investment):
+        """Replay the trades chosen by the vectorized engine with exact Decimal arithmetic."""
         investment = Decimal(initial_investment)
-        position = 0
-        cash = Decimal(investment)
+        cash = investment
         shares_held = Decimal(0)
+        position = 0
         trade_count = 0
         max_drawdown = Decimal(0)
-        peak_value = Decimal(investment)
-
-        for i in range(long_window, len(data)):
-            short_ma = Decimal(data.iloc[i]['short_ma'])
-            long_ma = Decimal(data.iloc[i]['long_ma'])
-
-            if position == 0 and short_ma < long_ma:
-                shares_held = cash / Decimal(data.iloc[i]['close_price'])
-                cash = Decimal(0)
-                position = 1
-                trade_count += 1
-                logger.info(f"Buying {shares_held} shares at {data.iloc[i]['close_price']} on {data.index[i]}")
+        peak_value = investment
+        price = None
 
-            elif position == 1 and short_ma > long_ma:
-                cash = shares_held * Decimal(data.iloc[i]['close_price'])
-                shares_held = Decimal(0)
-                position = 0
+        for close, target in zip(prices[start:].tolist(), positions[start:].tolist()):
+            price = Decimal(close)
+            if target != position:
+                if target:
+                    shares_held = cash / price
+                    cash = Decimal(0)
+                else:
+                    cash = shares_held * price
+                    shares_held = Decimal(0)
+                position = target
                 trade_count += 1
-                logger.info(f"Selling shares at {data.iloc[i]['close_price']} on {data.index[i]}")
 
-            current_value = cash + shares_held * Decimal(data.iloc[i]['close_price'])
+            current_value = cash + shares_held * price
             if current_value > peak_value:
                 peak_value = current_value
             drawdown = (peak_value - current_value) / peak_value
             if drawdown > max_drawdown:
                 max_drawdown = drawdown
 
-        final_value = cash + shares_held * Decimal(data.iloc[-1]['close_price'])
-        total_return = (final_value - investment) / investment * 100
+        final_value = cash + shares_held * (price if price is not None else Decimal(prices[-1]))
+        return {
+            'final_value': final_value,
+            'max_drawdown': max_drawdown,
+            'trades_executed': trade_count,
+        }
+
+    @staticmethod
+    def load_series(symbol):
+        series = PriceSeriesRepository.get(symbol)
+
+        if series is None:
+            logger.info(f"No data found for {symbol}. Fetching stock data.")
+            FinancialDataService.fetch_stock_data(symbol)
+            series = PriceSeriesRepository.get(symbol)
+
+        return series
+
+    @staticmethod
+    def load_price_data(symbol):
+        series = BacktestingService.load_series(symbol)
+
+        if series is None:
+            return None
+
+        return pd.DataFrame({'close_price': series.close}, index=pd.Index(series.date_list(), name='date'))
+
+    @staticmethod
+    @Metrics.timed('backtest')
+    def run_backtest(symbol, initial_investment, short_window=50, long_window=200, exact=False):
+        series = BacktestingService.load_series(symbol)
+
+        if series is None:
+            logger.error(f"No data available for backtesting for {symbol}.")
+            return {
+                "error": f"No data available for backtesting for {symbol}."
+            }
+
+        if len(series) < long_window:
+            logger.error(f"Not enough data to run the backtest for {symbol}.")
+            return {
+                "error": f"Not enough data to run the backtest for {symbol}."
+            }
+
+        short_ma, long_ma = IndicatorStore.get_many(series, [('sma', short_window), ('sma', long_window)])
+
+        prices = series.close
+        result = BacktestingService.simulate_crossover(
+            prices.reshape(-1, 1),
+            short_ma.reshape(-1, 1),
+            long_ma.reshape(-1, 1),
+            long_window,
+            initial_investment,
+        )
+
+        if exact:
+            exact_result = BacktestingService.reconcile_decimal(
+                prices, result['positions'][:, 0], long_window, initial_investment
+            )
+            final_value = exact_result['final_value']
+            max_drawdown = exact_result['max_drawdown']
+            trade_count = exact_result['trades_executed']
+            total_return = (final_value - Decimal(initial_investment)) / Decimal(initial_investment) * 100
+        else:
+            final_value = result['final_value'][0]
+            max_drawdown = result['max_drawdown'][0]
+            trade_count = int(result['trades_executed'][0])
+            total_return = (final_value - initial_investment) / initial_investment * 100
 
         summary = {
             'symbol': symbol,
@@ -87,3 +253,147 @@ class BacktestingService:
 
         logger.info(f"Backtest completed for {symbol}: {summary}")
         return summary
+
+    @staticmethod
+    @Metrics.timed('backtest_sweep')
+    def run_sweep(symbol, initial_investment, short_windows, long_windows, processes=None, top=None):
+        data = BacktestingService.load_price_data(symbol)
+
+        if data is None:
+            logger.error(f"No data available for backtesting for {symbol}.")
+            return {
+                "error": f"No data available for backtesting for {symbol}."
+            }
+
+        prices = data['close_price'].to_numpy()
+        pairs = [
+            (short, long)
+            for short in sorted(set(short_windows))
+            for long in sorted(set(long_windows))
+            if 0 < short < long <= len(prices)
+        ]
+        if not pairs:
+            logger.error(f"No valid window combinations to sweep for {symbol}.")
+            return {
+                "error": f"No valid window combinations for {symbol}: short windows must be smaller than "
+                         f"long windows, and long windows at most {len(prices)}."
+            }
+
+        moving_averages = BacktestingService.rolling_means(prices, {window for pair in pairs for window in pair})
+        initial_investment = float(initial_investment)
+        processes = processes or settings.SWEEP_WORKERS
+
+        if processes == 1 or len(pairs) < SWEEP_PARALLEL_THRESHOLD:
+            rows = []
+            for i in range(0, len(pairs), SWEEP_CHUNK_SIZE):
+                chunk = pairs[i:i + SWEEP_CHUNK_SIZE]
+                rows.extend(score_window_pairs(prices, moving_averages, chunk, initial_investment))
+        else:
+            rows = BacktestingService.score_in_pool(prices, moving_averages, pairs, initial_investment, processes)
+
+        rows.sort(key=lambda row: row['total_return'], reverse=True)
+        for rank, row in enumerate(rows, start=1):
+            row['rank'] = rank
+
+        logger.info(f"Sweep completed for {symbol}: {len(pairs)} combinations on {len(prices)} bars")
+        return {
+            'symbol': symbol,
+            'initial_investment': initial_investment,
+            'combinations': len(pairs),
+            'results': rows[:top] if top else rows,
+        }
+
+    @staticmethod
+    def score_in_pool(prices, moving_averages, pairs, initial_investment, processes):
+        chunk_size = min(SWEEP_CHUNK_SIZE, -(-len(pairs) // (processes * 4)))
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        executor = sweep_executor()
+        try:
+            futures = [
+                executor.submit(
+                    score_window_pairs,
+                    prices,
+                    {window: moving_averages[window] for pair in chunk for window in pair},
+                    chunk,
+                    initial_investment,
+                )
+                for chunk in chunks
+            ]
+            return [row for future in futures for row in future.result()]
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time and finish this sweep inline.
+            logger.error("Sweep pool broke, scoring inline")
+            discard_sweep_executor(executor)
+            return [
+                row for chunk in chunks
+                for row in score_window_pairs(prices, moving_averages, chunk, initial_investment)
+            ]
+
+    @staticmethod
+    @Metrics.timed('backtest_portfolio')
+    def run_portfolio_backtest(symbols, initial_investment, short_window=50, long_window=200):
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        series = PriceSeriesRepository.get_many(symbols)
+
+        errors = {}
+        prices = pd.DataFrame({
+            symbol: pd.Series(series[symbol].close, index=series[symbol].dates)
+            for symbol in symbols if symbol in series
+        }).sort_index()
+        counts = prices.count()
+        # Aligned date x symbol matrix; gaps inside a series carry the last close forward.
+        prices = prices.ffill(limit_area='inside')
+
+        for symbol in symbols:
+            if symbol not in prices.columns:
+                errors[symbol] = f"No data available for backtesting for {symbol}."
+            elif counts[symbol] < long_window:
+                errors[symbol] = f"Not enough data to run the backtest for {symbol}."
+
+        usable = [symbol for symbol in symbols if symbol not in errors]
+        if not usable:
+            logger.error(f"No symbols with enough data for portfolio backtest: {symbols}")
+            return {"error": "No symbols with enough data to run the portfolio backtest.", "errors": errors}
+
+        prices = prices[usable]
+        matrix = prices.to_numpy()
+        short_ma = prices.rolling(window=short_window).mean().to_numpy()
+        long_ma = prices.rolling(window=long_window).mean().to_numpy()
+        first_valid = np.argmax(~np.isnan(matrix), axis=0)
+        allocation = float(initial_investment) / len(usable)
+
+        result = BacktestingService.simulate_crossover(
+            matrix, short_ma, long_ma, first_valid + long_window, allocation
+        )
+
+        per_symbol = {}
+        for i, symbol in enumerate(usable):
+            final_value = float(result['final_value'][i])
+            per_symbol[symbol] = {
+                'symbol': symbol,
+                'initial_investment': allocation,
+                'final_value': final_value,
+                'total_return': (final_value - allocation) / allocation * 100,
+                'max_drawdown': float(result['max_drawdown'][i]),
+                'trades_executed': int(result['trades_executed'][i]),
+            }
+
+        equity = result['equity'].sum(axis=1)
+        peak = np.maximum.accumulate(equity)
+        final_value = float(equity[-1])
+        summary = {
+            'symbols': usable,
+            'initial_investment': float(initial_investment),
+            'final_value': final_value,
+            'total_return': (final_value - float(initial_investment)) / float(initial_investment) * 100,
+            'max_drawdown': float(((peak - equity) / peak).max()),
+            'trades_executed': int(result['trades_executed'].sum()),
+            'per_symbol': per_symbol,
+            'errors': errors,
+        }
+
+        logger.info(
+            f"Portfolio backtest completed for {len(usable)} symbols over {len(prices)} dates: "
+            f"total_return={summary['total_return']:.2f}%"
+        )
+        return summary
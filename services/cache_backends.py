@@ -0,0 +1,290 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.redis import RedisCache, RedisSerializer
+
+RAW = b'P'
+COMPRESSED = b'Z'
+
+
+def compress(data):
+    """Prefix `data` with a format byte, zlib-compressing it first when it is large and shrinks."""
+    if len(data) >= getattr(settings, 'CACHE_COMPRESS_MIN_BYTES', 16 * 1024):
+        compressed = zlib.compress(data, getattr(settings, 'CACHE_COMPRESS_LEVEL', 6))
+        # PNG charts are already deflated; storing them raw avoids paying to inflate them on every read.
+        if len(compressed) < len(data):
+            return COMPRESSED + compressed
+    return RAW + data
+
+
+def decompress(data):
+    data = bytes(data)
+    if data[:1] == COMPRESSED:
+        return zlib.decompress(data[1:])
+    return data[1:]
+
+
+class CompressedRedisSerializer(RedisSerializer):
+    """Django's Redis serializer with compress() applied to pickled values; ints stay raw so INCR works."""
+
+    def dumps(self, obj):
+        data = super().dumps(obj)
+        return data if isinstance(data, int) else compress(data)
+
+    def loads(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(decompress(data))
+
+
+# Compare-and-delete: KEYS[1] is removed only while it still holds ARGV[1].
+REDIS_DELETE_IF_EQUAL = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# The stored bytes are kept as a running total in cache_meta by triggers, inside the writing transaction,
+# so a write only has to cull when the total is over budget. Databases created before the total existed
+# are backfilled once.
+SCHEMA = """
+    BEGIN IMMEDIATE;
+    CREATE TABLE IF NOT EXISTS cache_entry (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+    CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires) WHERE expires IS NOT NULL;
+    CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    INSERT OR IGNORE INTO cache_meta (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM cache_entry;
+    CREATE TRIGGER IF NOT EXISTS cache_entry_inserted AFTER INSERT ON cache_entry BEGIN
+        UPDATE cache_meta SET value = value + NEW.size WHERE name = 'bytes';
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_entry_resized AFTER UPDATE OF size ON cache_entry BEGIN
+        UPDATE cache_meta SET value = value + NEW.size - OLD.size WHERE name = 'bytes';
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_entry_deleted AFTER DELETE ON cache_entry BEGIN
+        UPDATE cache_meta SET value = value - OLD.size WHERE name = 'bytes';
+    END;
+    COMMIT;
+"""
+
+UPSERT = """
+    INSERT INTO cache_entry (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        value = excluded.value, size = excluded.size, expires = excluded.expires, accessed = excluded.accessed
+"""
+
+# Oldest reads first, along the accessed index, so a cull reads only the entries it evicts.
+LEAST_RECENTLY_USED = 'SELECT key, size FROM cache_entry ORDER BY accessed'
+CULL_BATCH_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    """Cache stored in one SQLite file, shared by every process on the host without an extra service.
+
+    Values are pickled and compressed above CACHE_COMPRESS_MIN_BYTES. The file is kept under
+    OPTIONS['MAX_BYTES'] of stored values by evicting the least recently read entries. add() and
+    incr() are atomic across processes, which the report build lock and data versions rely on.
+    """
+
+    # Refreshing the LRU timestamp is a write; skip it for entries read within this many seconds.
+    ACCESS_RESOLUTION = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_bytes = int(options.get('MAX_BYTES', 256 * 1024 * 1024))
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and process; a connection inherited across fork() is not safe to use.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, conn, key, value, timeout, now):
+        data = compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        conn.execute(UPSERT, (key, data, len(data), self.get_backend_timeout(timeout), now))
+
+    @staticmethod
+    def _stored_bytes(conn):
+        return conn.execute("SELECT value FROM cache_meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _cull(self, conn, now):
+        """Evict expired, then least recently read, entries until the stored bytes fit in the budget."""
+        if self._stored_bytes(conn) <= self._max_bytes:
+            return
+        conn.execute('DELETE FROM cache_entry WHERE expires <= ?', (now,))
+        excess = self._stored_bytes(conn) - self._max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        cursor = conn.execute(LEAST_RECENTLY_USED)
+        for key, size in cursor:
+            victims.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        cursor.close()
+        for start in range(0, len(victims), CULL_BATCH_SIZE):
+            batch = victims[start:start + CULL_BATCH_SIZE]
+            conn.execute(f"DELETE FROM cache_entry WHERE key IN ({','.join('?' * len(batch))})", batch)
+
+    def _live_rows(self, conn, keys, now):
+        placeholders = ','.join('?' * len(keys))
+        rows = conn.execute(
+            f'SELECT key, value, accessed FROM cache_entry '
+            f'WHERE key IN ({placeholders}) AND (expires IS NULL OR expires > ?)',
+            (*keys, now),
+        ).fetchall()
+        stale = [key for key, _, accessed in rows if now - accessed > self.ACCESS_RESOLUTION]
+        if stale:
+            conn.execute(
+                f"UPDATE cache_entry SET accessed = ? WHERE key IN ({','.join('?' * len(stale))})", (now, *stale)
+            )
+        return {key: value for key, value, _ in rows}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        rows = self._live_rows(self._connection(), [key], time.time())
+        if key not in rows:
+            return default
+        return pickle.loads(decompress(rows[key]))
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._live_rows(self._connection(), list(keys), time.time())
+        return {keys[key]: pickle.loads(decompress(value)) for key, value in rows.items()}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone())
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._write(conn, key, value, timeout, now)
+            self._cull(conn, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for key, value in data.items():
+                self._write(conn, self.make_and_validate_key(key, version=version), value, timeout, now)
+            self._cull(conn, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute(
+                'SELECT 1 FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+            ).fetchone():
+                return False
+            self._write(conn, key, value, timeout, now)
+            self._cull(conn, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT value, expires FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found.")
+            value = pickle.loads(decompress(row[0])) + delta
+            data = compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            conn.execute(UPSERT, (key, data, len(data), row[1], now))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache_entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute('DELETE FROM cache_entry WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_if_equal(self, key, value, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data = compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return self._connection().execute(
+            'DELETE FROM cache_entry WHERE key = ? AND value = ?', (key, data)
+        ).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._connection().execute(f"DELETE FROM cache_entry WHERE key IN ({','.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entry')
+
+    def stats(self):
+        conn = self._connection()
+        entries = conn.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+        return {'entries': entries, 'bytes': self._stored_bytes(conn), 'max_bytes': self._max_bytes}
+
+    def close(self, **kwargs):
+        # Django closes caches after every request; the per-thread connection is reused instead.
+        pass
+
+
+def delete_if_equal(backend, key, value):
+    """Delete `key` only if it still holds `value`; atomic on the SQLite and Redis backends.
+
+    Other backends get then delete, so a key that expires and is re-set in between can be lost.
+    """
+    if isinstance(backend, SQLiteCache):
+        return backend.delete_if_equal(key, value)
+    if isinstance(backend, RedisCache):
+        key = backend.make_and_validate_key(key)
+        client = backend._cache.get_client(key, write=True)
+        return bool(client.eval(REDIS_DELETE_IF_EQUAL, 1, key, backend._cache._serializer.dumps(value)))
+    if backend.get(key) == value:
+        return backend.delete(key)
+    return False
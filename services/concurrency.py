@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+
+_clients = weakref.WeakKeyDictionary()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_async_client():
+    """The pooled upstream HTTP client for the running event loop.
+
+    httpx clients are bound to the loop they first connect on, so there is one per loop: a single one
+    for the lifetime of an ASGI worker, closed at lifespan shutdown, or one per request when async
+    views run under WSGI, closed by `closes_upstream_client` when the view returns.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=settings.UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the running event loop's upstream client, if it has one."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def closes_upstream_client(view):
+    """Close the upstream client after an async view that ran on its own event loop, i.e. under WSGI.
+
+    Under ASGI the view runs on the worker's loop, whose client is reused until lifespan shutdown.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            if not isinstance(request, ASGIRequest):
+                await close_async_client()
+    return wrapper
+
+
+async def lifespan(receive, send):
+    """Handle the ASGI lifespan protocol, which Django does not: close the worker's client on shutdown."""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def blocking_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BLOCKING_EXECUTOR_WORKERS, thread_name_prefix='blocking'
+            )
+        return _executor
+
+
+def call_with_connection_cleanup(func, *args, **kwargs):
+    # Executor threads outlive requests, so the request_finished cleanup never runs in them. Each keeps
+    # its connection for reuse (at most one per worker) and only drops it once it has failed.
+    try:
+        return func(*args, **kwargs)
+    finally:
+        for conn in connections.all(initialized_only=True):
+            if conn.errors_occurred:
+                if conn.is_usable():
+                    conn.errors_occurred = False
+                else:
+                    conn.close()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run ORM, backtest or rendering work off the event loop on the bounded blocking executor.
+
+    Unlike sync_to_async's default thread-sensitive mode, calls run in parallel, but never on more
+    than BLOCKING_EXECUTOR_WORKERS threads (and database connections) per process.
+    """
+    call = functools.partial(call_with_connection_cleanup, func, *args, **kwargs)
+    return await sync_to_async(call, thread_sensitive=False, executor=blocking_executor())()
+
+
+async def iterate_blocking(make_iterator, *args, max_buffered=2):
+    """Async iterator over a blocking iterator, which runs to completion in one run_blocking call.
+
+    The whole iteration stays on one executor thread, as an open transaction or server-side cursor
+    requires. At most `max_buffered` items wait for the consumer, so a slow client holds back the
+    producer instead of buffering the whole result. Closing the async iterator early closes the
+    blocking one on its thread.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(max_buffered)
+    done = object()
+    stopped = threading.Event()
+
+    def produce():
+        iterator = iter(make_iterator(*args))
+        try:
+            for item in iterator:
+                if stopped.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            if not stopped.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    producer = asyncio.ensure_future(run_blocking(produce))
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        await producer
+    finally:
+        if not producer.done():
+            stopped.set()
+            # Unblock a pending put; the producer checks `stopped` before its next one.
+            while not queue.empty():
+                queue.get_nowait()
+        with contextlib.suppress(Exception):
+            await producer
@@ -1,12 +1,28 @@
-from stocks_app.models import StockData
 from services.financial_data_service import FinancialDataService
+from services.price_series_repository import PriceSeriesRepository
+from services.concurrency import run_blocking
+import logging
+
+logger = logging.getLogger(__name__)
 
 class DataFetchingService:
     @staticmethod
     def ensure_data_fetched(symbol):
-        print(f"Checking data for {symbol}")
-        if not StockData.objects.filter(stock_symbol=symbol).exists():
-            print(f"Data not found for {symbol}, fetching now.")
+        logger.debug(f"Checking data for {symbol}")
+        if PriceSeriesRepository.get(symbol) is None:
+            logger.info(f"Data not found for {symbol}, fetching now.")
             FinancialDataService.fetch_stock_data(symbol)
         else:
-            print(f"Data already exists for {symbol}")
\ No newline at end of file
+            logger.debug(f"Data already exists for {symbol}")
+
+    @staticmethod
+    async def ensure_data_fetched_async(symbol):
+        """Async ensure_data_fetched; raises ValueError if the upstream fetch fails."""
+        logger.debug(f"Checking data for {symbol}")
+        if await run_blocking(PriceSeriesRepository.get, symbol) is None:
+            logger.info(f"Data not found for {symbol}, fetching now.")
+            result = await FinancialDataService.fetch_stock_data_async(symbol)
+            if isinstance(result, str):
+                raise ValueError(result)
+        else:
+            logger.debug(f"Data already exists for {symbol}")
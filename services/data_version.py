@@ -0,0 +1,61 @@
+import time
+import logging
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+
+class DataVersion:
+    """Per-symbol counter bumped whenever the symbol's stock or prediction rows change.
+
+    Cache keys that embed the version need no TTL: a write moves the symbol to a new version and
+    entries for the old one are simply never read again. Counters start at time_ns(), so a version
+    lost to eviction or a cache flush never comes back with a value readers have already seen.
+    """
+
+    @staticmethod
+    def key(symbol):
+        return f"data_version_{symbol.upper()}"
+
+    @staticmethod
+    def get(symbol):
+        return DataVersion.get_many([symbol])[symbol.upper()]
+
+    @staticmethod
+    def get_many(symbols):
+        keys = {DataVersion.key(symbol): symbol.upper() for symbol in symbols}
+        found = cache.get_many(list(keys))
+        versions = {}
+        for key, symbol in keys.items():
+            version = found.get(key)
+            if version is None:
+                initial = time.time_ns()
+                cache.add(key, initial, timeout=None)
+                version = cache.get(key) or initial
+            versions[symbol] = version
+        return versions
+
+    @staticmethod
+    def bump(symbol):
+        key = DataVersion.key(symbol)
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            version = time.time_ns()
+            cache.set(key, version, timeout=None)
+        logger.debug(f"Data version for {symbol} is now {version}")
+        return version
+
+    @staticmethod
+    def bump_on_commit(symbols):
+        # Bumping before commit would let a reader cache the old rows under the new version.
+        symbols = sorted({symbol.upper() for symbol in symbols})
+        transaction.on_commit(lambda: [DataVersion.bump(symbol) for symbol in symbols])
+
+    @staticmethod
+    def is_shared():
+        """Whether bumps made by other processes (e.g. the ingest command) are visible to this one."""
+        return not isinstance(caches['default'], (LocMemCache, DummyCache))
@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+import logging
+from datetime import date
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from stocks_app.models import StockData
+from services.concurrency import iterate_blocking
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ('open_price', 'close_price', 'high_price', 'low_price', 'volume')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'npy': 'application/octet-stream',
+}
+NPY_DTYPES = {
+    'stock_symbol': 'U10',
+    'date': 'datetime64[D]',
+    'open_price': 'f8',
+    'close_price': 'f8',
+    'high_price': 'f8',
+    'low_price': 'f8',
+    'volume': 'i8',
+}
+
+
+class ExportService:
+    """Streams stored prices row by row from a server-side cursor, so memory stays flat for any range."""
+
+    @staticmethod
+    def parse_fields(value):
+        if not value:
+            return list(EXPORT_FIELDS)
+        fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in EXPORT_FIELDS]
+        if unknown or not fields:
+            raise ValueError(f"Unknown fields {unknown}, expected some of: {', '.join(EXPORT_FIELDS)}")
+        return fields
+
+    @staticmethod
+    def parse_date(value):
+        return date.fromisoformat(value) if value else None
+
+    @staticmethod
+    def queryset(symbols, fields, start=None, end=None):
+        queryset = StockData.objects.filter(stock_symbol__in=symbols)
+        if start:
+            queryset = queryset.filter(date__gte=start)
+        if end:
+            queryset = queryset.filter(date__lte=end)
+        return queryset.order_by('stock_symbol', 'date').values_list('stock_symbol', 'date', *fields)
+
+    @staticmethod
+    def rows(queryset):
+        """Yield chunks of rows; the whole export reads one snapshot inside a single transaction.
+
+        On PostgreSQL, iterating inside a transaction also keeps the server-side cursor from being
+        declared WITH HOLD, which would make the server materialize the full result at commit.
+        """
+        outermost = not connection.in_atomic_block
+        with transaction.atomic():
+            if outermost and connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            chunk = []
+            for row in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+                chunk.append(row)
+                if len(chunk) == settings.EXPORT_CHUNK_SIZE:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    @staticmethod
+    def stream(export_format, symbols, fields, start=None, end=None):
+        queryset = ExportService.queryset(symbols, fields, start, end)
+        if export_format == 'csv':
+            return ExportService.stream_csv(queryset, fields)
+        if export_format == 'ndjson':
+            return ExportService.stream_ndjson(queryset, fields)
+        if export_format == 'npy':
+            return ExportService.stream_npy(queryset, fields)
+        raise ValueError(f"Unknown export format '{export_format}', expected one of: {', '.join(EXPORT_FORMATS)}")
+
+    @staticmethod
+    def astream(export_format, symbols, fields, start=None, end=None):
+        """stream() as an async iterator for ASGI responses; the rows are still read on one blocking thread."""
+        return iterate_blocking(ExportService.stream, export_format, symbols, fields, start, end)
+
+    @staticmethod
+    def stream_csv(queryset, fields):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['symbol', 'date', *fields])
+        for chunk in ExportService.rows(queryset):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def stream_ndjson(queryset, fields):
+        # Prices are written from the stored Decimals as exact JSON numbers, not strings or floats.
+        keys = [json.dumps(field) for field in fields]
+        for chunk in ExportService.rows(queryset):
+            yield ''.join(
+                f'{{"symbol": {json.dumps(symbol)}, "date": "{day.isoformat()}"'
+                + ''.join(f', {key}: {value}' for key, value in zip(keys, values))
+                + '}\n'
+                for symbol, day, *values in chunk
+            )
+
+    @staticmethod
+    def stream_npy(queryset, fields):
+        """A structured .npy with one record per row; prices are float64 and dates datetime64[D].
+
+        The .npy header carries the row count, so it is counted within the snapshot the rows are read from.
+        """
+        dtype = np.dtype([(name, NPY_DTYPES[name]) for name in ('stock_symbol', 'date', *fields)])
+        rows = ExportService.rows(queryset)
+        # rows() opens the transaction lazily; count inside it so the header matches the rows streamed.
+        first = next(rows, [])
+        count = queryset.count() if first else 0
+
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (count,),
+        })
+        yield header.getvalue()
+
+        if first:
+            yield np.array(first, dtype=dtype).tobytes()
+        for chunk in rows:
+            yield np.array(chunk, dtype=dtype).tobytes()
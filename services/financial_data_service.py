@@ -1,7 +1,18 @@
 import requests
+import httpx
 import os
+import numpy as np
 from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Max
 from stocks_app.models import StockData
+from services.price_archive import COLUMNS, PriceArchive
+from services.price_loader import PriceLoader
+from services.price_series_repository import PriceSeriesRepository
+from services.data_version import DataVersion
+from services.concurrency import get_async_client, run_blocking
+from services.metrics import Metrics
 from dotenv import load_dotenv
 import logging
 
@@ -10,42 +21,119 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
-BASE_URL = 'https://www.alphavantage.co/query'
+BASE_URL = os.getenv('ALPHA_VANTAGE_BASE_URL', 'https://www.alphavantage.co/query')
+
+BULK_BATCH_SIZE = 500
+PRICE_FIELDS = ['open_price', 'close_price', 'high_price', 'low_price', 'volume']
+CENTS = Decimal('0.01')
+# outputsize=compact returns the latest 100 trading days, roughly 140 calendar days.
+COMPACT_MAX_GAP_DAYS = 100
+# Only the last two years of prices are stored and served.
+HISTORY_DAYS = 730
+
+
+class RateLimitError(ValueError):
+    pass
 
 
 class FinancialDataService:
     @staticmethod
-    def fetch_stock_data(symbol):
-        params = {
+    def fetch_stock_data(symbol, bulk=True, incremental=True):
+        high_water_mark = FinancialDataService.get_high_water_mark(symbol) if incremental else None
+        outputsize = FinancialDataService.get_outputsize(high_water_mark)
+
+        try:
+            time_series = FinancialDataService.request_time_series(symbol, outputsize)
+            return FinancialDataService.store_time_series(
+                symbol, time_series, high_water_mark=high_water_mark, bulk=bulk, outputsize=outputsize
+            )
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network request error: {e}")
+            raise SystemExit(e)
+        except ValueError as ve:
+            logger.error(f"Data processing error: {ve}")
+            return str(ve)
+
+    @staticmethod
+    async def fetch_stock_data_async(symbol, incremental=True):
+        """fetch_stock_data for async views: the upstream round trip awaits instead of holding a thread."""
+        high_water_mark = (
+            await run_blocking(FinancialDataService.get_high_water_mark, symbol) if incremental else None
+        )
+        outputsize = FinancialDataService.get_outputsize(high_water_mark)
+
+        try:
+            time_series = await FinancialDataService.request_time_series_async(symbol, outputsize)
+            return await run_blocking(
+                FinancialDataService.store_time_series,
+                symbol, time_series, high_water_mark=high_water_mark, outputsize=outputsize,
+            )
+
+        except httpx.HTTPError as e:
+            # Unlike the sync path, don't raise SystemExit: it would take down the event loop's worker.
+            logger.error(f"Network request error: {e}")
+            return f"Network request error: {e}"
+        except ValueError as ve:
+            logger.error(f"Data processing error: {ve}")
+            return str(ve)
+
+    @staticmethod
+    def time_series_params(symbol, outputsize):
+        return {
             'function': 'TIME_SERIES_DAILY',
             'symbol': symbol,
-            'outputsize': 'full',
+            'outputsize': outputsize,
             'apikey': ALPHA_VANTAGE_API_KEY
         }
 
-        try:
-            response = requests.get(BASE_URL, params=params)
-            response.raise_for_status()
+    @staticmethod
+    @Metrics.timed('alpha_vantage_fetch')
+    def request_time_series(symbol, outputsize='full', http=None, base_url=None):
+        response = (http or requests).get(
+            base_url or BASE_URL, params=FinancialDataService.time_series_params(symbol, outputsize)
+        )
+        response.raise_for_status()
 
-            data = response.json()
+        return FinancialDataService.parse_time_series_response(symbol, response.json())
 
-            if 'Note' in data and 'Please consider' in data['Note']:
-                logger.error(f"Rate limit exceeded for {symbol}.")
-                raise ValueError("Rate limit exceeded. Try again later.")
+    @staticmethod
+    @Metrics.timed('alpha_vantage_fetch')
+    async def request_time_series_async(symbol, outputsize='full', client=None, base_url=None):
+        response = await (client or get_async_client()).get(
+            base_url or BASE_URL, params=FinancialDataService.time_series_params(symbol, outputsize)
+        )
+        response.raise_for_status()
 
-            time_series = data.get('Time Series (Daily)')
-            if not time_series:
-                logger.error(f"Invalid data received for {symbol}")
-                raise ValueError(f"Invalid data received for {symbol}")
+        return FinancialDataService.parse_time_series_response(symbol, response.json())
 
-            # Filter data from the last 2 years
-            two_years_ago = datetime.now().date() - timedelta(days=730)
-            stock_data_list = []
+    @staticmethod
+    def parse_time_series_response(symbol, data):
+        if 'Note' in data and 'Please consider' in data['Note']:
+            logger.error(f"Rate limit exceeded for {symbol}.")
+            raise RateLimitError("Rate limit exceeded. Try again later.")
 
-            for date_str, price_data in time_series.items():
-                date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        time_series = data.get('Time Series (Daily)')
+        if not time_series:
+            logger.error(f"Invalid data received for {symbol}")
+            raise ValueError(f"Invalid data received for {symbol}")
+
+        return time_series
+
+    @staticmethod
+    def store_time_series(symbol, time_series, high_water_mark=None, bulk=True, outputsize='full'):
+        # Filter data from the last 2 years
+        two_years_ago = datetime.now().date() - timedelta(days=HISTORY_DAYS)
+        stock_data_list = []
+        records = []
 
-                if date >= two_years_ago:
+        for date_str, price_data in time_series.items():
+            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+
+            if date >= two_years_ago and (high_water_mark is None or date > high_water_mark):
+                if bulk:
+                    records.append(FinancialDataService.parse_price_data(date, price_data))
+                else:
                     stock_data, created = StockData.objects.update_or_create(
                         stock_symbol=symbol,
                         date=date,
@@ -58,21 +146,138 @@ class FinancialDataService:
                         }
                     )
                     logger.info(f"Stored data for {symbol} on {date} (created={created})")
-                    stock_data_list.append({
-                        'date': date_str,
-                        'open': price_data['1. open'],
-                        'close': price_data['4. close'],
-                        'high': price_data['2. high'],
-                        'low': price_data['3. low'],
-                        'volume': price_data['5. volume'],
-                    })
-
-            logger.info(f"Fetched and processed {len(stock_data_list)} records for {symbol}")
-            return stock_data_list
+                stock_data_list.append({
+                    'date': date_str,
+                    'open': price_data['1. open'],
+                    'close': price_data['4. close'],
+                    'high': price_data['2. high'],
+                    'low': price_data['3. low'],
+                    'volume': price_data['5. volume'],
+                })
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Network request error: {e}")
-            raise SystemExit(e)
-        except ValueError as ve:
-            logger.error(f"Data processing error: {ve}")
-            return str(ve)
+        if bulk:
+            FinancialDataService.bulk_store_stock_data(symbol, records)
+        elif stock_data_list:
+            PriceSeriesRepository.invalidate(symbol)
+
+        logger.info(
+            f"Fetched and processed {len(stock_data_list)} records for {symbol} "
+            f"(outputsize={outputsize}, high_water_mark={high_water_mark})"
+        )
+        return stock_data_list
+
+    @staticmethod
+    def stored_records(symbol):
+        """The symbol's stored rows from the last 2 years, newest first, in the shape fetch_data_view returns.
+
+        An incremental fetch only stores rows past the high-water mark; this serves the whole stored series,
+        from the price archive when the symbol is archived.
+        """
+        columns = PriceArchive.load(symbol)
+        if columns is None:
+            fields = [field for field, _ in COLUMNS.values() if field != 'date']
+            loaded = PriceLoader.load_many([symbol], fields).get(symbol)
+            if loaded is None:
+                return []
+            columns = PriceArchive.columns_from_loader(loaded)
+
+        first = (datetime.now().date() - timedelta(days=HISTORY_DAYS)).toordinal()
+        start = int(np.searchsorted(columns['date'], first))
+        return [
+            {
+                'date': datetime.fromordinal(int(columns['date'][i])).date().isoformat(),
+                'open': f"{columns['open'][i]:.2f}",
+                'close': f"{columns['close'][i]:.2f}",
+                'high': f"{columns['high'][i]:.2f}",
+                'low': f"{columns['low'][i]:.2f}",
+                'volume': str(int(columns['volume'][i])),
+            }
+            for i in range(len(columns['date']) - 1, start - 1, -1)
+        ]
+
+    @staticmethod
+    def get_high_water_mark(symbol):
+        return StockData.objects.filter(stock_symbol=symbol).aggregate(Max('date'))['date__max']
+
+    @staticmethod
+    def get_outputsize(high_water_mark):
+        if high_water_mark is None:
+            return 'full'
+        gap = (datetime.now().date() - high_water_mark).days
+        return 'compact' if gap <= COMPACT_MAX_GAP_DAYS else 'full'
+
+    @staticmethod
+    def parse_price_data(date, price_data):
+        # Quantize up front so values compare equal to what DecimalField(decimal_places=2) stores.
+        return {
+            'date': date,
+            'open_price': Decimal(price_data['1. open']).quantize(CENTS, rounding=ROUND_HALF_UP),
+            'close_price': Decimal(price_data['4. close']).quantize(CENTS, rounding=ROUND_HALF_UP),
+            'high_price': Decimal(price_data['2. high']).quantize(CENTS, rounding=ROUND_HALF_UP),
+            'low_price': Decimal(price_data['3. low']).quantize(CENTS, rounding=ROUND_HALF_UP),
+            'volume': int(price_data['5. volume']),
+        }
+
+    @staticmethod
+    def publish_changes(symbol, created, updated):
+        # Runs once the rows are committed, so readers never cache old rows under the new version.
+        # The archive is synced first: a reader that sees the new version must find the new rows there.
+        PriceArchive.sync(symbol, created, updated)
+        version = DataVersion.bump(symbol)
+        if updated:
+            PriceSeriesRepository.invalidate(symbol)
+        else:
+            PriceSeriesRepository.append(
+                symbol, [row.date for row in created], [row.close_price for row in created], version
+            )
+
+    @staticmethod
+    def bulk_store_stock_data(symbol, records):
+        """Diff parsed records against stored rows and write only new or changed ones in batches."""
+        if not records:
+            logger.info(f"No records to store for {symbol}")
+            return 0, 0
+
+        dates = [record['date'] for record in records]
+        existing = {
+            row.date: row
+            for row in StockData.objects.filter(
+                stock_symbol=symbol, date__gte=min(dates), date__lte=max(dates)
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for record in records:
+            row = existing.get(record['date'])
+            if row is None:
+                to_create.append(StockData(stock_symbol=symbol, **record))
+            elif any(getattr(row, field) != record[field] for field in PRICE_FIELDS):
+                for field in PRICE_FIELDS:
+                    setattr(row, field, record[field])
+                to_update.append(row)
+
+        with transaction.atomic():
+            if to_create:
+                # A concurrent ingest may have inserted the same dates since the diff; let the
+                # (stock_symbol, date) constraint turn those into updates instead of errors.
+                StockData.objects.bulk_create(
+                    to_create,
+                    batch_size=BULK_BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=['stock_symbol', 'date'],
+                    update_fields=PRICE_FIELDS,
+                )
+            if to_update:
+                StockData.objects.bulk_update(to_update, PRICE_FIELDS, batch_size=BULK_BATCH_SIZE)
+
+        if to_create or to_update:
+            transaction.on_commit(
+                lambda: FinancialDataService.publish_changes(symbol, to_create, to_update)
+            )
+
+        logger.info(
+            f"Stored data for {symbol}: {len(to_create)} created, {len(to_update)} updated, "
+            f"{len(records) - len(to_create) - len(to_update)} unchanged"
+        )
+        return len(to_create), len(to_update)
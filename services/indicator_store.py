@@ -0,0 +1,268 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+from django.conf import settings
+from stocks_app.models import IndicatorSeries, StockData
+from services.price_series_repository import PriceSeriesRepository
+
+logger = logging.getLogger(__name__)
+
+
+def rolling_sums(close, start, window, state):
+    """Extend the windowed sums of `close - shift` and their squares from `start` to the end of `close`.
+
+    Returns the (sum, sum of squares) over the window ending at each new close, and the new state. Sums
+    of prices shifted by the first close stay small, which keeps the variance free of cancellation.
+    """
+    if start == 0 or not state:
+        state = {'shift': float(close[0]), 'sum': 0.0, 'sumsq': 0.0}
+    shift = state['shift']
+    positions = np.arange(start, len(close))
+    added = close[start:] - shift
+    leaving = np.where(positions >= window, close[np.maximum(positions - window, 0)] - shift, 0.0)
+    sums = state['sum'] + np.cumsum(added - leaving)
+    sumsqs = state['sumsq'] + np.cumsum(added * added - leaving * leaving)
+    if len(sums):
+        state = {'shift': shift, 'sum': float(sums[-1]), 'sumsq': float(sumsqs[-1])}
+    return sums, sumsqs, positions, state
+
+
+def extend_sma(close, start, window, state):
+    sums, _, positions, state = rolling_sums(close, start, window, state)
+    values = np.where(positions >= window - 1, state['shift'] + sums / window, np.nan)
+    return values, state
+
+
+def extend_std(close, start, window, state):
+    """Population standard deviation of the closes over the window, as used for Bollinger bands."""
+    sums, sumsqs, positions, state = rolling_sums(close, start, window, state)
+    variance = np.maximum(sumsqs / window - (sums / window) ** 2, 0.0)
+    values = np.where(positions >= window - 1, np.sqrt(variance), np.nan)
+    return values, state
+
+
+def extend_rsi(close, start, window, state):
+    """Wilder's RSI: simple averages of the first `window` gains and losses, then exponential smoothing.
+
+    Until the first value, the state holds the running totals of gains and losses; after it, the averages.
+    """
+    gain = state.get('gain', 0.0) if start else 0.0
+    loss = state.get('loss', 0.0) if start else 0.0
+    values = np.full(len(close) - start, np.nan)
+    offset = max(start - 1, 0)
+    closes = close[offset:].tolist()
+    for i in range(max(start, 1), len(close)):
+        change = closes[i - offset] - closes[i - offset - 1]
+        up, down = max(change, 0.0), max(-change, 0.0)
+        if i < window:
+            gain, loss = gain + up, loss + down
+            continue
+        if i == window:
+            gain, loss = (gain + up) / window, (loss + down) / window
+        else:
+            gain = (gain * (window - 1) + up) / window
+            loss = (loss * (window - 1) + down) / window
+        if loss:
+            values[i - start] = 100.0 - 100.0 / (1.0 + gain / loss)
+        else:
+            values[i - start] = 100.0 if gain else 50.0
+    return values, {'gain': gain, 'loss': loss}
+
+
+INDICATORS = {
+    'sma': extend_sma,
+    'std': extend_std,
+    'rsi': extend_rsi,
+}
+
+
+class IndicatorStore:
+    """Precomputed indicator series per (symbol, indicator, window), extended as new closes arrive.
+
+    Each stored series covers a prefix of the symbol's price series, identified by a digest of its dates
+    and closes. Reads extend it from its running state when closes were appended, and recompute it when
+    the covered closes changed, so no write path has to invalidate it. Series read at the current data
+    version are also kept in a process-wide LRU.
+    """
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+    _bytes = 0
+    computed = 0
+    extended = 0
+    loaded = 0
+
+    @staticmethod
+    def max_bytes():
+        return getattr(settings, 'INDICATOR_CACHE_BYTES', 32 * 1024 * 1024)
+
+    @staticmethod
+    def presets():
+        """The (indicator, window) pairs precomputed by `manage.py build_indicators` and after ingests."""
+        specs = []
+        for item in getattr(settings, 'INDICATOR_PRESETS', []):
+            name, _, window = item.partition(':')
+            specs.append(IndicatorStore.validate(name, window))
+        return specs
+
+    @staticmethod
+    def validate(name, window):
+        try:
+            window = int(window)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid window for indicator '{name}': {window!r}")
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator '{name}', expected one of: {', '.join(INDICATORS)}")
+        if window < 1:
+            raise ValueError(f"Indicator window must be positive, got {window}")
+        return name, window
+
+    @staticmethod
+    def digest(series, length):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(series.dates[:length].tobytes())
+        digest.update(series.close[:length].tobytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def get(cls, series, name, window):
+        return cls.get_many(series, [(name, window)])[0]
+
+    @classmethod
+    def get_many(cls, series, specs):
+        """Indicator arrays aligned with `series` (NaN where undefined), in the order of `specs`."""
+        specs = [cls.validate(name, window) for name, window in specs]
+        found = {}
+        if series.version is not None:
+            with cls._lock:
+                for spec in specs:
+                    entry = cls._cache.get((series.symbol, *spec))
+                    if entry is not None and entry[0] == series.version and len(entry[1]) == len(series):
+                        cls._cache.move_to_end((series.symbol, *spec))
+                        found[spec] = entry[1]
+
+        missing = [spec for spec in dict.fromkeys(specs) if spec not in found]
+        if missing:
+            rows = {
+                (row.indicator, row.window): row
+                for row in IndicatorSeries.objects.filter(
+                    stock_symbol=series.symbol,
+                    indicator__in={name for name, _ in missing},
+                    window__in={window for _, window in missing},
+                )
+            }
+            to_save = []
+            for spec in missing:
+                values, row = cls.refresh(series, spec, rows.get(spec))
+                if row is not None:
+                    to_save.append(row)
+                values.flags.writeable = False
+                found[spec] = values
+                if series.version is not None:
+                    cls._put((series.symbol, *spec), series.version, values)
+            if to_save:
+                IndicatorSeries.objects.bulk_create(
+                    to_save,
+                    update_conflicts=True,
+                    unique_fields=['stock_symbol', 'indicator', 'window'],
+                    update_fields=['first_date', 'last_date', 'length', 'digest', 'values', 'state', 'updated_at'],
+                )
+        return [found[spec] for spec in specs]
+
+    @classmethod
+    def refresh(cls, series, spec, row):
+        """The indicator over all of `series`, plus the row to store if the stored one had to change."""
+        name, window = spec
+        close = series.close
+        if row is not None and row.length <= len(series) and row.digest == cls.digest(series, row.length):
+            stored = np.frombuffer(bytes(row.values), dtype='<f8')
+            if row.length == len(series):
+                cls.loaded += 1
+                return stored.astype(np.float64), None
+            new, state = INDICATORS[name](close, row.length, window, row.state)
+            values = np.concatenate((stored, new))
+            cls.extended += 1
+        else:
+            values, state = INDICATORS[name](close, 0, window, None)
+            cls.computed += 1
+
+        return values, IndicatorSeries(
+            stock_symbol=series.symbol,
+            indicator=name,
+            window=window,
+            first_date=date.fromordinal(int(series.dates[0])),
+            last_date=series.last_date,
+            length=len(series),
+            digest=cls.digest(series, len(series)),
+            values=values.astype('<f8').tobytes(),
+            state=state,
+        )
+
+    @classmethod
+    def _put(cls, key, version, values):
+        with cls._lock:
+            previous = cls._cache.pop(key, None)
+            if previous is not None:
+                cls._bytes -= previous[1].nbytes
+            if values.nbytes > cls.max_bytes():
+                return
+            cls._cache[key] = (version, values)
+            cls._bytes += values.nbytes
+            while cls._bytes > cls.max_bytes():
+                _, (_, evicted) = cls._cache.popitem(last=False)
+                cls._bytes -= evicted.nbytes
+
+    @staticmethod
+    def bollinger(series, window=20, width=2.0):
+        """Middle, upper and lower Bollinger bands: the SMA plus and minus `width` standard deviations."""
+        middle, std = IndicatorStore.get_many(series, [('sma', window), ('std', window)])
+        return middle, middle + width * std, middle - width * std
+
+    @staticmethod
+    def update_many(symbols, specs=None):
+        """Bring the presets (or `specs`) and every indicator already stored for the symbols up to date.
+
+        Returns the number of series brought up to date per symbol; symbols without prices are skipped.
+        """
+        specs = list(specs) if specs is not None else IndicatorStore.presets()
+        stored = {}
+        for symbol, name, window in IndicatorSeries.objects.filter(stock_symbol__in=symbols).values_list(
+            'stock_symbol', 'indicator', 'window'
+        ):
+            stored.setdefault(symbol, []).append((name, window))
+
+        updated = {}
+        series_by_symbol = PriceSeriesRepository.get_many(symbols)
+        for symbol in symbols:
+            series = series_by_symbol.get(symbol)
+            if series is None:
+                continue
+            wanted = list(dict.fromkeys(specs + stored.get(symbol, [])))
+            IndicatorStore.get_many(series, wanted)
+            updated[symbol] = len(wanted)
+        logger.info(f"Updated indicators for {len(updated)}/{len(symbols)} symbols")
+        return updated
+
+    @staticmethod
+    def all_symbols():
+        return list(StockData.objects.values_list('stock_symbol', flat=True).distinct().order_by('stock_symbol'))
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._cache.clear()
+            cls._bytes = 0
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {
+                'series': len(cls._cache),
+                'bytes': cls._bytes,
+                'computed': cls.computed,
+                'extended': cls.extended,
+                'loaded': cls.loaded,
+            }
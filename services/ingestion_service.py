@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.db import DatabaseError
+from django.db.models import Max
+from stocks_app.models import StockData
+from services.financial_data_service import FinancialDataService, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+ALPHA_VANTAGE_REQUESTS_PER_MINUTE = int(os.getenv('ALPHA_VANTAGE_REQUESTS_PER_MINUTE', '5'))
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by all workers so the whole batch stays under the API quota."""
+
+    def __init__(self, rate_per_minute, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def penalize(self, seconds):
+        # Drain the bucket so every worker backs off, not just the one that hit the limit.
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class IngestionService:
+    @staticmethod
+    def create_session(pool_size=10, retries=3, backoff_factor=0.5):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=['GET'],
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def get_high_water_marks(symbols):
+        return dict(
+            StockData.objects.filter(stock_symbol__in=symbols)
+            .values('stock_symbol')
+            .annotate(last_date=Max('date'))
+            .values_list('stock_symbol', 'last_date')
+        )
+
+    @staticmethod
+    def fetch_with_backoff(symbol, outputsize, session, bucket, base_url=None, max_retries=3, backoff=15.0):
+        for attempt in range(max_retries + 1):
+            bucket.acquire()
+            try:
+                return FinancialDataService.request_time_series(
+                    symbol, outputsize, http=session, base_url=base_url
+                )
+            except RateLimitError:
+                if attempt == max_retries:
+                    raise
+                delay = backoff * 2 ** attempt
+                logger.warning(f"Rate limited on {symbol}, backing off {delay:.1f}s (attempt {attempt + 1})")
+                bucket.penalize(delay)
+
+    @staticmethod
+    def ingest_symbols(symbols, max_workers=4, requests_per_minute=None, session=None, bucket=None,
+                       base_url=None, max_retries=3, backoff=15.0):
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        session = session or IngestionService.create_session(pool_size=max_workers)
+        bucket = bucket or TokenBucket(requests_per_minute or ALPHA_VANTAGE_REQUESTS_PER_MINUTE)
+        high_water_marks = IngestionService.get_high_water_marks(symbols)
+        outputsizes = {
+            symbol: FinancialDataService.get_outputsize(high_water_marks.get(symbol)) for symbol in symbols
+        }
+        results = {}
+
+        logger.info(f"Ingesting {len(symbols)} symbols with {max_workers} workers")
+        started = time.perf_counter()
+
+        # Workers only do HTTP; rows are written on this thread as each response arrives,
+        # so the DB sees one connection and writes overlap with the remaining fetches.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    IngestionService.fetch_with_backoff,
+                    symbol,
+                    outputsizes[symbol],
+                    session,
+                    bucket,
+                    base_url,
+                    max_retries,
+                    backoff,
+                ): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    time_series = future.result()
+                    rows = FinancialDataService.store_time_series(
+                        symbol, time_series, high_water_mark=high_water_marks.get(symbol),
+                        outputsize=outputsizes[symbol]
+                    )
+                    results[symbol] = {'status': 'ok', 'records': len(rows)}
+                except (ValueError, requests.exceptions.RequestException, DatabaseError) as e:
+                    logger.error(f"Ingestion failed for {symbol}: {e}")
+                    results[symbol] = {'status': 'error', 'error': str(e)}
+                except KeyError as e:
+                    # A day in the payload lacks a price field; that symbol's rows were not written.
+                    logger.error(f"Ingestion failed for {symbol}: malformed data, missing {e}")
+                    results[symbol] = {'status': 'error', 'error': f"Malformed data: missing {e}"}
+
+        failed = sum(1 for result in results.values() if result['status'] == 'error')
+        logger.info(
+            f"Ingested {len(symbols) - failed}/{len(symbols)} symbols in {time.perf_counter() - started:.1f}s"
+        )
+        return results
@@ -0,0 +1,266 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import math
+import random
+import threading
+import time
+from django.conf import settings
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time to build a response, by view, method and status.', SECONDS_BUCKETS),
+    'http_request_db_queries': ('Database queries per sampled request, by view.', QUERY_BUCKETS),
+    'http_request_db_duration_seconds': ('Time spent in database queries per sampled request, by view.', SECONDS_BUCKETS),
+    'span_duration_seconds': ('Duration of expensive steps within sampled requests.', SECONDS_BUCKETS),
+}
+
+# The sampled request (or block) running in this context, None when it is not sampled. asgiref copies
+# the context into sync_to_async threads, so queries and spans on the blocking executor are attributed too.
+_current = contextvars.ContextVar('metrics_sample', default=None)
+
+
+class Sample:
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Span:
+    """Times its block into span_duration_seconds{span=name}, only when the current request is sampled."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if _current.get() is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            Metrics.observe('span_duration_seconds', time.perf_counter() - self.start, span=self.name)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting queries and their time for the sampled request."""
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created fires again on reconnect, for the same wrapper object.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Metrics:
+    """Per-process latency histograms and span timings, rendered in the Prometheus text format.
+
+    Every request's latency is recorded. A METRICS_SAMPLE_RATE fraction of requests is also sampled:
+    their database queries are counted and timed, and their spans recorded. Outside sampled requests,
+    spans and the query recorder cost one context variable lookup.
+    """
+
+    _lock = threading.Lock()
+    _histograms = {}
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'METRICS_ENABLED', True)
+
+    @staticmethod
+    def sample_rate():
+        return getattr(settings, 'METRICS_SAMPLE_RATE', 0.1)
+
+    @classmethod
+    def observe(cls, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with cls._lock:
+            histogram = cls._histograms.get(key)
+            if histogram is None:
+                histogram = cls._histograms[key] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    @staticmethod
+    def span(name):
+        return Span(name)
+
+    @staticmethod
+    def timed(name):
+        """Decorator form of span() for sync and async functions."""
+        def decorate(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with Span(name):
+                        return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with Span(name):
+                        return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    @staticmethod
+    def start_request(sampled=None):
+        """Begin timing a request; returns the state finish_request() needs, or None when disabled."""
+        if not Metrics.enabled():
+            return None
+        if sampled is None:
+            rate = Metrics.sample_rate()
+            sampled = rate > 0 and random.random() < rate
+        sample = Sample() if sampled else None
+        return time.perf_counter(), sample, _current.set(sample)
+
+    @staticmethod
+    def finish_request(state, request, response):
+        if state is None:
+            return
+        start, sample, token = state
+        elapsed = time.perf_counter() - start
+        _current.reset(token)
+
+        match = getattr(request, 'resolver_match', None)
+        # The URL pattern's name, never the raw path, so label cardinality stays bounded.
+        view = match.view_name if match is not None and match.view_name else 'unmatched'
+        status = str(response.status_code) if response is not None else '500'
+        Metrics.observe('http_request_duration_seconds', elapsed, view=view, method=request.method, status=status)
+        if sample is not None:
+            Metrics.observe('http_request_db_queries', sample.queries, view=view)
+            Metrics.observe('http_request_db_duration_seconds', sample.db_seconds, view=view)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._histograms.clear()
+
+    @classmethod
+    def histogram_lines(cls):
+        with cls._lock:
+            snapshot = {key: (list(h.counts), h.sum) for key, h in cls._histograms.items()}
+
+        lines = []
+        for name, (description, buckets) in HISTOGRAMS.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+            for (metric, labels), (counts, total) in sorted(snapshot.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip((*buckets, math.inf), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else format_value(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+    @staticmethod
+    def service_lines():
+        """Counters and gauges from the caches and model registry the services already keep."""
+        from django.core.cache import cache
+        from services.indicator_store import IndicatorStore
+        from services.model_registry import ModelRegistry
+        from services.price_archive import PriceArchive
+        from services.price_series_repository import PriceSeriesRepository
+        from services.report_service import ReportService
+
+        lines = []
+        report_stats = ReportService.cache_stats()
+        lines += family('report_cache_events_total', 'counter', 'Report, chart and PDF cache lookups by outcome.', [
+            ({'kind': kind, 'event': event}, count)
+            for kind, counters in report_stats.items() for event, count in counters.items()
+        ])
+
+        series = PriceSeriesRepository.stats()
+        lines += family('price_series_cache_events_total', 'counter', 'In-process price series cache events.', [
+            ({'event': event}, series[event]) for event in ('hits', 'misses', 'shared_hits', 'evictions')
+        ])
+        lines += family('price_series_cache_bytes', 'gauge', 'Bytes held by the in-process price series cache.',
+                        [({}, series['bytes'])])
+        lines += family('price_series_cache_symbols', 'gauge', 'Symbols held by the in-process price series cache.',
+                        [({}, series['symbols'])])
+
+        archive = PriceArchive.stats()
+        if archive['enabled']:
+            lines += family('price_archive_events_total', 'counter', 'On-disk price archive reads and writes.', [
+                ({'event': event}, archive[event]) for event in ('reads', 'misses', 'appends', 'rebuilds', 'invalidations')
+            ])
+
+        indicators = IndicatorStore.stats()
+        lines += family(
+            'indicator_store_series_total', 'counter', 'Indicator series read as stored, extended or recomputed.',
+            [({'event': event}, indicators[event]) for event in ('loaded', 'extended', 'computed')],
+        )
+
+        models = ModelRegistry.stats()
+        lines += family('model_registry_events_total', 'counter', 'Model registry lookups, reloads, load errors and evictions.', [
+            ({'event': event}, models[event]) for event in ('hits', 'misses', 'reloads', 'load_errors', 'evictions')
+        ])
+        lines += family('model_registry_load_seconds_total', 'counter', 'Time spent loading model artifacts.',
+                        [({}, models['load_seconds_total'])])
+        lines += family('model_registry_models', 'gauge', 'Model artifacts resident in this process.',
+                        [({}, len(models['models']))])
+
+        if hasattr(cache, 'stats'):
+            backend = cache.stats()
+            lines += family('cache_backend_entries', 'gauge', 'Entries in the shared cache backend.',
+                            [({}, backend['entries'])])
+            lines += family('cache_backend_bytes', 'gauge', 'Bytes stored in the shared cache backend.',
+                            [({}, backend['bytes'])])
+        return lines
+
+    @staticmethod
+    def render():
+        return '\n'.join(Metrics.histogram_lines() + Metrics.service_lines()) + '\n'
+
+
+def family(name, kind, description, samples):
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{format_labels(tuple(sorted(labels.items())))} {format_value(value)}" for labels, value in samples]
+    return lines
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
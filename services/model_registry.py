@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+import joblib
+from django.conf import settings
+from ml.linear_regression import LinearRegression
+
+logger = logging.getLogger(__name__)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Compact .npy coefficient artifacts are memory-mapped; anything else is assumed to be a joblib pickle.
+LOADERS = {
+    '.npy': LinearRegression.load,
+    '.json': load_json,
+}
+
+
+class ModelRegistry:
+    """Loads each model file once per process and hot-swaps it when the file's mtime or size changes.
+
+    Requests that arrive while a changed file is being reloaded keep getting the previous model
+    instead of waiting for the load, and a failed reload leaves the previous model in place.
+    At most MODEL_REGISTRY_MAX_MODELS files are kept; the least recently used are dropped first,
+    so artifacts of superseded versions age out once their latest.json pointers move on.
+    """
+
+    _models = OrderedDict()
+    _lock = threading.Lock()
+    _load_locks = {}
+    hits = 0
+    misses = 0
+    reloads = 0
+    load_errors = 0
+    load_seconds_total = 0.0
+    evictions = 0
+
+    @staticmethod
+    def check_interval():
+        return getattr(settings, 'MODEL_REGISTRY_CHECK_INTERVAL', 2.0)
+
+    @staticmethod
+    def max_models():
+        return getattr(settings, 'MODEL_REGISTRY_MAX_MODELS', 1000)
+
+    @classmethod
+    def _load_lock(cls, path):
+        with cls._lock:
+            return cls._load_locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def loader_for(path):
+        return LOADERS.get(os.path.splitext(path)[1], joblib.load)
+
+    @classmethod
+    def get(cls, path, loader=None):
+        path = os.path.abspath(path)
+        loader = loader or cls.loader_for(path)
+        entry = cls._models.get(path)
+        now = time.monotonic()
+
+        if entry is not None and now - entry['checked_at'] < cls.check_interval():
+            cls.hits += 1
+            cls._touch(path)
+            return entry['model']
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if entry is None:
+                raise
+            logger.warning(f"Model file {path} disappeared, keeping the loaded version")
+            entry['checked_at'] = now
+            cls.hits += 1
+            cls._touch(path)
+            return entry['model']
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        if entry is not None and entry['version'] == version:
+            entry['checked_at'] = now
+            cls.hits += 1
+            cls._touch(path)
+            return entry['model']
+
+        lock = cls._load_lock(path)
+        if not lock.acquire(blocking=entry is None):
+            # Another thread is already loading the new version; serve the current one meanwhile.
+            cls.hits += 1
+            return entry['model']
+
+        try:
+            current = cls._models.get(path)
+            if current is not None and current['version'] == version:
+                cls.hits += 1
+                return current['model']
+
+            started = time.perf_counter()
+            try:
+                model = loader(path)
+            except Exception as e:
+                cls.load_errors += 1
+                if current is None:
+                    raise
+                logger.error(f"Reloading model from {path} failed, keeping the loaded version: {e}")
+                current['checked_at'] = now
+                return current['model']
+            elapsed = time.perf_counter() - started
+
+            cls._store(path, {
+                'model': model,
+                'version': version,
+                'checked_at': time.monotonic(),
+                'loaded_at': time.time(),
+                'load_seconds': elapsed,
+            })
+            cls.load_seconds_total += elapsed
+            if current is None:
+                cls.misses += 1
+            else:
+                cls.reloads += 1
+            logger.info(f"Loaded model from {path} in {elapsed * 1000:.1f} ms")
+            return model
+        finally:
+            lock.release()
+
+    @classmethod
+    def _touch(cls, path):
+        with cls._lock:
+            if path in cls._models:
+                cls._models.move_to_end(path)
+
+    @classmethod
+    def _store(cls, path, entry):
+        with cls._lock:
+            cls._models[path] = entry
+            cls._models.move_to_end(path)
+            while len(cls._models) > cls.max_models():
+                evicted, _ = cls._models.popitem(last=False)
+                lock = cls._load_locks.get(evicted)
+                if lock is not None and not lock.locked():
+                    del cls._load_locks[evicted]
+                cls.evictions += 1
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._models.clear()
+
+    @classmethod
+    def stats(cls):
+        return {
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'reloads': cls.reloads,
+            'load_errors': cls.load_errors,
+            'load_seconds_total': cls.load_seconds_total,
+            'evictions': cls.evictions,
+            'models': {
+                path: {
+                    'version': entry['version'][0],
+                    'loaded_at': entry['loaded_at'],
+                    'load_seconds': entry['load_seconds'],
+                }
+                for path, entry in list(cls._models.items())
+            },
+        }
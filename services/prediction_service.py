@@ -1,43 +1,66 @@
-import numpy as np
+import io
 import os
-import joblib
+import numpy as np
 import logging
 from datetime import timedelta
-from stocks_app.models import StockData, PredictionData
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from stocks_app.models import PredictionData
 from services.data_fetching_service import DataFetchingService
+from services.data_version import DataVersion
+from services.price_series_repository import PriceSeriesRepository
+from services.model_registry import ModelRegistry
+from services.metrics import Metrics
+from services.training_service import COMBINED_MODEL, TrainingService
 
 logger = logging.getLogger(__name__)
 
+BULK_BATCH_SIZE = 500
+COMBINED_MODEL_FILES = (COMBINED_MODEL, 'combined_stock_price_model.pkl')
+
 class PredictionService:
     @staticmethod
     def load_combined_model():
-        model_path = 'models/combined_stock_price_model.pkl'
-        if os.path.exists(model_path):
+        # Prefer the compact .npy artifact; deployments that only have the legacy pickle keep working.
+        for filename in COMBINED_MODEL_FILES:
+            model_path = os.path.join(settings.MODEL_DIR, filename)
             try:
-                logger.info(f"Loading model from {model_path}")
-                return joblib.load(model_path)
+                return ModelRegistry.get(model_path)
+            except FileNotFoundError:
+                continue
             except Exception as e:
                 logger.error(f"Error loading model from {model_path}: {e}")
                 raise e
-        else:
-            logger.error("Combined model not found.")
-            raise FileNotFoundError("Combined model not found.")
+        logger.error("Combined model not found.")
+        raise FileNotFoundError("Combined model not found.")
+
+    @staticmethod
+    def load_model(symbol):
+        """The symbol's latest trained model and its pointer, or the combined model (and None) if it has none."""
+        pointer = TrainingService.latest_pointer(symbol)
+        if pointer is None:
+            return PredictionService.load_combined_model(), None
+        return TrainingService.load_artifact(pointer['artifact']), pointer
 
     @staticmethod
     def get_historical_data(symbol, days=60):
         try:
-            historical_data = StockData.objects.filter(stock_symbol=symbol).order_by('-date')[:days]
-            if len(historical_data) < days:
-                logger.warning(f"Only {len(historical_data)} days of data found for {symbol}, expected {days}.")
-            data = np.array([record.close_price for record in historical_data])
-            dates = [record.date for record in historical_data]
-            return data[::-1], dates[::-1]
+            series = PriceSeriesRepository.get(symbol)
+            if series is None:
+                logger.warning(f"Only 0 days of data found for {symbol}, expected {days}.")
+                return np.array([]), []
+            history = series.tail(days)
+            if len(history) < days:
+                logger.warning(f"Only {len(history)} days of data found for {symbol}, expected {days}.")
+            return history.close, history.date_list()
         except Exception as e:
             logger.error(f"Error fetching historical data for {symbol}: {e}")
             raise e
 
     @staticmethod
-    def predict_stock_prices(symbol, days=30):
+    def predict_stock_prices(symbol, days=None):
+        days = PredictionService.validate_horizon(days)
         DataFetchingService.ensure_data_fetched(symbol)
 
         X_train, dates = PredictionService.get_historical_data(symbol)
@@ -47,14 +70,21 @@ class PredictionService:
             logger.error(f"Not enough data to predict for {symbol}. Need at least 30 days of historical data.")
             raise ValueError("Not enough historical data to make predictions.")
 
-        X_train_days = np.arange(len(X_train)).reshape(-1, 1)
+        model, pointer = PredictionService.load_model(symbol)
 
-        model = PredictionService.load_combined_model()
+        if pointer is None:
+            # The combined model indexes days over the history window itself.
+            start = len(X_train)
+            scale = 1.0
+        else:
+            start = TrainingService.start_index(pointer, PriceSeriesRepository.get(symbol).dates)
+            scale = pointer['scale']
 
-        X_pred_days = np.arange(len(X_train_days), len(X_train_days) + days).reshape(-1, 1)
-        predicted_prices = model.predict(X_pred_days)
+        X_pred_days = np.arange(start, start + days).reshape(-1, 1)
+        with Metrics.span('model_inference'):
+            predicted_prices = model.predict(X_pred_days)
 
-        predicted_prices = np.array(predicted_prices)
+        predicted_prices = np.array(predicted_prices) * scale
 
         # Sanity check
         if np.any(predicted_prices < 0):
@@ -72,14 +102,158 @@ class PredictionService:
     @staticmethod
     def store_predictions(symbol, last_date, predicted_prices):
         try:
-            for i, predicted_price in enumerate(predicted_prices):
-                prediction_date = last_date + timedelta(days=i+1)
-                PredictionData.objects.update_or_create(
-                    stock_symbol=symbol,
-                    date=prediction_date,
-                    defaults={'predicted_price': predicted_price}
-                )
+            PredictionService.store_predictions_bulk({symbol: (last_date, predicted_prices)})
             logger.info(f"Predicted prices for {symbol} saved to database.")
         except Exception as e:
             logger.error(f"Error saving predicted prices for {symbol} to the database: {e}")
             raise e
+
+    @staticmethod
+    def predict_many(symbols, days=None, history_days=60):
+        days = PredictionService.validate_horizon(days)
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        series = PriceSeriesRepository.get_many(symbols)
+
+        errors = {}
+        # Fetching unknown symbols here would hold the request behind the upstream rate limit for minutes.
+        missing = [symbol for symbol in symbols if symbol not in series]
+        if missing:
+            logger.warning(f"No stored data for {len(missing)} symbols: {missing}")
+            for symbol in missing:
+                errors[symbol] = "No stored data; run `manage.py ingest` first."
+
+        histories = []
+        for symbol in symbols:
+            if symbol not in series:
+                continue
+            history = series[symbol].tail(history_days)
+            if len(history) < 30:
+                logger.error(f"Not enough data to predict for {symbol}. Need at least 30 days of historical data.")
+                errors[symbol] = "Not enough historical data to make predictions."
+            else:
+                histories.append((symbol, history))
+
+        groups = {}
+        for symbol, history in histories:
+            pointer = TrainingService.latest_pointer(symbol)
+            if pointer is None:
+                groups.setdefault(None, []).append((symbol, history, len(history), 1.0))
+            else:
+                start = TrainingService.start_index(pointer, series[symbol].dates)
+                groups.setdefault(pointer['artifact'], []).append((symbol, history, start, pointer['scale']))
+
+        predictions = {}
+        to_store = {}
+        for artifact, members in groups.items():
+            if artifact is None:
+                model = PredictionService.load_combined_model()
+            else:
+                model = TrainingService.load_artifact(artifact)
+
+            # One inference call per model over the stacked day indices of the symbols it serves.
+            offsets = np.array([start for _, _, start, _ in members])
+            scales = np.array([scale for _, _, _, scale in members])
+            X_pred_days = (offsets[:, None] + np.arange(days)[None, :]).reshape(-1, 1)
+            with Metrics.span('model_inference'):
+                predicted = np.asarray(model.predict(X_pred_days), dtype=np.float64).reshape(len(members), days)
+            predicted *= scales[:, None]
+
+            for (symbol, history, _, _), predicted_prices in zip(members, predicted):
+                if np.any(predicted_prices < 0):
+                    logger.error(f"Invalid predicted prices for {symbol}. Predicted prices should not be negative.")
+                    errors[symbol] = "Invalid predicted prices detected."
+                    continue
+                if np.any(predicted_prices > 1e6):
+                    logger.warning(f"Unusually high predicted prices detected for {symbol}.")
+                predictions[symbol] = predicted_prices
+                to_store[symbol] = (history.last_date, predicted_prices)
+
+        PredictionService.store_predictions_bulk(to_store)
+
+        logger.info(f"Predicted prices for {len(predictions)}/{len(symbols)} symbols")
+        return {'predictions': predictions, 'errors': errors}
+
+    @staticmethod
+    def validate_horizon(days):
+        if days is None:
+            return settings.PREDICTION_HORIZON_DAYS
+        if not 1 <= days <= settings.PREDICTION_MAX_HORIZON_DAYS:
+            raise ValueError(f"Prediction horizon must be between 1 and {settings.PREDICTION_MAX_HORIZON_DAYS} days.")
+        return days
+
+    @staticmethod
+    def store_predictions_bulk(predictions):
+        """Upsert {symbol: (last_date, predicted_prices)} as a set-based write instead of one query per day."""
+        rows = [
+            (symbol, last_date + timedelta(days=i + 1), predicted_price)
+            for symbol, (last_date, predicted_prices) in predictions.items()
+            for i, predicted_price in enumerate(predicted_prices)
+        ]
+        if not rows:
+            return 0
+        try:
+            # Re-predicting from unchanged data yields the same prices; skip those rows so the
+            # symbol's data version, and every report cached under it, only moves on a real change.
+            rows = PredictionService.changed_rows(rows)
+            if not rows:
+                logger.info(f"Predicted prices for {len(predictions)} symbols are unchanged.")
+                return 0
+            if connection.vendor == 'postgresql' and len(rows) >= settings.PREDICTION_COPY_THRESHOLD:
+                PredictionService._copy_upsert(rows)
+            else:
+                PredictionData.objects.bulk_create(
+                    [
+                        PredictionData(stock_symbol=symbol, date=date, predicted_price=predicted_price)
+                        for symbol, date, predicted_price in rows
+                    ],
+                    batch_size=BULK_BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=['stock_symbol', 'date'],
+                    update_fields=['predicted_price'],
+                )
+            DataVersion.bump_on_commit({symbol for symbol, _, _ in rows})
+            logger.info(f"Saved {len(rows)} predicted prices for {len(predictions)} symbols.")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error saving predicted prices to the database: {e}")
+            raise e
+
+    @staticmethod
+    def changed_rows(rows):
+        dates = [date for _, date, _ in rows]
+        stored = dict(
+            ((symbol, date), price)
+            for symbol, date, price in PredictionData.objects.filter(
+                stock_symbol__in={symbol for symbol, _, _ in rows}, date__gte=min(dates), date__lte=max(dates)
+            ).values_list('stock_symbol', 'date', 'predicted_price')
+        )
+        return [
+            (symbol, date, predicted_price)
+            for symbol, date, predicted_price in rows
+            if stored.get((symbol, date)) != Decimal(f"{float(predicted_price):.2f}")
+        ]
+
+    @staticmethod
+    def _copy_upsert(rows):
+        # COPY into a staging table and merge with one INSERT ... ON CONFLICT; a single round trip
+        # for the data regardless of horizon length.
+        buffer = io.StringIO()
+        for symbol, date, predicted_price in rows:
+            buffer.write(f"{symbol}\t{date.isoformat()}\t{float(predicted_price):.2f}\n")
+        buffer.seek(0)
+
+        quote = connection.ops.quote_name
+        table = quote(PredictionData._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE prediction_staging "
+                "(stock_symbol varchar(10), date date, predicted_price numeric(10, 2)) ON COMMIT DROP"
+            )
+            cursor.copy_expert("COPY prediction_staging (stock_symbol, date, predicted_price) FROM STDIN", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({quote('stock_symbol')}, {quote('date')}, {quote('predicted_price')}, "
+                f"{quote('timestamp')}) "
+                f"SELECT stock_symbol, date, predicted_price, NOW() FROM prediction_staging "
+                f"ON CONFLICT ({quote('stock_symbol')}, {quote('date')}) "
+                f"DO UPDATE SET {quote('predicted_price')} = EXCLUDED.{quote('predicted_price')}"
+            )
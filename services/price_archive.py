@@ -0,0 +1,279 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from services.price_loader import PRICE_FIELDS, PriceLoader
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = 'current.json'
+LOCK_FILE = '.lock'
+# Column name -> (StockData field, dtype). Dates are int32 proleptic ordinals, as in PriceSeries.
+COLUMNS = {
+    'date': ('date', np.int32),
+    'open': ('open_price', np.float64),
+    'high': ('high_price', np.float64),
+    'low': ('low_price', np.float64),
+    'close': ('close_price', np.float64),
+    'volume': ('volume', np.int64),
+}
+FIELDS = [field for field, _ in COLUMNS.values()]
+REBUILD_BATCH_SIZE = 100
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9][A-Z0-9.\-]*$')
+
+
+class PriceArchive:
+    """Optional columnar copy of StockData on disk, one .npy file per column and symbol, read memory-mapped.
+
+    Enabled by PRICE_ARCHIVE_DIR. Each symbol's columns are written to a new generation directory and
+    published by atomically replacing its current.json pointer, so readers never see a partial write and
+    mappings of an older generation stay valid after it is removed. Ingestion appends new rows (or
+    rebuilds the symbol from the table when stored rows changed) once they are committed; single-row
+    saves and deletes drop the symbol from the archive until the next ingest or `build_price_archive`.
+    Writes that bypass both (queryset update()) leave it stale; rebuild it after those.
+    """
+
+    reads = 0
+    misses = 0
+    appends = 0
+    rebuilds = 0
+    invalidations = 0
+
+    @staticmethod
+    def directory():
+        return getattr(settings, 'PRICE_ARCHIVE_DIR', None)
+
+    @staticmethod
+    def enabled():
+        return bool(PriceArchive.directory())
+
+    @staticmethod
+    def symbol_dir(symbol):
+        symbol = symbol.upper()
+        # Symbols come from URLs too; never let one name a path outside the archive.
+        if not SYMBOL_PATTERN.match(symbol):
+            return None
+        return os.path.join(PriceArchive.directory(), symbol)
+
+    @staticmethod
+    def pointer(symbol):
+        """The symbol's current generation (generation, rows, first_date, last_date), or None if not archived."""
+        symbol_dir = PriceArchive.symbol_dir(symbol)
+        if symbol_dir is None:
+            return None
+        try:
+            with open(os.path.join(symbol_dir, CURRENT_POINTER)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, symbol, columns=tuple(COLUMNS)):
+        """Read-only memory-mapped arrays of the symbol's archived columns, or None if it is not archived."""
+        if not cls.enabled():
+            return None
+        pointer = cls.pointer(symbol)
+        if pointer is None:
+            cls.misses += 1
+            return None
+        generation_dir = os.path.join(cls.symbol_dir(symbol), pointer['generation'])
+        try:
+            arrays = {
+                column: np.load(os.path.join(generation_dir, f"{column}.npy"), mmap_mode='r')
+                for column in columns
+            }
+        except FileNotFoundError:
+            # A writer replaced the generation between reading the pointer and the files.
+            cls.misses += 1
+            return None
+        if any(len(array) != pointer['rows'] for array in arrays.values()):
+            cls.misses += 1
+            return None
+        cls.reads += 1
+        return arrays
+
+    @classmethod
+    def load_many(cls, symbols, columns=tuple(COLUMNS)):
+        loaded = {}
+        for symbol in symbols:
+            arrays = cls.load(symbol, columns)
+            if arrays is not None:
+                loaded[symbol] = arrays
+        return loaded
+
+    @staticmethod
+    @contextmanager
+    def locked(symbol):
+        # Serializes writers of one symbol across threads and processes (ingest command, web workers).
+        symbol_dir = PriceArchive.symbol_dir(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        with open(os.path.join(symbol_dir, LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield symbol_dir
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def write(cls, symbol_dir, arrays):
+        """Write the columns as a new generation and point current.json at it; older generations are removed."""
+        generation = str(time.time_ns())
+        generation_dir = os.path.join(symbol_dir, generation)
+        os.makedirs(generation_dir)
+        for column, (_, dtype) in COLUMNS.items():
+            np.save(os.path.join(generation_dir, f"{column}.npy"), np.ascontiguousarray(arrays[column], dtype=dtype))
+
+        dates = arrays['date']
+        pointer_path = os.path.join(symbol_dir, CURRENT_POINTER)
+        tmp_path = f"{pointer_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'generation': generation,
+                'rows': len(dates),
+                'first_date': date.fromordinal(int(dates[0])).isoformat(),
+                'last_date': date.fromordinal(int(dates[-1])).isoformat(),
+            }, f, indent=2)
+        os.replace(tmp_path, pointer_path)
+
+        for name in os.listdir(symbol_dir):
+            if name != generation and name.isdigit():
+                shutil.rmtree(os.path.join(symbol_dir, name), ignore_errors=True)
+
+    @staticmethod
+    def unpublish(symbol_dir):
+        try:
+            os.remove(os.path.join(symbol_dir, CURRENT_POINTER))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def columns_from_rows(rows):
+        """Column arrays from (date, open, high, low, close, volume) rows sorted by date, last row per date kept."""
+        if not rows:
+            return None
+        days, opens, highs, lows, closes, volumes = zip(*rows)
+        dates = np.array([day.toordinal() for day in days], dtype=np.int32)
+        keep = np.append(dates[1:] != dates[:-1], True)
+        values = dict(zip(COLUMNS, (dates, opens, highs, lows, closes, volumes)))
+        return {column: np.array(values[column], dtype=dtype)[keep] for column, (_, dtype) in COLUMNS.items()}
+
+    @staticmethod
+    def columns_from_loader(loaded):
+        """Archive columns from PriceLoader output, prices converted from cents."""
+        columns = {}
+        for column, (field, _) in COLUMNS.items():
+            values = loaded[field]
+            columns[column] = PriceLoader.to_price(values) if field in PRICE_FIELDS else values
+        return columns
+
+    @classmethod
+    def rebuild_many(cls, symbols):
+        """Rewrite the symbols' archives from the table; returns the rows archived per symbol.
+
+        Symbols without stored rows are removed from the archive.
+        """
+        if not cls.enabled():
+            return {}
+        symbols = sorted({symbol.upper() for symbol in symbols if cls.symbol_dir(symbol) is not None})
+        archived = {}
+        for start in range(0, len(symbols), REBUILD_BATCH_SIZE):
+            batch = symbols[start:start + REBUILD_BATCH_SIZE]
+            # Read the rows while holding the locks, so an invalidation committed after the read waits
+            # for this write and then removes it. Locks are always taken in sorted order.
+            with ExitStack() as stack:
+                symbol_dirs = {symbol: stack.enter_context(cls.locked(symbol)) for symbol in batch}
+                loaded = PriceLoader.load_many(batch, [field for field in FIELDS if field != 'date'])
+                for symbol in batch:
+                    if symbol not in loaded:
+                        cls.unpublish(symbol_dirs[symbol])
+                        continue
+                    arrays = cls.columns_from_loader(loaded[symbol])
+                    cls.write(symbol_dirs[symbol], arrays)
+                    archived[symbol] = len(arrays['date'])
+                    cls.rebuilds += 1
+        logger.info(f"Archived {sum(archived.values())} rows for {len(archived)}/{len(symbols)} symbols")
+        return archived
+
+    @classmethod
+    def rebuild(cls, symbol):
+        return cls.rebuild_many([symbol]).get(symbol.upper(), 0)
+
+    @classmethod
+    def append(cls, symbol, created):
+        """Add newly committed StockData rows to the symbol's archive.
+
+        Falls back to a rebuild from the table when the symbol is not archived yet or the rows are not
+        all later than the archived ones.
+        """
+        if not cls.enabled() or cls.symbol_dir(symbol) is None:
+            return
+        rows = sorted(
+            ((row.date, row.open_price, row.high_price, row.low_price, row.close_price, row.volume) for row in created),
+            key=lambda row: row[0],
+        )
+        new = cls.columns_from_rows(rows)
+        if new is None:
+            return
+        with cls.locked(symbol) as symbol_dir:
+            current = cls.load(symbol)
+            if current is not None and new['date'][0] > current['date'][-1]:
+                cls.write(symbol_dir, {column: np.concatenate((current[column], new[column])) for column in COLUMNS})
+                cls.appends += 1
+                return
+        cls.rebuild(symbol)
+
+    @classmethod
+    def sync(cls, symbol, created, updated):
+        """Bring the archive in line with a committed ingest of `created` and `updated` rows."""
+        if not cls.enabled():
+            return
+        try:
+            if updated:
+                cls.rebuild(symbol)
+            elif created:
+                cls.append(symbol, created)
+        except OSError as e:
+            # Never serve a stale archive: drop the symbol so reads fall back to the table.
+            logger.error(f"Failed to update the price archive for {symbol}, removing it: {e}")
+            cls.invalidate(symbol)
+
+    @classmethod
+    def invalidate(cls, symbol):
+        symbol_dir = cls.symbol_dir(symbol) if cls.enabled() else None
+        if symbol_dir is None or not os.path.isdir(symbol_dir):
+            return
+        with cls.locked(symbol) as symbol_dir:
+            cls.unpublish(symbol_dir)
+        cls.invalidations += 1
+
+    @staticmethod
+    def invalidate_on_commit(symbol):
+        # Before commit, a concurrent rebuild could still archive the rows this transaction replaces.
+        if PriceArchive.enabled():
+            transaction.on_commit(lambda: PriceArchive.invalidate(symbol))
+
+    @staticmethod
+    def archived_symbols():
+        directory = PriceArchive.directory()
+        if not directory or not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if PriceArchive.pointer(name) is not None)
+
+    @classmethod
+    def stats(cls):
+        return {
+            'enabled': cls.enabled(),
+            'reads': cls.reads,
+            'misses': cls.misses,
+            'appends': cls.appends,
+            'rebuilds': cls.rebuilds,
+            'invalidations': cls.invalidations,
+        }
@@ -0,0 +1,241 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from services.data_version import DataVersion
+from services.price_archive import PriceArchive
+from services.price_loader import PriceLoader
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSeries:
+    """Compact per-symbol close series: dates as int32 proleptic ordinals, prices as float64."""
+
+    __slots__ = ('symbol', 'dates', 'close', 'loaded_at', 'version')
+
+    def __init__(self, symbol, dates, close, loaded_at=None, version=None):
+        self.symbol = symbol
+        self.dates = np.ascontiguousarray(dates, dtype=np.int32)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        self.version = version
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + self.close.nbytes
+
+    @property
+    def last_date(self):
+        return date.fromordinal(int(self.dates[-1]))
+
+    def tail(self, count):
+        return PriceSeries(self.symbol, self.dates[-count:], self.close[-count:], self.loaded_at, self.version)
+
+    def date_list(self):
+        return [date.fromordinal(ordinal) for ordinal in self.dates.tolist()]
+
+
+class PriceSeriesRepository:
+    """Process-wide LRU of price series shared by the backtest, prediction, report and fetch paths.
+
+    Cached series are tagged with the symbol's data version and dropped once it moves on. With a
+    process-local cache backend, writes from other processes never bump the versions seen here, so
+    series are also reloaded after PRICE_SERIES_CACHE_TTL seconds. With a shared backend, series
+    are also published there as a second level, so one process's load serves the others. Misses are
+    read from the memory-mapped price archive when PRICE_ARCHIVE_DIR is set, and from the table otherwise.
+
+    Reads inside an open transaction bypass the cache and the archive: they may see uncommitted rows
+    that could still be rolled back, so they must not leak into a process-wide cache.
+    """
+
+    _cache = OrderedDict()
+    _lock = threading.RLock()
+    _bytes = 0
+    hits = 0
+    misses = 0
+    shared_hits = 0
+    evictions = 0
+
+    @staticmethod
+    def max_bytes():
+        return getattr(settings, 'PRICE_SERIES_CACHE_BYTES', 64 * 1024 * 1024)
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, 'PRICE_SERIES_CACHE_TTL', 60)
+
+    @staticmethod
+    def cache_enabled():
+        return not connection.in_atomic_block
+
+    @classmethod
+    def get(cls, symbol):
+        return cls.get_many([symbol]).get(symbol)
+
+    @classmethod
+    def get_many(cls, symbols):
+        symbols = list(dict.fromkeys(symbols))
+        found = {}
+        versions = {}
+        if cls.cache_enabled():
+            # Read versions before loading, so rows written during the load leave the series stale.
+            versions = DataVersion.get_many(symbols)
+            expires = not DataVersion.is_shared()
+            now = time.monotonic()
+            with cls._lock:
+                for symbol in symbols:
+                    series = cls._cache.get(symbol)
+                    if series is None or series.version != versions[symbol.upper()]:
+                        continue
+                    if expires and now - series.loaded_at > cls.ttl():
+                        continue
+                    cls._cache.move_to_end(symbol)
+                    found[symbol] = series
+                cls.hits += len(found)
+                cls.misses += len(symbols) - len(found)
+
+        missing = [symbol for symbol in symbols if symbol not in found]
+        if missing:
+            shared = cls.cache_enabled() and DataVersion.is_shared()
+            loaded = cls.load_shared(missing, versions) if shared else {}
+            remaining = [symbol for symbol in missing if symbol not in loaded]
+            if remaining and cls.cache_enabled():
+                archived = cls.load_archived(remaining)
+                loaded.update(archived)
+                remaining = [symbol for symbol in remaining if symbol not in archived]
+            if remaining:
+                from_db = cls.load_many(remaining)
+                if shared:
+                    cls.store_shared(from_db.values(), versions)
+                loaded.update(from_db)
+            if cls.cache_enabled():
+                for series in loaded.values():
+                    series.version = versions[series.symbol.upper()]
+                    cls._put(series)
+            found.update(loaded)
+        return found
+
+    @staticmethod
+    def shared_key(symbol, version):
+        return f"price_series_{symbol.upper()}_{version}"
+
+    @classmethod
+    def load_shared(cls, symbols, versions):
+        """Series another process already loaded at the current data version, from the shared cache."""
+        keys = {cls.shared_key(symbol, versions[symbol.upper()]): symbol for symbol in symbols}
+        loaded = {
+            keys[key]: PriceSeries(keys[key], dates, close)
+            for key, (dates, close) in cache.get_many(list(keys)).items()
+        }
+        cls.shared_hits += len(loaded)
+        return loaded
+
+    @classmethod
+    def store_shared(cls, series_list, versions):
+        # Keyed by version, so entries never go stale and are left to the backend's LRU budget.
+        cache.set_many(
+            {cls.shared_key(series.symbol, versions[series.symbol.upper()]): (series.dates, series.close)
+             for series in series_list},
+            timeout=None,
+        )
+
+    @staticmethod
+    def load_archived(symbols):
+        """Series of the symbols in the on-disk price archive, backed by its memory-mapped columns."""
+        return {
+            symbol: PriceSeries(symbol, columns['date'], columns['close'])
+            for symbol, columns in PriceArchive.load_many(symbols, ('date', 'close')).items()
+        }
+
+    @staticmethod
+    def load_many(symbols):
+        loaded = {
+            symbol: PriceSeries(symbol, columns['date'], PriceLoader.to_price(columns['close_price']))
+            for symbol, columns in PriceLoader.load_many(symbols).items()
+        }
+        logger.debug(f"Loaded price series for {len(loaded)}/{len(symbols)} symbols")
+        return loaded
+
+    @classmethod
+    def _put(cls, series):
+        with cls._lock:
+            cls._discard(series.symbol)
+            if series.nbytes > cls.max_bytes():
+                return
+            cls._cache[series.symbol] = series
+            cls._bytes += series.nbytes
+            while cls._bytes > cls.max_bytes():
+                _, evicted = cls._cache.popitem(last=False)
+                cls._bytes -= evicted.nbytes
+                cls.evictions += 1
+
+    @classmethod
+    def _discard(cls, symbol):
+        series = cls._cache.pop(symbol, None)
+        if series is not None:
+            cls._bytes -= series.nbytes
+
+    @classmethod
+    def invalidate(cls, symbol):
+        with cls._lock:
+            cls._discard(symbol)
+
+    @classmethod
+    def append(cls, symbol, dates, closes, version=None):
+        """Extend a cached series with newly ingested rows, or invalidate it if they are not a pure append.
+
+        `version` is the data version the write bumped the symbol to; the cached series is only
+        extended if it was current right before that bump.
+        """
+        if not cls.cache_enabled():
+            cls.invalidate(symbol)
+            return
+        dates = np.array([day.toordinal() for day in dates], dtype=np.int32)
+        closes = np.array(closes, dtype=np.float64)
+        order = np.argsort(dates, kind='stable')
+        dates, closes = dates[order], closes[order]
+        with cls._lock:
+            series = cls._cache.get(symbol)
+            if series is None:
+                return
+            if len(dates) and dates[0] <= series.dates[-1]:
+                cls._discard(symbol)
+                return
+            if version is not None and series.version != version - 1:
+                cls._discard(symbol)
+                return
+            cls._put(PriceSeries(
+                symbol,
+                np.concatenate((series.dates, dates)),
+                np.concatenate((series.close, closes)),
+                series.loaded_at,
+                version,
+            ))
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._cache.clear()
+            cls._bytes = 0
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {
+                'symbols': len(cls._cache),
+                'bytes': cls._bytes,
+                'max_bytes': cls.max_bytes(),
+                'hits': cls.hits,
+                'misses': cls.misses,
+                'shared_hits': cls.shared_hits,
+                'evictions': cls.evictions,
+            }
@@ -1,33 +1,66 @@
-import matplotlib
-matplotlib.use('Agg')
-
-import matplotlib.pyplot as plt
-import io
 import base64
-from stocks_app.models import StockData, PredictionData
+import threading
+import time
+import uuid
+import logging
+import numpy as np
+from django.conf import settings
+from stocks_app.models import PredictionData
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from io import BytesIO
+from matplotlib.figure import Figure
 from services.data_fetching_service import DataFetchingService
 from services.backtesting_service import BacktestingService
 from services.prediction_service import PredictionService
-from django.core.cache import cache
+from services.price_series_repository import PriceSeriesRepository
+from services.indicator_store import IndicatorStore
+from services.data_version import DataVersion
+from services.metrics import Metrics
+from services.cache_backends import delete_if_equal
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+logger = logging.getLogger(__name__)
+
+REPORT_WAIT_POLL_SECONDS = 0.05
+REPORT_KINDS = ('report', 'chart', 'pdf')
+PROCESS_LOCAL_REPORT_TIMEOUT = 60 * 15
 
 
 class ReportService:
+    cache_counters = {kind: {'hits': 0, 'misses': 0, 'rebuilds': 0, 'waits': 0} for kind in REPORT_KINDS}
+    # get_or_build runs concurrently on WSGI request threads and on the ASGI views' blocking executor.
+    _counters_lock = threading.Lock()
+
     @staticmethod
     def fetch_actual_data(symbol):
         try:
-            stock_data = StockData.objects.filter(stock_symbol=symbol).order_by('-date')[:30]
-            if not stock_data.exists():
+            series = PriceSeriesRepository.get(symbol)
+            if series is None:
                 raise ValueError(f"No stock data available for {symbol}")
-            dates = [data.date for data in stock_data]
-            prices = [data.close_price for data in stock_data]
-            return dates[::-1], prices[::-1]
+            recent = series.tail(30)
+            return recent.date_list(), recent.close.tolist()
         except Exception as e:
             raise ValueError(f"Error fetching actual data: {e}")
 
+    @staticmethod
+    def fetch_indicators(symbol):
+        """The latest value of each report indicator, from the indicator store (None while undefined)."""
+        series = PriceSeriesRepository.get(symbol)
+        if series is None:
+            return {}
+        # One read for all of them; bollinger() is then served from the store's in-process cache.
+        sma_50, sma_200, rsi_14, _, _ = IndicatorStore.get_many(
+            series, [('sma', 50), ('sma', 200), ('rsi', 14), ('sma', 20), ('std', 20)]
+        )
+        _, upper, lower = IndicatorStore.bollinger(series, 20)
+        latest = {
+            'sma_50': sma_50, 'sma_200': sma_200, 'rsi_14': rsi_14,
+            'bollinger_upper_20': upper, 'bollinger_lower_20': lower,
+        }
+        return {name: None if np.isnan(values[-1]) else float(values[-1]) for name, values in latest.items()}
+
     @staticmethod
     def fetch_predicted_data(symbol):
         try:
@@ -41,36 +74,44 @@ class ReportService:
             raise ValueError(f"Error fetching predicted data: {e}")
 
     @staticmethod
+    @Metrics.timed('chart_render')
     def generate_graph(actual_dates, actual_prices, predicted_dates, predicted_prices):
+        """Render the actual vs. predicted chart and return it as raw PNG bytes."""
         if not actual_dates or not predicted_dates:
             raise ValueError("Cannot generate graph without data")
 
-        fig, ax1 = plt.subplots(figsize=(10, 5))
+        # A standalone Figure instead of pyplot: no global figure state, so concurrent renders are safe.
+        fig = Figure(figsize=(10, 5))
+        ax1 = fig.subplots()
 
         ax1.plot(actual_dates, actual_prices, label='Actual Prices', color='blue', marker='o')
         ax1.set_xlabel('Date')
         ax1.set_ylabel('Actual Prices', color='blue')
         ax1.tick_params(axis='y', labelcolor='blue')
+        ax1.tick_params(axis='x', labelrotation=45)
 
         ax2 = ax1.twinx()
         ax2.plot(predicted_dates, predicted_prices, label='Predicted Prices', color='red', linestyle='--', marker='x')
         ax2.set_ylabel('Predicted Prices', color='red')
         ax2.tick_params(axis='y', labelcolor='red')
 
-        plt.title('Actual vs Predicted Stock Prices')
-        plt.xticks(rotation=45)
-        plt.grid(True)
-
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
+        ax2.set_title('Actual vs Predicted Stock Prices')
+        ax2.grid(True)
 
-        graph_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-        plt.close()
-        buffer.close()
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
 
-        return graph_base64
+    @staticmethod
+    def get_chart(symbol, version, actual_dates, actual_prices, predicted_dates, predicted_prices):
+        chart_key = f"report_chart_{symbol}_{version}"
+        ReportService.get_or_build(
+            chart_key,
+            lambda: ReportService.generate_graph(actual_dates, actual_prices, predicted_dates, predicted_prices),
+            kind='chart',
+            latest_key=f"report_chart_{symbol}_latest",
+        )
+        return chart_key
 
     @staticmethod
     def ensure_data_ready(symbol):
@@ -83,48 +124,169 @@ class ReportService:
             raise ValueError(f"Error ensuring data is ready: {e}")
 
     @staticmethod
-    def generate_json_report(symbol):
-        cache_key = f"json_report_{symbol}"
-        cached_report = cache.get(cache_key)
-        if cached_report:
-            return cached_report
+    def cache_timeout():
+        """Entries are keyed by data version, so they only expire on their own when versions can't be trusted.
 
-        try:
-            backtest_result = ReportService.ensure_data_ready(symbol)
-            actual_dates, actual_prices = ReportService.fetch_actual_data(symbol)
-            predicted_dates, predicted_prices = ReportService.fetch_predicted_data(symbol)
-        except ValueError as e:
-            return {"error": str(e)}
+        With a process-local cache, ingests run by other processes never bump the versions this one
+        sees, so entries fall back to a fixed TTL there.
+        """
+        if settings.REPORT_CACHE_TIMEOUT is not None:
+            return settings.REPORT_CACHE_TIMEOUT
+        return None if DataVersion.is_shared() else PROCESS_LOCAL_REPORT_TIMEOUT
+
+    @staticmethod
+    def get_or_build(cache_key, build, refresh=False, kind='report', latest_key=None):
+        """Return the cached value for `cache_key`, building it at most once across concurrent callers.
+
+        The first caller to miss takes a lock with cache.add() and builds; the others wait for its
+        result instead of rendering the same report in parallel. Exceptions from `build` propagate and
+        nothing is cached, so a later caller retries.
+
+        `latest_key` remembers the last key built for the same report; the entry it points to is
+        deleted once a newer one replaces it, and the build is counted as a rebuild.
+        """
+        lock_key = f"{cache_key}:building"
+        deadline = time.monotonic() + settings.REPORT_BUILD_WAIT
+        waited = False
+        while True:
+            if not refresh:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    ReportService.count(kind, 'waits' if waited else 'hits')
+                    return cached
+
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, token, timeout=settings.REPORT_BUILD_LOCK_TIMEOUT):
+                try:
+                    # Another builder may have stored it and released the lock since the miss above.
+                    cached = None if refresh else cache.get(cache_key)
+                    if cached is not None:
+                        ReportService.count(kind, 'waits' if waited else 'hits')
+                        return cached
+                    previous = cache.get(latest_key) if latest_key else None
+                    ReportService.count(kind, 'rebuilds' if refresh or previous not in (None, cache_key) else 'misses')
+                    started = time.perf_counter()
+                    value = build()
+                    cache.set(cache_key, value, timeout=ReportService.cache_timeout())
+                    if latest_key:
+                        ReportService.replace_latest(latest_key, cache_key)
+                    logger.info(f"Built {cache_key} in {(time.perf_counter() - started) * 1000:.0f} ms")
+                    return value
+                finally:
+                    # Never release a lock that expired and was taken by another builder meanwhile.
+                    delete_if_equal(caches[DEFAULT_CACHE_ALIAS], lock_key, token)
+
+            # Another caller is building it; whatever it produces is fresh enough for a refresh too.
+            refresh = False
+            waited = True
+            while cache.get(lock_key) is not None and time.monotonic() < deadline:
+                time.sleep(REPORT_WAIT_POLL_SECONDS)
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for {cache_key} to be built elsewhere, building it here")
+                ReportService.count(kind, 'misses')
+                return build()
 
-        graph_base64 = ReportService.generate_graph(actual_dates, actual_prices, predicted_dates, predicted_prices)
+    @staticmethod
+    def count(kind, event):
+        with ReportService._counters_lock:
+            ReportService.cache_counters[kind][event] += 1
+
+    @staticmethod
+    def replace_latest(latest_key, cache_key):
+        previous = cache.get(latest_key)
+        cache.set(latest_key, cache_key, timeout=None)
+        if previous is not None and previous != cache_key:
+            cache.delete(previous)
+
+    @staticmethod
+    def build_report(symbol):
+        """Backtest, predict and render the chart once; both report formats are serialized from this."""
+        backtest_result = ReportService.ensure_data_ready(symbol)
+        # Read after ensure_data_ready, which may have ingested new rows or stored new predictions.
+        version = DataVersion.get(symbol)
+        actual_dates, actual_prices = ReportService.fetch_actual_data(symbol)
+        predicted_dates, predicted_prices = ReportService.fetch_predicted_data(symbol)
 
-        report = {
+        return {
             "symbol": symbol,
+            "version": version,
             "total_return": backtest_result.get('total_return', 0),
             "max_drawdown": backtest_result.get('max_drawdown', 0),
             "trades_executed": backtest_result.get('trades_executed', 0),
-            "graph": graph_base64
+            "indicators": ReportService.fetch_indicators(symbol),
+            "chart_key": ReportService.get_chart(
+                symbol, version, actual_dates, actual_prices, predicted_dates, predicted_prices
+            ),
         }
 
-        cache.set(cache_key, report, timeout=60 * 15)
+    @staticmethod
+    def get_report(symbol, refresh=False):
+        """The report summary for the symbol's current data version and its chart's PNG bytes.
+
+        The summary is rebuilt if its chart was evicted.
+        """
+        report = ReportService.get_versioned_report(symbol, refresh)
+        chart = cache.get(report['chart_key'])
+        if chart is None:
+            report = ReportService.get_versioned_report(symbol, refresh=True)
+            chart = cache.get(report['chart_key'])
+            if chart is None:
+                raise ValueError(f"Chart for {symbol} could not be cached")
+        return report, chart
+
+    @staticmethod
+    def get_versioned_report(symbol, refresh=False):
+        version = DataVersion.get(symbol)
+        cache_key = f"report_{symbol}_{version}"
+        latest_key = f"report_{symbol}_latest"
+        report = ReportService.get_or_build(
+            cache_key, lambda: ReportService.build_report(symbol), refresh=refresh, latest_key=latest_key
+        )
+        if report['version'] != version:
+            # The build itself moved the version (fresh rows or predictions); file the report under the
+            # version it was built from, and keep the requested key only long enough for waiters.
+            final_key = f"report_{symbol}_{report['version']}"
+            cache.set(final_key, report, timeout=ReportService.cache_timeout())
+            cache.set(latest_key, final_key, timeout=None)
+            cache.touch(cache_key, settings.REPORT_BUILD_WAIT)
         return report
 
     @staticmethod
-    def generate_pdf_report(symbol):
-        cache_key = f"pdf_report_{symbol}"
-        cached_report = cache.get(cache_key)
-        if cached_report:
-            return cached_report
+    def generate_json_report(symbol, refresh=False):
+        try:
+            report, chart = ReportService.get_report(symbol, refresh=refresh)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        # Base64 only at the JSON boundary; the cache holds the raw PNG.
+        json_report = {key: value for key, value in report.items() if key not in ('chart_key', 'version')}
+        json_report['graph'] = base64.b64encode(chart).decode('ascii')
+        return json_report
 
+    @staticmethod
+    def generate_pdf_report(symbol, refresh=False):
         try:
-            backtest_result = ReportService.ensure_data_ready(symbol)
-            actual_dates, actual_prices = ReportService.fetch_actual_data(symbol)
-            predicted_dates, predicted_prices = ReportService.fetch_predicted_data(symbol)
+            report, chart = ReportService.get_report(symbol, refresh=refresh)
+            return ReportService.get_pdf(report, chart, refresh=refresh)
         except ValueError as e:
+            logger.error(f"PDF report generation failed for {symbol}: {e}")
             return None
 
-        graph_base64 = ReportService.generate_graph(actual_dates, actual_prices, predicted_dates, predicted_prices)
+    @staticmethod
+    def get_pdf(report, chart, refresh=False):
+        symbol = report['symbol']
+        return ReportService.get_or_build(
+            f"pdf_report_{symbol}_{report['version']}",
+            lambda: ReportService.build_pdf_report(report, chart),
+            refresh=refresh,
+            kind='pdf',
+            latest_key=f"pdf_report_{symbol}_latest",
+        )
 
+    @staticmethod
+    @Metrics.timed('pdf_build')
+    def build_pdf_report(report, chart):
+        symbol = report['symbol']
         buffer = BytesIO()
         pdf = canvas.Canvas(buffer, pagesize=letter)
 
@@ -132,23 +294,36 @@ class ReportService:
         pdf.setFont("Helvetica-Bold", 18)
         pdf.drawString(100, 750, f"Stock Report for {symbol}")
         pdf.setFont("Helvetica", 14)
-        pdf.drawString(100, 730, f"Total Return: {backtest_result.get('total_return', 0):.2f}%")
-        pdf.drawString(100, 710, f"Max Drawdown: {backtest_result.get('max_drawdown', 0):.2f}%")
-        pdf.drawString(100, 690, f"Trades Executed: {backtest_result.get('trades_executed', 0)}")
+        pdf.drawString(100, 730, f"Total Return: {report['total_return']:.2f}%")
+        pdf.drawString(100, 710, f"Max Drawdown: {report['max_drawdown']:.2f}%")
+        pdf.drawString(100, 690, f"Trades Executed: {report['trades_executed']}")
 
         pdf.drawString(100, 670, "Comparison: Actual vs Predicted Stock Prices")
 
-        graph_img = base64.b64decode(graph_base64)
-        img_buffer = BytesIO(graph_img)
-
-        image = ImageReader(img_buffer)
+        image = ImageReader(BytesIO(chart))
         pdf.drawImage(image, 100, 400, width=400, height=200)
 
         pdf.showPage()
         pdf.save()
 
-        buffer.seek(0)
-        pdf_content = buffer.getvalue()
+        return buffer.getvalue()
 
-        cache.set(cache_key, pdf_content, timeout=60 * 15)
-        return pdf_content
+    @staticmethod
+    def warm_reports(symbols):
+        """Rebuild the cached report summary, chart and PDF for `symbols`, e.g. right after an ingest."""
+        results = {}
+        for symbol in dict.fromkeys(symbol.upper() for symbol in symbols):
+            try:
+                report, chart = ReportService.get_report(symbol, refresh=True)
+                ReportService.get_pdf(report, chart, refresh=True)
+                results[symbol] = {'status': 'ok'}
+            except ValueError as e:
+                logger.error(f"Warming reports for {symbol} failed: {e}")
+                results[symbol] = {'status': 'error', 'error': str(e)}
+        logger.info(f"Warmed reports for {sum(r['status'] == 'ok' for r in results.values())}/{len(results)} symbols")
+        return results
+
+    @staticmethod
+    def cache_stats():
+        with ReportService._counters_lock:
+            return {kind: dict(counters) for kind, counters in ReportService.cache_counters.items()}
@@ -0,0 +1,212 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+import json
+import os
+import logging
+import django
+import numpy as np
+from django.conf import settings
+from ml.linear_regression import LinearRegression
+from services.model_registry import ModelRegistry
+from services.price_series_repository import PriceSeriesRepository
+
+logger = logging.getLogger(__name__)
+
+TRAIN_PARALLEL_THRESHOLD = 256
+LATEST_POINTER = 'latest.json'
+CLUSTER_DIR = 'clusters'
+# Fallback for symbols without a trained model of their own.
+COMBINED_MODEL = 'combined_stock_price_model.npy'
+
+
+def fit_groups(tasks, solver):
+    """Fit one model per (name, windows) task. Runs in training worker processes.
+
+    Each window is (symbol, closes, scale); a group's windows are stacked on their own day index, so a
+    cluster model learns the shared shape of its members' scaled price paths.
+    """
+    results = []
+    for name, windows in tasks:
+        X = np.concatenate([np.arange(len(closes), dtype=np.float64) for _, closes, _ in windows]).reshape(-1, 1)
+        Y = np.concatenate([closes / scale for _, closes, scale in windows])
+        model = LinearRegression(solver=solver, record_loss=False).fit(X, Y)
+        results.append((name, model, fit_metrics(model, X, Y)))
+    return results
+
+
+def fit_metrics(model, X, Y):
+    residual = Y - model.predict(X)
+    mse = float(residual.dot(residual) / len(Y))
+    variance = float(np.var(Y))
+    return {
+        'samples': len(Y),
+        'mse': mse,
+        'rmse': mse ** 0.5,
+        'mae': float(np.abs(residual).mean()),
+        'r2': 1 - mse / variance if variance > 0 else 1.0,
+    }
+
+
+def write_json(path, payload):
+    # Write then rename so readers never see a half-written pointer.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+class TrainingService:
+    @staticmethod
+    def train(symbols=(), clusters=None, history_days=60, min_days=30, solver='lstsq', processes=None):
+        """Fit one model per symbol, and one per cluster of symbols, and publish them as versioned artifacts.
+
+        A symbol that belongs to a cluster is trained only as part of that cluster.
+        """
+        clusters = {
+            name.upper(): list(dict.fromkeys(symbol.upper() for symbol in members))
+            for name, members in (clusters or {}).items()
+        }
+        clustered = {symbol for members in clusters.values() for symbol in members}
+        symbols = [symbol for symbol in dict.fromkeys(symbol.upper() for symbol in symbols) if symbol not in clustered]
+
+        series = PriceSeriesRepository.get_many(symbols + sorted(clustered))
+
+        skipped = {}
+        windows = {}
+        for symbol in list(symbols) + sorted(clustered):
+            history = series[symbol].tail(history_days) if symbol in series else None
+            if history is None or len(history) < min_days:
+                skipped[symbol] = f"Need at least {min_days} days of data, found {0 if history is None else len(history)}."
+                continue
+            windows[symbol] = history
+
+        groups = {}
+        for symbol in symbols:
+            if symbol in windows:
+                groups[symbol] = {'kind': 'symbol', 'target': 'price', 'members': [symbol]}
+        for name, members in clusters.items():
+            members = [symbol for symbol in members if symbol in windows]
+            if members:
+                groups[name] = {'kind': 'cluster', 'target': 'relative', 'members': members}
+
+        tasks = []
+        for name, group in groups.items():
+            # Cluster members are fitted on prices relative to their last training close.
+            scales = {
+                symbol: float(windows[symbol].close[-1]) if group['target'] == 'relative' else 1.0
+                for symbol in group['members']
+            }
+            group['scales'] = scales
+            tasks.append((name, [(symbol, windows[symbol].close, scales[symbol]) for symbol in group['members']]))
+
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(tasks) < TRAIN_PARALLEL_THRESHOLD:
+            fitted = fit_groups(tasks, solver)
+        else:
+            chunk_size = -(-len(tasks) // (processes * 4))
+            chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+            fitted = []
+            with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as executor:
+                for results in executor.map(fit_groups, chunks, [solver] * len(chunks)):
+                    fitted.extend(results)
+
+        version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        trained = {}
+        for name, model, metrics in fitted:
+            group = groups[name]
+            trained[name] = TrainingService.publish(name, group, windows, model, metrics, solver, history_days, version)
+
+        logger.info(f"Trained {len(trained)} models (version {version}), skipped {len(skipped)} symbols")
+        return {'version': version, 'models': trained, 'skipped': skipped}
+
+    @staticmethod
+    def train_combined(symbols, history_days=60, solver='lstsq'):
+        """Refit the combined fallback model: the symbols' latest closes laid end to end on one day index.
+
+        Overwrites MODEL_DIR/combined_stock_price_model.npy in place; returns its metadata.
+        """
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        series = PriceSeriesRepository.get_many(symbols)
+        members = [symbol for symbol in symbols if symbol in series]
+        if not members:
+            raise ValueError(f"No price data for {', '.join(symbols)}.")
+
+        Y = np.concatenate([series[symbol].tail(history_days).close for symbol in members])
+        X = np.arange(len(Y), dtype=np.float64).reshape(-1, 1)
+        model = LinearRegression(solver=solver, record_loss=False).fit(X, Y)
+
+        metadata = {
+            'name': 'combined',
+            'kind': 'combined',
+            'trained_at': datetime.now(timezone.utc).isoformat(),
+            'solver': solver,
+            'history_days': history_days,
+            'symbols': members,
+            'metrics': fit_metrics(model, X, Y),
+        }
+        os.makedirs(settings.MODEL_DIR, exist_ok=True)
+        model.save(os.path.join(settings.MODEL_DIR, COMBINED_MODEL), metadata)
+
+        logger.info(f"Published the combined model for {len(members)} symbols")
+        return metadata
+
+    @staticmethod
+    def publish(name, group, windows, model, metrics, solver, history_days, version):
+        relative_dir = os.path.join(CLUSTER_DIR, name) if group['kind'] == 'cluster' else name
+        os.makedirs(os.path.join(settings.MODEL_DIR, relative_dir), exist_ok=True)
+        artifact = os.path.join(relative_dir, f"{version}.npy")
+
+        members = {
+            symbol: {
+                'start_date': date.fromordinal(int(windows[symbol].dates[0])),
+                'end_date': windows[symbol].last_date,
+                'start_ordinal': int(windows[symbol].dates[0]),
+                'rows': len(windows[symbol]),
+                'scale': group['scales'][symbol],
+            }
+            for symbol in group['members']
+        }
+        metadata = {
+            'name': name,
+            'kind': group['kind'],
+            'version': version,
+            'trained_at': datetime.now(timezone.utc).isoformat(),
+            'solver': solver,
+            'target': group['target'],
+            'history_days': history_days,
+            'artifact': artifact,
+            'symbols': members,
+            'metrics': metrics,
+        }
+
+        # The training metadata doubles as the artifact's .json sidecar.
+        model.save(os.path.join(settings.MODEL_DIR, artifact), metadata)
+        for symbol, window in members.items():
+            os.makedirs(os.path.join(settings.MODEL_DIR, symbol), exist_ok=True)
+            write_json(os.path.join(settings.MODEL_DIR, symbol, LATEST_POINTER), {
+                'model': name,
+                'version': version,
+                'artifact': artifact,
+                'target': group['target'],
+                **window,
+            })
+
+        logger.info(f"Published {group['kind']} model {name} version {version} for {len(members)} symbols")
+        return metadata
+
+    @staticmethod
+    def latest_pointer(symbol):
+        """Pointer to the symbol's latest trained artifact, or None if it has never been trained."""
+        try:
+            return ModelRegistry.get(os.path.join(settings.MODEL_DIR, symbol.upper(), LATEST_POINTER))
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def load_artifact(artifact):
+        return ModelRegistry.get(os.path.join(settings.MODEL_DIR, artifact))
+
+    @staticmethod
+    def start_index(pointer, series_dates):
+        """Day index of the row after `series_dates[-1]` in the frame the pointer's model was trained on."""
+        return len(series_dates) - int(np.searchsorted(series_dates, pointer['start_ordinal']))
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class StocksAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "stocks_app"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from services.metrics import install_query_recorder
+        from stocks_app import signals  # noqa: F401
+
+        connection_created.connect(install_query_recorder, dispatch_uid='metrics_query_recorder')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.indicator_store import IndicatorStore
+
+
+class Command(BaseCommand):
+    help = "Precompute (or extend) the stored indicator series for the given symbols, or every stored symbol."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to build instead of every stored symbol.")
+        parser.add_argument('--indicator', action='append', dest='indicators', metavar='NAME:WINDOW',
+                            help="Indicator to build instead of INDICATOR_PRESETS, e.g. sma:20. Repeatable.")
+
+    def handle(self, *args, **options):
+        symbols = [symbol.upper() for symbol in options['symbols']] or IndicatorStore.all_symbols()
+        if not symbols:
+            raise CommandError("No stored symbols. Ingest some first.")
+
+        specs = None
+        if options['indicators']:
+            try:
+                specs = [IndicatorStore.validate(*item.partition(':')[::2]) for item in options['indicators']]
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        updated = IndicatorStore.update_many(symbols, specs)
+
+        for symbol in symbols:
+            if symbol not in updated:
+                self.stderr.write(f"{symbol}: no stored prices")
+        stats = IndicatorStore.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indicators up to date for {len(updated)}/{len(symbols)} symbols "
+            f"({stats['computed']} computed, {stats['extended']} extended, {stats['loaded']} unchanged)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.price_archive import PriceArchive
+from stocks_app.models import StockData
+
+
+class Command(BaseCommand):
+    help = "Rewrite the on-disk price archive from the stored prices, for the given symbols or every stored symbol."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to archive instead of every stored symbol.")
+
+    def handle(self, *args, **options):
+        if not PriceArchive.enabled():
+            raise CommandError("PRICE_ARCHIVE_DIR is not set.")
+        symbols = [symbol.upper() for symbol in options['symbols']] or list(
+            StockData.objects.values_list('stock_symbol', flat=True).distinct().order_by('stock_symbol')
+        )
+        if not symbols:
+            raise CommandError("No stored symbols. Ingest some first.")
+
+        archived = PriceArchive.rebuild_many(symbols)
+
+        for symbol in symbols:
+            if symbol not in archived:
+                self.stderr.write(f"{symbol}: no stored prices")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {sum(archived.values())} rows for {len(archived)}/{len(symbols)} symbols "
+            f"in {PriceArchive.directory()}."
+        ))
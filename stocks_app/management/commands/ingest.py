@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from services.ingestion_service import IngestionService, ALPHA_VANTAGE_REQUESTS_PER_MINUTE
+from services.indicator_store import IndicatorStore
+from services.report_service import ReportService
+
+
+class Command(BaseCommand):
+    help = "Fetch and store daily prices for many symbols concurrently, respecting the Alpha Vantage quota."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to ingest.")
+        parser.add_argument('--symbols-file', help="File with one symbol per line ('#' starts a comment).")
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--rate', type=int, default=ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+                            help="Maximum requests per minute.")
+        parser.add_argument('--max-retries', type=int, default=3)
+        parser.add_argument('--no-indicators', action='store_true',
+                            help="Skip extending the stored indicators of ingested symbols.")
+        parser.add_argument('--no-warm-reports', action='store_true',
+                            help="Skip re-rendering the reports of ingested REPORT_WARM_SYMBOLS.")
+
+    def handle(self, *args, **options):
+        symbols = list(options['symbols'])
+        if options['symbols_file']:
+            with open(options['symbols_file']) as f:
+                for line in f:
+                    line = line.split('#', 1)[0]
+                    symbols.extend(symbol for symbol in line.replace(',', ' ').split() if symbol)
+        if not symbols:
+            raise CommandError("No symbols given. Pass symbols or --symbols-file.")
+
+        results = IngestionService.ingest_symbols(
+            symbols,
+            max_workers=options['workers'],
+            requests_per_minute=options['rate'],
+            max_retries=options['max_retries'],
+        )
+
+        failed = 0
+        for symbol, result in sorted(results.items()):
+            if result['status'] == 'ok':
+                self.stdout.write(f"{symbol}: {result['records']} records")
+            else:
+                failed += 1
+                self.stderr.write(f"{symbol}: {result['error']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Ingested {len(results) - failed}/{len(results)} symbols."))
+
+        ingested = [symbol for symbol, result in results.items() if result['status'] == 'ok']
+        if ingested and not options['no_indicators']:
+            updated = IndicatorStore.update_many(ingested)
+            self.stdout.write(f"Updated indicators for {len(updated)}/{len(ingested)} symbols.")
+
+        to_warm = [
+            symbol for symbol in settings.REPORT_WARM_SYMBOLS
+            if results.get(symbol, {}).get('status') == 'ok'
+        ]
+        if to_warm and not options['no_warm_reports']:
+            warmed = ReportService.warm_reports(to_warm)
+            ok = sum(1 for result in warmed.values() if result['status'] == 'ok')
+            self.stdout.write(f"Warmed reports for {ok}/{len(warmed)} symbols.")
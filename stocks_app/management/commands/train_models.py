@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from ml.linear_regression import SOLVERS
+from services.training_service import TrainingService
+
+
+class Command(BaseCommand):
+    help = "Fit one prediction model per symbol (or per cluster of symbols) and publish versioned artifacts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to train a model for each.")
+        parser.add_argument('--symbols-file', help="File with one symbol per line ('#' starts a comment).")
+        parser.add_argument('--cluster', action='append', default=[], metavar='NAME=SYM1,SYM2',
+                            help="Train one shared model for a group of symbols. Can be repeated.")
+        parser.add_argument('--combined', action='store_true',
+                            help="Refit the combined fallback model on the given symbols instead.")
+        parser.add_argument('--history-days', type=int, default=60, help="Training window length in trading days.")
+        parser.add_argument('--min-days', type=int, default=30)
+        parser.add_argument('--solver', choices=SOLVERS, default='lstsq')
+        parser.add_argument('--processes', type=int, help="Worker processes (default: one per CPU).")
+
+    def handle(self, *args, **options):
+        symbols = list(options['symbols'])
+        if options['symbols_file']:
+            with open(options['symbols_file']) as f:
+                for line in f:
+                    line = line.split('#', 1)[0]
+                    symbols.extend(symbol for symbol in line.replace(',', ' ').split() if symbol)
+
+        clusters = {}
+        for spec in options['cluster']:
+            name, _, members = spec.partition('=')
+            members = [symbol for symbol in members.replace(',', ' ').split() if symbol]
+            if not name or not members:
+                raise CommandError(f"Invalid --cluster '{spec}', expected NAME=SYM1,SYM2.")
+            clusters[name] = members
+
+        if not symbols and not clusters:
+            raise CommandError("No symbols given. Pass symbols, --symbols-file or --cluster.")
+
+        if options['combined']:
+            if clusters:
+                raise CommandError("--combined cannot be used with --cluster.")
+            try:
+                metadata = TrainingService.train_combined(
+                    symbols, history_days=options['history_days'], solver=options['solver']
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"Published the combined model for {', '.join(metadata['symbols'])}, "
+                f"rmse={metadata['metrics']['rmse']:.4f} r2={metadata['metrics']['r2']:.3f}"
+            ))
+            return
+
+        result = TrainingService.train(
+            symbols,
+            clusters=clusters,
+            history_days=options['history_days'],
+            min_days=options['min_days'],
+            solver=options['solver'],
+            processes=options['processes'],
+        )
+
+        for name, metadata in sorted(result['models'].items()):
+            self.stdout.write(
+                f"{name}: {metadata['kind']} model for {', '.join(metadata['symbols'])}, "
+                f"rmse={metadata['metrics']['rmse']:.4f} r2={metadata['metrics']['r2']:.3f}"
+            )
+        for symbol, reason in sorted(result['skipped'].items()):
+            self.stderr.write(f"{symbol}: skipped. {reason}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Published {len(result['models'])} models as version {result['version']}."
+        ))
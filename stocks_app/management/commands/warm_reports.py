@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from services.report_service import ReportService
+
+
+class Command(BaseCommand):
+    help = "Pre-render and cache the JSON and PDF reports for REPORT_WARM_SYMBOLS (or the given symbols)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to warm instead of REPORT_WARM_SYMBOLS.")
+
+    def handle(self, *args, **options):
+        symbols = options['symbols'] or settings.REPORT_WARM_SYMBOLS
+        if not symbols:
+            raise CommandError("No symbols given. Pass symbols or set REPORT_WARM_SYMBOLS.")
+
+        results = ReportService.warm_reports(symbols)
+
+        failed = 0
+        for symbol, result in sorted(results.items()):
+            if result['status'] == 'ok':
+                self.stdout.write(f"{symbol}: reports cached")
+            else:
+                failed += 1
+                self.stderr.write(f"{symbol}: {result['error']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Warmed reports for {len(results) - failed}/{len(results)} symbols."))
@@ -0,0 +1,30 @@
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+from services.metrics import Metrics
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Record each request's latency, plus query counts and spans for sampled ones (see services/metrics.py).
+
+    Streaming responses are timed to the first byte; the body is produced after the view returns.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state = Metrics.start_request()
+            response = None
+            try:
+                response = await get_response(request)
+                return response
+            finally:
+                Metrics.finish_request(state, request, response)
+    else:
+        def middleware(request):
+            state = Metrics.start_request()
+            response = None
+            try:
+                response = get_response(request)
+                return response
+            finally:
+                Metrics.finish_request(state, request, response)
+    return middleware
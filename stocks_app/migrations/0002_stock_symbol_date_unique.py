@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+DEDUP_BATCH_SIZE = 500
+
+
+def remove_duplicate_stock_data(apps, schema_editor):
+    """Keep the most recently written row for every duplicated (stock_symbol, date) pair."""
+    StockData = apps.get_model('stocks_app', 'StockData')
+    duplicates = list(
+        StockData.objects.values('stock_symbol', 'date')
+        .annotate(rows=Count('id'), keep_id=Max('id'))
+        .filter(rows__gt=1)
+        .values_list('stock_symbol', 'date', 'keep_id')
+    )
+    for start in range(0, len(duplicates), DEDUP_BATCH_SIZE):
+        batch = duplicates[start:start + DEDUP_BATCH_SIZE]
+        groups = Q()
+        for symbol, day, _ in batch:
+            groups |= Q(stock_symbol=symbol, date=day)
+        StockData.objects.filter(groups).exclude(id__in=[keep_id for _, _, keep_id in batch]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_stock_data, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='stockdata',
+            constraint=models.UniqueConstraint(fields=('stock_symbol', 'date'), name='stockdata_symbol_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='predictiondata',
+            constraint=models.UniqueConstraint(fields=('stock_symbol', 'date'), name='predictiondata_symbol_date_uniq'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='predictiondata',
+            unique_together=set(),
+        ),
+    ]
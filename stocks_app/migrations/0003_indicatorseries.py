@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks_app', '0002_stock_symbol_date_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_symbol', models.CharField(max_length=10)),
+                ('indicator', models.CharField(max_length=20)),
+                ('window', models.PositiveIntegerField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('length', models.PositiveIntegerField()),
+                ('digest', models.CharField(max_length=32)),
+                ('values', models.BinaryField()),
+                ('state', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='indicatorseries',
+            constraint=models.UniqueConstraint(fields=('stock_symbol', 'indicator', 'window'), name='indicatorseries_uniq'),
+        ),
+    ]
@@ -11,6 +11,11 @@ class StockData(models.Model):
     volume = models.BigIntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stock_symbol', 'date'], name='stockdata_symbol_date_uniq'),
+        ]
+
 class PredictionData(models.Model):
     stock_symbol = models.CharField(max_length=10)
     date = models.DateField()
@@ -18,8 +23,35 @@ class PredictionData(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('stock_symbol', 'date')
+        constraints = [
+            models.UniqueConstraint(fields=['stock_symbol', 'date'], name='predictiondata_symbol_date_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.stock_symbol} - {self.date}"
 
+
+class IndicatorSeries(models.Model):
+    """A derived series (e.g. a moving average) over a symbol's stored closes, one value per close.
+
+    `values` holds float64s aligned with the symbol's price series from `first_date`, and `state` the
+    running sums needed to extend it with new closes; `digest` identifies the closes it was computed from.
+    """
+    stock_symbol = models.CharField(max_length=10)
+    indicator = models.CharField(max_length=20)
+    window = models.PositiveIntegerField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    length = models.PositiveIntegerField()
+    digest = models.CharField(max_length=32)
+    values = models.BinaryField()
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stock_symbol', 'indicator', 'window'], name='indicatorseries_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_symbol} {self.indicator}({self.window})"
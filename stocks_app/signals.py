@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from stocks_app.models import StockData, PredictionData
+from services.data_version import DataVersion
+from services.price_archive import PriceArchive
+from services.price_series_repository import PriceSeriesRepository
+
+
+@receiver(post_save, sender=StockData)
+@receiver(post_delete, sender=StockData)
+def invalidate_price_series(sender, instance, **kwargs):
+    # Registered before the version bump, so the new version is never read from the old archive.
+    PriceArchive.invalidate_on_commit(instance.stock_symbol)
+    DataVersion.bump_on_commit([instance.stock_symbol])
+    PriceSeriesRepository.invalidate(instance.stock_symbol)
+
+
+@receiver(post_save, sender=PredictionData)
+@receiver(post_delete, sender=PredictionData)
+def bump_prediction_version(sender, instance, **kwargs):
+    DataVersion.bump_on_commit([instance.stock_symbol])
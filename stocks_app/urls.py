@@ -1,13 +1,17 @@
 from django.urls import path
 from .views import fetch_data_view, stocks_home_view
-from .views import fetch_data_view, run_backtest_view
-from .views import predict_stock_view
-from .views import generate_report_view
+from .views import fetch_data_view, run_backtest_view, run_sweep_view, run_portfolio_backtest_view
+from .views import predict_stock_view, predict_batch_view
+from .views import generate_report_view, export_data_view
 
 urlpatterns = [
     path('', stocks_home_view, name='stocks_home'),
     path('fetch/<str:symbol>/', fetch_data_view, name='fetch_data'),
+    path('export/', export_data_view, name='export_data'),
+    path('backtest/portfolio/', run_portfolio_backtest_view, name='run_portfolio_backtest'),
     path('backtest/<str:symbol>/', run_backtest_view, name='run_backtest'),
+    path('backtest/<str:symbol>/sweep/', run_sweep_view, name='run_sweep'),
+    path('predict/batch/', predict_batch_view, name='predict_batch'),
     path('predict/<str:symbol>/', predict_stock_view, name='predict_stock'),
     path('report/<str:symbol>/', generate_report_view, name='generate_report'),
 ]
@@ -1,28 +1,90 @@
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from services.financial_data_service import FinancialDataService
 from services.backtesting_service import BacktestingService
 from services.prediction_service import PredictionService
 from services.report_service import ReportService
+from services.export_service import ExportService, EXPORT_FORMATS
+from services.data_fetching_service import DataFetchingService
+from services.concurrency import closes_upstream_client, run_blocking
+from services.metrics import Metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
-def fetch_data_view(request, symbol):
+MAX_SWEEP_COMBINATIONS = 10000
+
+def parse_windows(value, max_count=MAX_SWEEP_COMBINATIONS):
+    """Parse "10,20,50" or an inclusive "start:stop:step" range like "10:50:10".
+
+    Raises ValueError for windows under 1 or more than `max_count` of them, before building the list.
+    """
+    if ':' in value:
+        parts = [int(part) for part in value.split(':')]
+        if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] <= 0):
+            raise ValueError(f"Invalid window range: {value}")
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) == 3 else 1
+        windows = range(start, stop + 1, step)
+    else:
+        windows = [int(part) for part in value.split(',') if part.strip()]
+    if len(windows) > max_count:
+        raise ValueError(f"Too many windows in {value} (max {max_count})")
+    if windows and min(windows) < 1:
+        raise ValueError(f"Windows must be at least 1: {value}")
+    return list(windows)
+
+@closes_upstream_client
+async def fetch_data_view(request, symbol):
     if request.method == 'GET':
         try:
             symbol = symbol.upper()
-            stock_data = FinancialDataService.fetch_stock_data(symbol)
+            stock_data = await FinancialDataService.fetch_stock_data_async(symbol)
 
             if isinstance(stock_data, str):
                 return JsonResponse({'error': stock_data}, status=500)
 
-            return JsonResponse({'data': stock_data}, status=200)
+            # The fetch only returns the rows it stored; respond with the whole stored series as before.
+            stored = await run_blocking(FinancialDataService.stored_records, symbol)
+            return JsonResponse({'data': stored}, status=200)
 
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
-def run_backtest_view(request, symbol):
+def export_data_view(request):
+    """Stream stored prices as CSV, NDJSON or a structured .npy for ?symbols=A,B&start=&end=&fields=."""
+    if request.method == 'GET':
+        symbols = [symbol.strip().upper() for symbol in request.GET.get('symbols', '').split(',') if symbol.strip()]
+        if not symbols:
+            return JsonResponse({'error': 'Pass a comma-separated list of symbols.'}, status=400)
+
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': f'Invalid format requested. Use one of: {", ".join(EXPORT_FORMATS)}.'},
+                                status=400)
+
+        try:
+            fields = ExportService.parse_fields(request.GET.get('fields'))
+            start = ExportService.parse_date(request.GET.get('start'))
+            end = ExportService.parse_date(request.GET.get('end'))
+        except ValueError as e:
+            return JsonResponse({'error': f'Invalid export parameters: {e}'}, status=400)
+
+        # Django consumes a sync iterator under ASGI by collecting it into a list, and an async one
+        # under WSGI the same way, so each server gets the form it streams.
+        stream = ExportService.astream if isinstance(request, ASGIRequest) else ExportService.stream
+        response = StreamingHttpResponse(
+            stream(export_format, symbols, fields, start, end),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        name = symbols[0] if len(symbols) == 1 else 'prices'
+        response['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+        logger.info(f"Streaming {export_format} export of {fields} for {len(symbols)} symbols")
+        return response
+
+@closes_upstream_client
+async def run_backtest_view(request, symbol):
     if request.method == 'GET':
         initial_investment = request.GET.get('initial_investment', 10000)
         try:
@@ -30,7 +92,11 @@ def run_backtest_view(request, symbol):
         except ValueError:
             return JsonResponse({'error': 'Invalid investment amount'}, status=400)
 
-        summary = BacktestingService.run_backtest(symbol, initial_investment)
+        try:
+            await DataFetchingService.ensure_data_fetched_async(symbol)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=500)
+        summary = await run_blocking(BacktestingService.run_backtest, symbol, initial_investment)
 
         if 'error' in summary:
             return JsonResponse({'error': summary['error']}, status=400)
@@ -38,11 +104,60 @@ def run_backtest_view(request, symbol):
         logger.info(f"Backtest run for {symbol} completed successfully: {summary}")
         return JsonResponse(summary, status=200)
 
-def predict_stock_view(request, symbol):
-    """API endpoint to predict stock prices for the next 30 days."""
+def run_portfolio_backtest_view(request):
+    if request.method == 'GET':
+        symbols = [symbol.strip() for symbol in request.GET.get('symbols', '').split(',') if symbol.strip()]
+        if not symbols:
+            return JsonResponse({'error': 'Pass a comma-separated list of symbols.'}, status=400)
+
+        try:
+            initial_investment = float(request.GET.get('initial_investment', 10000))
+            short_window = int(request.GET.get('short_window', 50))
+            long_window = int(request.GET.get('long_window', 200))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid backtest parameters'}, status=400)
+
+        summary = BacktestingService.run_portfolio_backtest(symbols, initial_investment, short_window, long_window)
+
+        if 'error' in summary:
+            return JsonResponse(summary, status=400)
+
+        logger.info(f"Portfolio backtest for {len(summary['symbols'])} symbols completed successfully")
+        return JsonResponse(summary, status=200)
+
+def run_sweep_view(request, symbol):
+    if request.method == 'GET':
+        try:
+            initial_investment = float(request.GET.get('initial_investment', 10000))
+            short_windows = parse_windows(request.GET.get('short', '10:100:10'))
+            long_windows = parse_windows(request.GET.get('long', '50:300:50'))
+            top = int(request.GET['top']) if 'top' in request.GET else None
+        except ValueError as e:
+            return JsonResponse({'error': f'Invalid sweep parameters: {e}'}, status=400)
+
+        if len(short_windows) * len(long_windows) > MAX_SWEEP_COMBINATIONS:
+            return JsonResponse({'error': f'Too many combinations (max {MAX_SWEEP_COMBINATIONS}).'}, status=400)
+
+        result = BacktestingService.run_sweep(symbol, initial_investment, short_windows, long_windows, top=top)
+
+        if 'error' in result:
+            return JsonResponse({'error': result['error']}, status=400)
+
+        logger.info(f"Sweep run for {symbol} completed: {result['combinations']} combinations")
+        return JsonResponse(result, status=200)
+
+@closes_upstream_client
+async def predict_stock_view(request, symbol):
+    """API endpoint to predict stock prices for the next 30 days (or ?days=N)."""
     if request.method == 'GET':
         try:
-            predictions = PredictionService.predict_stock_prices(symbol)
+            days = PredictionService.validate_horizon(int(request.GET['days']) if 'days' in request.GET else None)
+        except ValueError as e:
+            return JsonResponse({'error': f'Invalid number of days: {e}'}, status=400)
+
+        try:
+            await DataFetchingService.ensure_data_fetched_async(symbol)
+            predictions = await run_blocking(PredictionService.predict_stock_prices, symbol, days=days)
             logger.info(f"Predictions generated for {symbol}")
             return JsonResponse({
                 'symbol': symbol,
@@ -52,18 +167,48 @@ def predict_stock_view(request, symbol):
             logger.error(f"Error predicting stock prices for {symbol}: {e}")
             return JsonResponse({'error': str(e)}, status=500)
 
-def generate_report_view(request, symbol):
+def predict_batch_view(request):
+    """API endpoint to predict stock prices for several symbols at once."""
+    if request.method == 'GET':
+        symbols = [symbol.strip() for symbol in request.GET.get('symbols', '').split(',') if symbol.strip()]
+        if not symbols:
+            return JsonResponse({'error': 'Pass a comma-separated list of symbols.'}, status=400)
+
+        try:
+            days = PredictionService.validate_horizon(int(request.GET['days']) if 'days' in request.GET else None)
+        except ValueError as e:
+            return JsonResponse({'error': f'Invalid number of days: {e}'}, status=400)
+
+        try:
+            result = PredictionService.predict_many(symbols, days=days)
+        except Exception as e:
+            logger.error(f"Error predicting stock prices for {symbols}: {e}")
+            return JsonResponse({'error': str(e)}, status=500)
+
+        logger.info(f"Batch predictions generated for {len(result['predictions'])} symbols")
+        return JsonResponse({
+            'predictions': {symbol: list(prices) for symbol, prices in result['predictions'].items()},
+            'errors': result['errors'],
+        }, status=200)
+
+@closes_upstream_client
+async def generate_report_view(request, symbol):
     report_format = request.GET.get('format', 'json')
+    refresh = request.GET.get('refresh', '').lower() in ('1', 'true')
 
     try:
+        if report_format in ('json', 'pdf'):
+            # Fetch upstream here, on the event loop, so the build below only waits on CPU and the database.
+            await DataFetchingService.ensure_data_fetched_async(symbol)
+
         if report_format == 'json':
-            report = ReportService.generate_json_report(symbol)
+            report = await run_blocking(ReportService.generate_json_report, symbol, refresh=refresh)
             if 'error' in report:
                 return JsonResponse(report, status=400)
             return JsonResponse(report, status=200)
 
         elif report_format == 'pdf':
-            pdf_report = ReportService.generate_pdf_report(symbol)
+            pdf_report = await run_blocking(ReportService.generate_pdf_report, symbol, refresh=refresh)
             if not pdf_report:
                 return JsonResponse({'error': 'Report generation failed. Check if data is available.'}, status=400)
             response = HttpResponse(pdf_report, content_type='application/pdf')
@@ -77,5 +222,9 @@ def generate_report_view(request, symbol):
         logger.error(f"Error generating report for {symbol}: {e}")
         return JsonResponse({'error': str(e)}, status=500)
 
+def metrics_view(request):
+    """This process's metrics in the Prometheus text exposition format."""
+    return HttpResponse(Metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def stocks_home_view(request):
     return HttpResponse("Welcome to the Stocks API!!")
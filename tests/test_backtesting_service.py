@@ -1,6 +1,12 @@
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
 from django.test import TestCase
+from django.urls import reverse
 from stocks_app.models import StockData
-from services.backtesting_service import BacktestingService
+from services.backtesting_service import BacktestingService, sweep_executor
+from stocks_app.views import parse_windows
 import factory
 
 class StockDataFactory(factory.django.DjangoModelFactory):
@@ -8,7 +14,8 @@ class StockDataFactory(factory.django.DjangoModelFactory):
         model = StockData
 
     stock_symbol = 'AAPL'
-    date = factory.Faker('date')
+    # (stock_symbol, date) is unique, so random dates would collide across a 300-row batch.
+    date = factory.Sequence(lambda n: date(2000, 1, 1) + timedelta(days=n))
     open_price = factory.Faker('pydecimal', left_digits=4, right_digits=2, positive=True)
     close_price = factory.Faker('pydecimal', left_digits=4, right_digits=2, positive=True)
     high_price = factory.Faker('pydecimal', left_digits=4, right_digits=2, positive=True)
@@ -32,3 +39,106 @@ class BacktestingServiceTest(TestCase):
 
         result = BacktestingService.run_backtest('AAPL', initial_investment=10000)
         self.assertEqual(result['error'], "Not enough data to run the backtest for AAPL.")
+
+    def test_vectorized_engine_matches_exact_decimal_mode(self):
+        StockData.objects.all().delete()
+        start = date(2020, 1, 1)
+        for i in range(400):
+            price = Decimal(str(round(100 + 20 * math.sin(i / 15), 2)))
+            StockDataFactory(
+                stock_symbol='WAVE', date=start + timedelta(days=i), open_price=price,
+                close_price=price, high_price=price, low_price=price,
+            )
+
+        fast = BacktestingService.run_backtest('WAVE', initial_investment=10000, short_window=10, long_window=40)
+        exact = BacktestingService.run_backtest(
+            'WAVE', initial_investment=10000, short_window=10, long_window=40, exact=True
+        )
+
+        self.assertGreater(fast['trades_executed'], 0)
+        self.assertEqual(fast['trades_executed'], exact['trades_executed'])
+        self.assertAlmostEqual(fast['final_value'], exact['final_value'], places=6)
+        self.assertAlmostEqual(fast['max_drawdown'], exact['max_drawdown'], places=9)
+
+    def test_crossover_positions_follow_last_strict_signal(self):
+        short_ma = np.array([[1.0], [1.0], [2.0], [2.0], [0.5], [1.0]])
+        long_ma = np.array([[2.0], [2.0], [1.0], [2.0], [1.0], [1.0]])
+
+        positions = BacktestingService.crossover_positions(short_ma, long_ma, 1)
+
+        np.testing.assert_array_equal(positions[:, 0], [0, 1, 0, 0, 1, 1])
+
+    def test_sweep_ranks_every_combination_and_matches_single_backtests(self):
+        short_windows, long_windows = [5, 10, 20], [50, 100]
+
+        sweep = BacktestingService.run_sweep('AAPL', 10000, short_windows, long_windows, processes=1)
+
+        self.assertEqual(sweep['combinations'], 6)
+        returns = [row['total_return'] for row in sweep['results']]
+        self.assertEqual(returns, sorted(returns, reverse=True))
+        best = sweep['results'][0]
+        single = BacktestingService.run_backtest(
+            'AAPL', 10000, short_window=best['short_window'], long_window=best['long_window']
+        )
+        self.assertAlmostEqual(best['total_return'], single['total_return'], places=6)
+        self.assertEqual(best['trades_executed'], single['trades_executed'])
+
+    def test_sweep_parallel_matches_inline(self):
+        short_windows, long_windows = list(range(5, 45, 5)), list(range(50, 250, 25))
+
+        inline = BacktestingService.run_sweep('AAPL', 10000, short_windows, long_windows, processes=1)
+        parallel = BacktestingService.run_sweep('AAPL', 10000, short_windows, long_windows, processes=2)
+
+        self.assertEqual(inline['combinations'], 64)
+        self.assertEqual(inline['results'], parallel['results'])
+
+    def test_sweeps_share_one_spawned_pool(self):
+        short_windows, long_windows = list(range(5, 45, 5)), list(range(50, 250, 25))
+
+        BacktestingService.run_sweep('AAPL', 10000, short_windows, long_windows, processes=2)
+        executor = sweep_executor()
+        BacktestingService.run_sweep('AAPL', 10000, short_windows, long_windows, processes=2)
+
+        self.assertIs(sweep_executor(), executor)
+        self.assertEqual(executor._mp_context.get_start_method(), 'spawn')
+
+    def test_sweep_view_rejects_oversized_and_non_positive_windows(self):
+        url = reverse('run_sweep', args=['AAPL'])
+
+        response = self.client.get(url, {'short': '1:1000000000', 'long': '50:60'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Too many windows', response.json()['error'])
+        response = self.client.get(url, {'short': '-5,5', 'long': '50:60'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at least 1', response.json()['error'])
+        self.assertEqual(parse_windows('10:30:10'), [10, 20, 30])
+
+    def test_portfolio_backtest_matches_single_symbol_backtests(self):
+        StockData.objects.all().delete()
+        start = date(2020, 1, 1)
+        for n, symbol in enumerate(['WAVE', 'TIDE']):
+            for i in range(300):
+                price = Decimal(str(round(100 + 20 * math.sin((i + 7 * n) / 12), 2)))
+                StockDataFactory(
+                    stock_symbol=symbol, date=start + timedelta(days=i), open_price=price,
+                    close_price=price, high_price=price, low_price=price,
+                )
+        for i in range(20):
+            StockDataFactory(stock_symbol='TINY', date=start + timedelta(days=i))
+
+        with self.assertNumQueries(1):
+            portfolio = BacktestingService.run_portfolio_backtest(
+                ['wave', 'TIDE', 'TINY', 'NONE'], 10000, short_window=10, long_window=40
+            )
+
+        self.assertEqual(portfolio['symbols'], ['WAVE', 'TIDE'])
+        self.assertEqual(set(portfolio['errors']), {'TINY', 'NONE'})
+        for symbol in ['WAVE', 'TIDE']:
+            single = BacktestingService.run_backtest(symbol, 5000, short_window=10, long_window=40)
+            self.assertAlmostEqual(portfolio['per_symbol'][symbol]['final_value'], single['final_value'], places=6)
+            self.assertEqual(portfolio['per_symbol'][symbol]['trades_executed'], single['trades_executed'])
+        self.assertAlmostEqual(
+            portfolio['final_value'],
+            sum(result['final_value'] for result in portfolio['per_symbol'].values()),
+            places=6,
+        )
@@ -0,0 +1,159 @@
+import os
+import pickle
+import tempfile
+import threading
+from unittest.mock import Mock, patch
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, override_settings
+from services.cache_backends import (
+    REDIS_DELETE_IF_EQUAL, SQLiteCache, CompressedRedisSerializer, compress, decompress, delete_if_equal,
+)
+
+
+@override_settings(CACHE_COMPRESS_MIN_BYTES=1024)
+class SQLiteCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'cache.sqlite3')
+
+    def make_cache(self, max_bytes=1024 * 1024):
+        return SQLiteCache(self.path, {'OPTIONS': {'MAX_BYTES': max_bytes}})
+
+    def stored_size(self, cache, key):
+        return cache._connection().execute(
+            'SELECT size FROM cache_entry WHERE key = ?', (cache.make_key(key),)
+        ).fetchone()[0]
+
+    def test_values_are_shared_between_instances(self):
+        writer, reader = self.make_cache(), self.make_cache()
+        writer.set('report', {'total_return': 1.5})
+        writer.set_many({'a': 1, 'b': [2]})
+
+        self.assertEqual(reader.get('report'), {'total_return': 1.5})
+        self.assertEqual(reader.get_many(['a', 'b', 'missing']), {'a': 1, 'b': [2]})
+        self.assertIsNone(reader.get('missing'))
+        self.assertTrue(reader.delete('a'))
+        self.assertIsNone(writer.get('a'))
+
+    def test_large_values_are_compressed(self):
+        cache = self.make_cache()
+        payload = b'%PDF' + b'0' * 100_000
+        cache.set('pdf', payload)
+        cache.set('small', b'0' * 100)
+
+        self.assertEqual(cache.get('pdf'), payload)
+        self.assertLess(self.stored_size(cache, 'pdf'), 2_000)
+        self.assertEqual(self.stored_size(cache, 'small'), len(compress(pickle.dumps(b'0' * 100, -1))))
+
+    def test_incompressible_values_are_stored_raw(self):
+        payload = os.urandom(50_000)
+        self.assertEqual(compress(payload)[:1], b'P')
+        self.assertEqual(decompress(compress(payload)), payload)
+
+    def test_least_recently_used_entries_are_evicted_over_budget(self):
+        cache = self.make_cache(max_bytes=3 * 10_000)
+        for key in ['a', 'b', 'c']:
+            cache.set(key, os.urandom(9_000))
+        # 'b' was read least recently.
+        cache._connection().execute('UPDATE cache_entry SET accessed = 0 WHERE key = ?', (cache.make_key('b'),))
+        cache.set('d', os.urandom(9_000))
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(sorted(key for key in 'acd' if cache.get(key) is not None), ['a', 'c', 'd'])
+        self.assertLessEqual(cache.stats()['bytes'], 3 * 10_000)
+
+    def test_stored_bytes_total_follows_every_write(self):
+        cache = self.make_cache()
+        cache.set_many({'a': b'0' * 100, 'b': b'1' * 200, 'n': 1})
+        cache.set('a', b'0' * 5_000)
+        cache.add('c', os.urandom(3_000))
+        cache.incr('n', 10 ** 12)
+        cache.delete('b')
+
+        conn = cache._connection()
+        self.assertEqual(cache.stats()['bytes'], conn.execute('SELECT SUM(size) FROM cache_entry').fetchone()[0])
+        cache.clear()
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_stored_bytes_total_is_backfilled_for_existing_files(self):
+        cache = self.make_cache()
+        cache.set('a', os.urandom(1_000))
+        size = cache.stats()['bytes']
+        conn = cache._connection()
+        conn.execute('DROP TABLE cache_meta')
+
+        self.assertEqual(self.make_cache().stats()['bytes'], size)
+
+    def test_expiry_add_touch_and_incr(self):
+        cache = self.make_cache()
+        cache.set('expired', 1, timeout=0)
+        self.assertIsNone(cache.get('expired'))
+        self.assertTrue(cache.add('expired', 2))
+        self.assertFalse(cache.add('expired', 3))
+        self.assertEqual(cache.get('expired'), 2)
+
+        self.assertTrue(cache.touch('expired', 0))
+        self.assertFalse(cache.has_key('expired'))
+
+        with self.assertRaises(ValueError):
+            cache.incr('counter')
+        cache.set('counter', 10, timeout=None)
+        self.assertEqual(cache.incr('counter'), 11)
+
+    def test_delete_if_equal_only_removes_the_expected_value(self):
+        cache = self.make_cache()
+        cache.set('lock', 'token-a')
+
+        self.assertFalse(delete_if_equal(cache, 'lock', 'token-b'))
+        self.assertEqual(cache.get('lock'), 'token-a')
+        self.assertTrue(delete_if_equal(cache, 'lock', 'token-a'))
+        self.assertIsNone(cache.get('lock'))
+
+    def test_add_and_incr_are_atomic_across_threads(self):
+        cache = self.make_cache()
+        cache.set('counter', 0, timeout=None)
+        winners = []
+
+        def work():
+            if cache.add('lock', threading.get_ident()):
+                winners.append(threading.get_ident())
+            for _ in range(20):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(cache.get('counter'), 160)
+
+
+@override_settings(CACHE_COMPRESS_MIN_BYTES=1024)
+class CompressedRedisSerializerTest(SimpleTestCase):
+
+    def test_round_trip_keeps_ints_raw(self):
+        serializer = CompressedRedisSerializer()
+        payload = {'graph': b'0' * 100_000}
+
+        self.assertEqual(serializer.dumps(42), 42)
+        self.assertEqual(serializer.loads(b'42'), 42)
+        self.assertLess(len(serializer.dumps(payload)), 2_000)
+        self.assertEqual(serializer.loads(serializer.dumps(payload)), payload)
+
+    def test_delete_if_equal_runs_one_compare_and_delete_script(self):
+        cache = RedisCache('redis://127.0.0.1:6379/1', {
+            'OPTIONS': {'serializer': 'services.cache_backends.CompressedRedisSerializer'},
+        })
+        client = Mock()
+        client.eval.return_value = 1
+
+        with patch.object(cache._cache, 'get_client', return_value=client):
+            self.assertTrue(delete_if_equal(cache, 'lock', 'token-a'))
+
+        client.eval.assert_called_once_with(
+            REDIS_DELETE_IF_EQUAL, 1, cache.make_key('lock'), CompressedRedisSerializer().dumps('token-a')
+        )
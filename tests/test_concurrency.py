@@ -0,0 +1,40 @@
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase
+from django.urls import reverse
+from services.concurrency import get_async_client
+from tests.test_financial_data_service import upstream
+from trial_task.asgi import application
+
+
+class UpstreamClientLifetimeTest(TransactionTestCase):
+
+    def test_views_under_wsgi_close_their_loop_client(self):
+        clients = [upstream() for _ in range(3)]
+        with patch('services.concurrency.httpx.AsyncClient', side_effect=clients):
+            for _ in clients:
+                response = self.client.get(reverse('fetch_data', args=['aapl']))
+                self.assertEqual(response.status_code, 200)
+
+        self.assertTrue(all(client.is_closed for client in clients))
+
+    def test_lifespan_shutdown_closes_the_worker_client(self):
+        sent = []
+
+        async def serve():
+            client = get_async_client()
+            messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+
+            async def receive():
+                return next(messages)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await application({'type': 'lifespan'}, receive, send)
+            return client
+
+        client = async_to_sync(serve)()
+
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.assertTrue(client.is_closed)
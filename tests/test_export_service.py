@@ -0,0 +1,112 @@
+import io
+import json
+from datetime import date, timedelta
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from services.concurrency import iterate_blocking
+from services.export_service import ExportService
+from stocks_app.models import StockData
+
+
+@override_settings(EXPORT_CHUNK_SIZE=3)
+class ExportServiceTest(TestCase):
+
+    def setUp(self):
+        start = date(2024, 1, 1)
+        for symbol, base in (('AAPL', 100), ('MSFT', 200)):
+            StockData.objects.bulk_create([
+                StockData(stock_symbol=symbol, date=start + timedelta(days=i), open_price=base + i,
+                          close_price=f"{base + i}.25", high_price=base + i + 1, low_price=base + i - 1,
+                          volume=1000 + i)
+                for i in range(10)
+            ])
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_data'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_streams_selected_fields_and_range(self):
+        content = self.export(symbols='aapl,msft', fields='close_price,volume', start='2024-01-03', end='2024-01-07')
+
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0], 'symbol,date,close_price,volume')
+        self.assertEqual(lines[1], 'AAPL,2024-01-03,102.25,1002')
+        self.assertEqual(lines[-1], 'MSFT,2024-01-07,206.25,1006')
+        self.assertEqual(len(lines), 11)
+
+    def test_ndjson_export_writes_prices_as_numbers(self):
+        content = self.export(symbols='AAPL', format='ndjson', fields='close_price')
+
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0], {'symbol': 'AAPL', 'date': '2024-01-01', 'close_price': 100.25})
+
+    def test_npy_export_is_a_structured_array(self):
+        content = self.export(symbols='MSFT,AAPL', format='npy')
+
+        array = np.load(io.BytesIO(content))
+        self.assertEqual(array.shape, (20,))
+        self.assertEqual(array.dtype.names, ('stock_symbol', 'date', 'open_price', 'close_price', 'high_price',
+                                             'low_price', 'volume'))
+        self.assertEqual(array['stock_symbol'][0], 'AAPL')
+        self.assertEqual(array['date'][-1], np.datetime64('2024-01-10'))
+        self.assertEqual(array['close_price'][-1], 209.25)
+
+    def test_npy_export_of_no_rows_is_an_empty_array(self):
+        array = np.load(io.BytesIO(self.export(symbols='NONE', format='npy', fields='close_price')))
+        self.assertEqual(array.shape, (0,))
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({}, {'symbols': 'AAPL', 'format': 'xml'}, {'symbols': 'AAPL', 'fields': 'secret'},
+                       {'symbols': 'AAPL', 'start': '2024-13-01'}):
+            response = self.client.get(reverse('export_data'), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_rows_are_chunked(self):
+        queryset = ExportService.queryset(['AAPL'], ['close_price'])
+        self.assertEqual([len(chunk) for chunk in ExportService.rows(queryset)], [3, 3, 3, 1])
+
+
+@override_settings(EXPORT_CHUNK_SIZE=3)
+class AsyncExportTest(TransactionTestCase):
+
+    def setUp(self):
+        StockData.objects.bulk_create([
+            StockData(stock_symbol='AAPL', date=date(2024, 1, 1) + timedelta(days=i), open_price=100 + i,
+                      close_price=100 + i, high_price=100 + i, low_price=100 + i, volume=1000 + i)
+            for i in range(10)
+        ])
+
+    def test_asgi_requests_stream_asynchronously(self):
+        async def export():
+            response = await self.async_client.get(reverse('export_data'), {'symbols': 'AAPL'})
+            chunks = [chunk async for chunk in response.streaming_content]
+            return response, chunks
+
+        response, chunks = async_to_sync(export)()
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), b''.join(self.client.get(reverse('export_data'), {'symbols': 'AAPL'})))
+
+    def test_closing_the_async_stream_early_closes_the_rows(self):
+        closed = []
+
+        def rows():
+            try:
+                yield from range(100)
+            finally:
+                closed.append(True)
+
+        async def take_two():
+            iterator = iterate_blocking(rows)
+            items = [await iterator.__anext__(), await iterator.__anext__()]
+            await iterator.aclose()
+            return items
+
+        self.assertEqual(async_to_sync(take_two)(), [0, 1])
+        self.assertEqual(closed, [True])
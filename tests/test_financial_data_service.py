@@ -1,6 +1,15 @@
-from django.test import TestCase
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+import httpx
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
 from unittest.mock import patch
 from services.financial_data_service import FinancialDataService
+from stocks_app.models import StockData
 
 class FinancialDataServiceTest(TestCase):
 
@@ -33,3 +42,136 @@ class FinancialDataServiceTest(TestCase):
 
         result = FinancialDataService.fetch_stock_data('AAPL')
         self.assertEqual(result, "Rate limit exceeded. Try again later.")
+
+    @patch('services.financial_data_service.requests.get')
+    def test_bulk_ingest_creates_and_updates_changed_rows(self, mock_get):
+        today = datetime.now().date()
+        day_one = (today - timedelta(days=2)).strftime('%Y-%m-%d')
+        day_two = (today - timedelta(days=1)).strftime('%Y-%m-%d')
+        payload = {
+            "Time Series (Daily)": {
+                day_one: {"1. open": "150.00", "2. high": "155.00", "3. low": "148.00",
+                          "4. close": "152.00", "5. volume": "1000000"},
+                day_two: {"1. open": "152.00", "2. high": "156.00", "3. low": "151.00",
+                          "4. close": "154.00", "5. volume": "1200000"},
+            }
+        }
+        mock_get.return_value.json.return_value = payload
+
+        FinancialDataService.fetch_stock_data('AAPL')
+        self.assertEqual(StockData.objects.filter(stock_symbol='AAPL').count(), 2)
+
+        payload["Time Series (Daily)"][day_two]["4. close"] = "158.50"
+        created, updated = FinancialDataService.bulk_store_stock_data('AAPL', [
+            FinancialDataService.parse_price_data(datetime.strptime(date_str, '%Y-%m-%d').date(), price_data)
+            for date_str, price_data in payload["Time Series (Daily)"].items()
+        ])
+
+        self.assertEqual((created, updated), (0, 1))
+        self.assertEqual(StockData.objects.filter(stock_symbol='AAPL').count(), 2)
+        self.assertEqual(StockData.objects.get(stock_symbol='AAPL', date=day_two).close_price, Decimal('158.50'))
+
+    @patch('services.financial_data_service.requests.get')
+    def test_incremental_fetch_uses_compact_and_skips_stored_rows(self, mock_get):
+        today = datetime.now().date()
+        StockData.objects.create(
+            stock_symbol='AAPL', date=today - timedelta(days=3), open_price='150.00',
+            close_price='151.00', high_price='152.00', low_price='149.00', volume=1000000,
+        )
+        mock_get.return_value.json.return_value = {
+            "Time Series (Daily)": {
+                (today - timedelta(days=offset)).strftime('%Y-%m-%d'): {
+                    "1. open": "150.00", "2. high": "155.00", "3. low": "148.00",
+                    "4. close": "152.00", "5. volume": "1000000"
+                }
+                for offset in range(1, 6)
+            }
+        }
+
+        result = FinancialDataService.fetch_stock_data('AAPL')
+
+        self.assertEqual(mock_get.call_args.kwargs['params']['outputsize'], 'compact')
+        self.assertEqual(len(result), 2)
+        self.assertEqual(StockData.objects.filter(stock_symbol='AAPL').count(), 3)
+
+    def test_outputsize_falls_back_to_full_for_large_gaps(self):
+        today = datetime.now().date()
+        self.assertEqual(FinancialDataService.get_outputsize(None), 'full')
+        self.assertEqual(FinancialDataService.get_outputsize(today - timedelta(days=2)), 'compact')
+        self.assertEqual(FinancialDataService.get_outputsize(today - timedelta(days=365)), 'full')
+
+
+def upstream(delay=0.0, close="152.00"):
+    """An httpx client whose transport answers like Alpha Vantage after `delay` seconds."""
+    today = datetime.now().date()
+
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"Time Series (Daily)": {
+            (today - timedelta(days=offset)).strftime('%Y-%m-%d'): {
+                "1. open": "150.00", "2. high": "155.00", "3. low": "148.00",
+                "4. close": close, "5. volume": "1000000"
+            }
+            for offset in range(1, 4)
+        }})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class AsyncFetchTest(TransactionTestCase):
+
+    def test_fetch_stock_data_async_stores_rows(self):
+        with patch('services.financial_data_service.get_async_client', return_value=upstream()):
+            result = async_to_sync(FinancialDataService.fetch_stock_data_async)('AAPL')
+
+        self.assertEqual(len(result), 3)
+        self.assertEqual(StockData.objects.filter(stock_symbol='AAPL').count(), 3)
+
+    def test_fetch_view_runs_async(self):
+        with patch('services.financial_data_service.get_async_client', return_value=upstream(close="160.00")):
+            response = self.client.get(reverse('fetch_data', args=['aapl']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'][0]['close'], "160.00")
+
+    def test_fetch_view_returns_stored_series_when_up_to_date(self):
+        today = datetime.now().date()
+        StockData.objects.create(
+            stock_symbol='AAPL', date=today - timedelta(days=800), open_price=1, close_price=1,
+            high_price=1, low_price=1, volume=1
+        )
+        with patch('services.financial_data_service.get_async_client', return_value=upstream()):
+            self.client.get(reverse('fetch_data', args=['aapl']))
+        # The second fetch stores nothing new but still answers with the stored two-year series.
+        with patch('services.financial_data_service.get_async_client', return_value=upstream(close="160.00")):
+            response = self.client.get(reverse('fetch_data', args=['aapl']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [
+            {'date': (today - timedelta(days=offset)).strftime('%Y-%m-%d'), 'open': "150.00", 'close': "152.00",
+             'high': "155.00", 'low': "148.00", 'volume': "1000000"}
+            for offset in range(1, 4)
+        ])
+
+    def test_upstream_errors_are_returned_not_raised(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+        with patch('services.financial_data_service.get_async_client', return_value=client):
+            result = async_to_sync(FinancialDataService.fetch_stock_data_async)('AAPL')
+
+        self.assertTrue(result.startswith('Network request error'))
+
+    def test_slow_upstream_requests_overlap(self):
+        symbols = [f"S{i}" for i in range(10)]
+
+        async def fetch_all():
+            return await asyncio.gather(*(FinancialDataService.fetch_stock_data_async(symbol) for symbol in symbols))
+
+        # Only the upstream waits need to overlap; one writer keeps the in-memory SQLite test database unlocked.
+        start = time.perf_counter()
+        with patch('services.financial_data_service.get_async_client', return_value=upstream(delay=0.3)), \
+                patch('services.concurrency.blocking_executor', return_value=ThreadPoolExecutor(1)):
+            results = async_to_sync(fetch_all)()
+
+        self.assertLess(time.perf_counter() - start, 10 * 0.3 / 2)
+        self.assertTrue(all(len(result) == 3 for result in results))
+        self.assertEqual(StockData.objects.count(), 30)
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from io import StringIO
+import numpy as np
+import pandas as pd
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from services.backtesting_service import BacktestingService
+from services.indicator_store import IndicatorStore
+from services.price_series_repository import PriceSeriesRepository
+from services.report_service import ReportService
+from stocks_app.models import IndicatorSeries, StockData
+
+
+def store_closes(symbol, closes, start=date(2020, 1, 1)):
+    StockData.objects.bulk_create([
+        StockData(stock_symbol=symbol, date=start + timedelta(days=i), open_price=close, close_price=close,
+                  high_price=close, low_price=close, volume=1000)
+        for i, close in enumerate(closes)
+    ])
+
+
+def closes(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, count))), 2)
+
+
+def reference_rsi(prices, window):
+    changes = np.diff(prices)
+    gains, losses = np.maximum(changes, 0), np.maximum(-changes, 0)
+    values = np.full(len(prices), np.nan)
+    gain, loss = gains[:window].mean(), losses[:window].mean()
+    for i in range(window, len(prices)):
+        if i > window:
+            gain = (gain * (window - 1) + gains[i - 1]) / window
+            loss = (loss * (window - 1) + losses[i - 1]) / window
+        values[i] = 100 - 100 / (1 + gain / loss) if loss else 100.0
+    return values
+
+
+class IndicatorStoreTest(TestCase):
+
+    def setUp(self):
+        IndicatorStore.clear()
+        PriceSeriesRepository.clear()
+        self.prices = closes(400)
+        store_closes('AAPL', self.prices)
+
+    def series(self):
+        return PriceSeriesRepository.get('AAPL')
+
+    def test_indicators_match_reference_computations(self):
+        sma, std, rsi = IndicatorStore.get_many(self.series(), [('sma', 50), ('std', 20), ('rsi', 14)])
+
+        frame = pd.Series(self.prices)
+        np.testing.assert_allclose(sma, frame.rolling(50).mean(), rtol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(std, frame.rolling(20).std(ddof=0), rtol=1e-8, atol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(rsi, reference_rsi(self.prices, 14), rtol=1e-10, equal_nan=True)
+
+    def test_appended_closes_extend_the_stored_series(self):
+        IndicatorStore.get_many(self.series(), [('sma', 50), ('std', 20), ('rsi', 14)])
+        computed, extended = IndicatorStore.computed, IndicatorStore.extended
+
+        more = closes(30, seed=1)
+        store_closes('AAPL', more, start=date(2020, 1, 1) + timedelta(days=400))
+        incremental = IndicatorStore.get_many(self.series(), [('sma', 50), ('std', 20), ('rsi', 14)])
+
+        self.assertEqual(IndicatorStore.computed, computed)
+        self.assertEqual(IndicatorStore.extended, extended + 3)
+        row = IndicatorSeries.objects.get(stock_symbol='AAPL', indicator='sma', window=50)
+        self.assertEqual((row.length, row.last_date), (430, date(2020, 1, 1) + timedelta(days=429)))
+
+        IndicatorSeries.objects.all().delete()
+        recomputed = IndicatorStore.get_many(self.series(), [('sma', 50), ('std', 20), ('rsi', 14)])
+        for values, full in zip(incremental, recomputed):
+            np.testing.assert_allclose(values, full, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    def test_unchanged_closes_are_read_back_as_stored(self):
+        first = IndicatorStore.get(self.series(), 'sma', 20)
+        loaded = IndicatorStore.loaded
+        again = IndicatorStore.get(self.series(), 'sma', 20)
+
+        self.assertEqual(IndicatorStore.loaded, loaded + 1)
+        np.testing.assert_array_equal(first, again)
+
+    def test_revised_close_recomputes_the_series(self):
+        IndicatorStore.get(self.series(), 'sma', 5)
+        StockData.objects.filter(stock_symbol='AAPL', date=date(2020, 1, 10)).update(close_price=1000)
+        computed = IndicatorStore.computed
+
+        sma = IndicatorStore.get(self.series(), 'sma', 5)
+
+        self.assertEqual(IndicatorStore.computed, computed + 1)
+        prices = self.prices.copy()
+        prices[9] = 1000
+        np.testing.assert_allclose(sma, pd.Series(prices).rolling(5).mean(), rtol=1e-10, equal_nan=True)
+
+    def test_invalid_indicator(self):
+        with self.assertRaises(ValueError):
+            IndicatorStore.get(self.series(), 'macd', 12)
+        with self.assertRaises(ValueError):
+            IndicatorStore.get(self.series(), 'sma', 0)
+
+    def test_backtest_reads_moving_averages_from_the_store(self):
+        result = BacktestingService.run_backtest('AAPL', 10000, short_window=20, long_window=100)
+
+        stored = set(IndicatorSeries.objects.filter(stock_symbol='AAPL').values_list('indicator', 'window'))
+        self.assertEqual(stored, {('sma', 20), ('sma', 100)})
+        frame = pd.Series(self.prices)
+        reference = BacktestingService.simulate_crossover(
+            self.prices.reshape(-1, 1),
+            frame.rolling(20).mean().to_numpy().reshape(-1, 1),
+            frame.rolling(100).mean().to_numpy().reshape(-1, 1),
+            100,
+            10000,
+        )
+        self.assertAlmostEqual(result['final_value'], reference['final_value'][0], places=6)
+        self.assertEqual(result['trades_executed'], reference['trades_executed'][0])
+
+    def test_report_indicators(self):
+        indicators = ReportService.fetch_indicators('AAPL')
+
+        self.assertAlmostEqual(indicators['sma_50'], self.prices[-50:].mean(), places=8)
+        self.assertGreater(indicators['bollinger_upper_20'], indicators['bollinger_lower_20'])
+        self.assertTrue(0 <= indicators['rsi_14'] <= 100)
+        self.assertEqual(ReportService.fetch_indicators('MISSING'), {})
+
+    def test_build_indicators_command(self):
+        store_closes('MSFT', closes(100, seed=2))
+        out = StringIO()
+
+        call_command('build_indicators', '--indicator', 'sma:10', '--indicator', 'rsi:14', stdout=out)
+
+        self.assertIn('2/2 symbols', out.getvalue())
+        self.assertEqual(IndicatorSeries.objects.count(), 4)
+        with self.assertRaises(CommandError):
+            call_command('build_indicators', '--indicator', 'sma:x', stdout=StringIO())
@@ -0,0 +1,121 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from unittest.mock import patch
+from django.db import OperationalError
+from django.test import TestCase
+from services.financial_data_service import FinancialDataService
+from services.ingestion_service import IngestionService, TokenBucket
+from stocks_app.models import StockData
+
+
+def daily_payload(days=3):
+    today = datetime.now().date()
+    return {
+        "Time Series (Daily)": {
+            (today - timedelta(days=offset)).strftime('%Y-%m-%d'): {
+                "1. open": "150.00", "2. high": "155.00", "3. low": "148.00",
+                "4. close": "152.00", "5. volume": "1000000"
+            }
+            for offset in range(1, days + 1)
+        }
+    }
+
+
+class StubAlphaVantageHandler(BaseHTTPRequestHandler):
+    rate_limited_once = set()
+
+    def do_GET(self):
+        symbol = parse_qs(urlparse(self.path).query)['symbol'][0]
+        if symbol == 'LIMITED' and symbol not in self.rate_limited_once:
+            self.rate_limited_once.add(symbol)
+            body = {"Note": "Thank you for using Alpha Vantage! Please consider our premium subscription..."}
+        elif symbol == 'BROKEN':
+            body = {"Error Message": "Invalid API call."}
+        elif symbol == 'MALFORMED':
+            body = daily_payload()
+            for prices in body["Time Series (Daily)"].values():
+                del prices["1. open"]
+        else:
+            body = daily_payload()
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class IngestionServiceTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubAlphaVantageHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/query"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_ingest_symbols_against_stub_server(self):
+        results = IngestionService.ingest_symbols(
+            ['AAPL', 'msft', 'LIMITED', 'BROKEN'],
+            max_workers=4,
+            requests_per_minute=60000,
+            base_url=self.base_url,
+            backoff=0.01,
+        )
+
+        self.assertEqual(results['AAPL'], {'status': 'ok', 'records': 3})
+        self.assertEqual(results['MSFT'], {'status': 'ok', 'records': 3})
+        self.assertEqual(results['LIMITED'], {'status': 'ok', 'records': 3})
+        self.assertEqual(results['BROKEN']['status'], 'error')
+        self.assertEqual(StockData.objects.count(), 9)
+
+    def test_malformed_payloads_and_db_errors_fail_only_their_symbol(self):
+        store_time_series = FinancialDataService.store_time_series
+
+        def store(symbol, *args, **kwargs):
+            if symbol == 'LOCKED':
+                raise OperationalError("database is locked")
+            return store_time_series(symbol, *args, **kwargs)
+
+        with patch.object(FinancialDataService, 'store_time_series', side_effect=store):
+            results = IngestionService.ingest_symbols(
+                ['MALFORMED', 'LOCKED', 'AAPL'], max_workers=1, requests_per_minute=60000, base_url=self.base_url,
+            )
+
+        self.assertEqual(results['AAPL'], {'status': 'ok', 'records': 3})
+        self.assertEqual(results['MALFORMED'], {'status': 'error', 'error': "Malformed data: missing '1. open'"})
+        self.assertEqual(results['LOCKED'], {'status': 'error', 'error': 'database is locked'})
+        self.assertEqual(StockData.objects.count(), 3)
+
+    def test_token_bucket_spaces_requests_to_the_quota(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_minute=6, clock=clock, sleep=clock.sleep)
+
+        for _ in range(4):
+            bucket.acquire()
+
+        self.assertAlmostEqual(clock.now, 30.0)
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from django.test import SimpleTestCase
+from ml.linear_regression import LinearRegression
+
+class LinearRegressionTest(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = np.column_stack([np.arange(5000, dtype=float), rng.uniform(-1, 1, 5000)])
+        self.Y = self.X.dot([0.05, 3.0]) + 100
+
+    def test_lstsq_recovers_coefficients_on_raw_day_indices(self):
+        model = LinearRegression(solver='lstsq').fit(self.X, self.Y)
+        np.testing.assert_allclose(model.W, [0.05, 3.0], rtol=1e-9)
+        self.assertAlmostEqual(model.b, 100, places=6)
+        self.assertEqual(len(model.loss), 1)
+        self.assertLess(model.loss[0], 1e-12)
+
+    def test_gd_records_loss_in_preallocated_array(self):
+        X = self.X[:, 1:]
+        model = LinearRegression(learning_rate=0.1, iterations=200).fit(X, self.Y)
+        self.assertIsInstance(model.loss, np.ndarray)
+        self.assertEqual(len(model.loss), 200)
+        self.assertTrue(np.all(np.diff(model.loss) <= 1e-9 * model.loss[0]))
+
+        model = LinearRegression(learning_rate=0.1, iterations=200, record_loss=False).fit(X, self.Y)
+        self.assertEqual(len(model.loss), 0)
+
+    def test_sgd_and_partial_fit_converge(self):
+        X = self.X / self.X.max(axis=0)
+        expected = LinearRegression(solver='lstsq').fit(X, self.Y)
+
+        model = LinearRegression(learning_rate=0.05, iterations=300, solver='sgd', batch_size=64, random_state=0)
+        model.fit(X, self.Y)
+        np.testing.assert_allclose(model.W, expected.W, rtol=1e-3)
+        self.assertEqual(len(model.loss), 300)
+
+        streamed = LinearRegression(learning_rate=0.05, iterations=4, solver='sgd', batch_size=64, random_state=0)
+        for _ in range(300):
+            for start in range(0, len(X), 1000):
+                streamed.partial_fit(X[start:start + 1000], self.Y[start:start + 1000])
+        np.testing.assert_allclose(streamed.W, expected.W, rtol=1e-3)
+        self.assertEqual(len(streamed.loss), 1500)
+
+    def test_save_writes_memory_mappable_coefficients_and_sidecar(self):
+        model = LinearRegression(solver='lstsq').fit(self.X, self.Y)
+        self.assertFalse(hasattr(model, 'X'))
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = model.save(os.path.join(tmpdir, 'model.npy'), {'symbol': 'AAPL'})
+
+        self.assertEqual(os.path.getsize(path), 128 + 3 * 8)
+        with open(os.path.join(tmpdir, 'model.json')) as f:
+            sidecar = json.load(f)
+        self.assertEqual(sidecar['n_features'], 2)
+        self.assertEqual(sidecar['symbol'], 'AAPL')
+
+        loaded = LinearRegression.load(path)
+        self.assertIsInstance(loaded.W, np.memmap)
+        np.testing.assert_array_equal(loaded.predict(self.X[:10]), model.predict(self.X[:10]))
+
+    def test_unknown_solver(self):
+        with self.assertRaises(ValueError):
+            LinearRegression(solver='newton')
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from services.metrics import Metrics
+from services.price_series_repository import PriceSeriesRepository
+from tests.test_financial_data_service import upstream
+from tests.test_price_series_repository import create_rows
+
+
+def histogram_count(text, name, **labels):
+    """The _count sample of the named histogram series whose labels include `labels`, or 0."""
+    for line in text.splitlines():
+        if line.startswith(f"{name}_count") and all(f'{key}="{value}"' in line for key, value in labels.items()):
+            return int(line.rsplit(' ', 1)[1])
+    return 0
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        Metrics.reset()
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.003, 0.2, 0.2, 60):
+            Metrics.observe('span_duration_seconds', value, span='chart_render')
+
+        lines = Metrics.histogram_lines()
+        self.assertIn('span_duration_seconds_bucket{span="chart_render",le="0.005"} 1', lines)
+        self.assertIn('span_duration_seconds_bucket{span="chart_render",le="0.25"} 3', lines)
+        self.assertIn('span_duration_seconds_bucket{span="chart_render",le="30.0"} 3', lines)
+        self.assertIn('span_duration_seconds_bucket{span="chart_render",le="+Inf"} 4', lines)
+        self.assertIn('span_duration_seconds_count{span="chart_render"} 4', lines)
+
+    def test_label_values_are_escaped(self):
+        Metrics.observe('span_duration_seconds', 1, span='a"b\\c\nd')
+
+        self.assertIn('span_duration_seconds_count{span="a\\"b\\\\c\\nd"} 1', Metrics.histogram_lines())
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_record_latency_only(self):
+        self.client.get(reverse('stocks_home'))
+        with Metrics.span('backtest'):
+            pass
+
+        text = Metrics.render()
+        self.assertEqual(histogram_count(text, 'http_request_duration_seconds', view='stocks_home', status='200'), 1)
+        self.assertEqual(histogram_count(text, 'http_request_db_queries'), 0)
+        self.assertEqual(histogram_count(text, 'span_duration_seconds'), 0)
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_sampled_request_records_queries_and_spans(self):
+        create_rows('AAPL', 250)
+        PriceSeriesRepository.clear()
+
+        response = self.client.get(reverse('run_portfolio_backtest'), {'symbols': 'AAPL'})
+
+        self.assertEqual(response.status_code, 200)
+        text = Metrics.render()
+        self.assertEqual(histogram_count(text, 'http_request_db_queries', view='run_portfolio_backtest'), 1)
+        self.assertNotIn('http_request_db_queries_sum{view="run_portfolio_backtest"} 0', text)
+        self.assertEqual(histogram_count(text, 'span_duration_seconds', span='backtest_portfolio'), 1)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_records_nothing(self):
+        self.client.get(reverse('stocks_home'))
+
+        self.assertEqual(histogram_count(Metrics.render(), 'http_request_duration_seconds'), 0)
+
+    def test_unmatched_paths_share_one_label(self):
+        self.client.get('/stocks/no-such-page/')
+        self.client.get('/stocks/another-missing-page/')
+
+        text = Metrics.render()
+        self.assertEqual(histogram_count(text, 'http_request_duration_seconds', view='unmatched', status='404'), 2)
+
+    def test_metrics_endpoint(self):
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('report_cache_events_total{event="hits",kind="report"}', text)
+        self.assertIn('price_series_cache_events_total{event="misses"}', text)
+        self.assertIn('# TYPE model_registry_models gauge', text)
+
+
+class AsyncViewMetricsTest(TransactionTestCase):
+
+    def setUp(self):
+        Metrics.reset()
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_executor_queries_and_upstream_span_are_attributed(self):
+        with patch('services.financial_data_service.get_async_client', return_value=upstream()):
+            response = self.client.get(reverse('fetch_data', args=['aapl']))
+
+        self.assertEqual(response.status_code, 200)
+        text = Metrics.render()
+        self.assertEqual(histogram_count(text, 'span_duration_seconds', span='alpha_vantage_fetch'), 1)
+        # The high-water mark read and the upsert run on the blocking executor's threads.
+        self.assertNotIn('http_request_db_queries_bucket{view="fetch_data",le="1"} 1', text)
+        self.assertEqual(histogram_count(text, 'http_request_db_queries', view='fetch_data'), 1)
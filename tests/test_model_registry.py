@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import joblib
+import numpy as np
+from django.test import TestCase, override_settings
+from ml.linear_regression import LinearRegression
+from services.model_registry import ModelRegistry
+from services.prediction_service import PredictionService
+
+
+@override_settings(MODEL_REGISTRY_CHECK_INTERVAL=0)
+class ModelRegistryTest(TestCase):
+
+    def setUp(self):
+        ModelRegistry.clear()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'model.pkl')
+        joblib.dump({'version': 1}, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_model_is_loaded_once_and_memoized(self):
+        misses = ModelRegistry.misses
+        hits = ModelRegistry.hits
+
+        first = ModelRegistry.get(self.path)
+        second = ModelRegistry.get(self.path)
+
+        self.assertIs(first, second)
+        self.assertEqual(ModelRegistry.misses - misses, 1)
+        self.assertEqual(ModelRegistry.hits - hits, 1)
+        self.assertIn(os.path.abspath(self.path), ModelRegistry.stats()['models'])
+
+    def test_model_is_swapped_when_file_changes(self):
+        first = ModelRegistry.get(self.path)
+        joblib.dump({'version': 2, 'padding': 'x' * 100}, self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        second = ModelRegistry.get(self.path)
+
+        self.assertEqual(first['version'], 1)
+        self.assertEqual(second['version'], 2)
+
+    def test_failed_reload_keeps_previous_model(self):
+        first = ModelRegistry.get(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'not a pickle')
+
+        self.assertIs(ModelRegistry.get(self.path), first)
+
+    @override_settings(MODEL_REGISTRY_MAX_MODELS=2)
+    def test_least_recently_used_models_are_evicted(self):
+        paths = [os.path.join(self.tmpdir, f"model{i}.pkl") for i in range(3)]
+        for i, path in enumerate(paths):
+            joblib.dump({'version': i}, path)
+        evictions = ModelRegistry.evictions
+
+        ModelRegistry.get(paths[0])
+        ModelRegistry.get(paths[1])
+        ModelRegistry.get(paths[0])
+        ModelRegistry.get(paths[2])
+
+        resident = sorted(ModelRegistry.stats()['models'])
+        self.assertEqual(resident, sorted(os.path.abspath(path) for path in (paths[0], paths[2])))
+        self.assertEqual(ModelRegistry.evictions - evictions, 1)
+        misses = ModelRegistry.misses
+        self.assertEqual(ModelRegistry.get(paths[1])['version'], 1)
+        self.assertEqual(ModelRegistry.misses - misses, 1)
+
+    def test_loader_is_chosen_by_extension(self):
+        model = LinearRegression()
+        model.W, model.b = np.array([2.0]), 1.0
+        path = model.save(os.path.join(self.tmpdir, 'model.npy'))
+
+        loaded = ModelRegistry.get(path)
+        self.assertIsInstance(loaded, LinearRegression)
+        self.assertEqual(loaded.predict(np.array([[3.0]]))[0], 7.0)
+        self.assertEqual(ModelRegistry.get(os.path.join(self.tmpdir, 'model.json'))['n_features'], 1)
+
+    def test_missing_combined_model_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            ModelRegistry.get(os.path.join(self.tmpdir, 'missing.pkl'))
+
+    def test_prediction_service_uses_resident_model(self):
+        self.assertIs(PredictionService.load_combined_model(), PredictionService.load_combined_model())
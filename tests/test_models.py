@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from stocks_app.models import StockData, PredictionData
 import factory
@@ -33,3 +34,11 @@ class ModelsTest(TestCase):
         prediction = PredictionDataFactory()
         self.assertIsNotNone(prediction.id)
         self.assertEqual(prediction.stock_symbol, 'AAPL')
+
+    def test_stock_data_symbol_date_is_unique(self):
+        stock = StockDataFactory()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StockDataFactory(stock_symbol=stock.stock_symbol, date=stock.date)
+
+        StockDataFactory(stock_symbol='MSFT', date=stock.date)
+        self.assertEqual(StockData.objects.filter(date=stock.date).count(), 2)
@@ -1,7 +1,14 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from unittest.mock import patch
+from ml.linear_regression import LinearRegression
+from services.data_version import DataVersion
 from services.prediction_service import PredictionService
-from stocks_app.models import StockData
+from stocks_app.models import StockData, PredictionData
 
 class PredictionServiceTest(TestCase):
 
@@ -23,3 +30,74 @@ class PredictionServiceTest(TestCase):
             PredictionService.predict_stock_prices('AAPL')
 
         self.assertEqual(str(cm.exception), "Not enough historical data to make predictions.")
+
+    @patch('services.prediction_service.PredictionService.load_combined_model')
+    def test_predict_many_runs_one_inference_and_bulk_upserts(self, mock_model):
+        model = LinearRegression(learning_rate=0.0001, iterations=0)
+        model.W, model.b = np.array([2.0]), 100.0
+        mock_model.return_value = model
+        start = date(2024, 1, 1)
+        for symbol, count in [('AAPL', 60), ('MSFT', 45), ('TINY', 10)]:
+            StockData.objects.bulk_create([
+                StockData(stock_symbol=symbol, date=start + timedelta(days=i), open_price=100, close_price=100,
+                          high_price=100, low_price=100, volume=1000)
+                for i in range(count)
+            ])
+
+        with patch.object(model, 'predict', wraps=model.predict) as predict:
+            result = PredictionService.predict_many(['aapl', 'MSFT', 'TINY', 'NONE'], days=5)
+            predict.assert_called_once()
+
+        np.testing.assert_allclose(result['predictions']['AAPL'], 100 + 2 * np.arange(60, 65))
+        np.testing.assert_allclose(result['predictions']['MSFT'], 100 + 2 * np.arange(45, 50))
+        self.assertEqual(sorted(result['errors']), ['NONE', 'TINY'])
+        self.assertIn('manage.py ingest', result['errors']['NONE'])
+        self.assertEqual(PredictionData.objects.count(), 10)
+        self.assertEqual(
+            PredictionData.objects.get(stock_symbol='MSFT', date=start + timedelta(days=45)).predicted_price,
+            Decimal('190.00'),
+        )
+
+        PredictionService.predict_many(['AAPL', 'MSFT'], days=5)
+        self.assertEqual(PredictionData.objects.count(), 10)
+
+    def test_store_predictions_upserts_long_horizons_in_constant_queries(self):
+        last_date = date(2024, 1, 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            PredictionService.store_predictions('AAPL', last_date, np.full(365, 150.0))
+        # One SELECT to skip unchanged rows, then the batched upsert.
+        self.assertLessEqual(len(queries), 5)
+        PredictionService.store_predictions('AAPL', last_date, np.full(10, 175.0))
+
+        self.assertEqual(PredictionData.objects.filter(stock_symbol='AAPL').count(), 365)
+        self.assertEqual(
+            PredictionData.objects.get(stock_symbol='AAPL', date=last_date + timedelta(days=1)).predicted_price,
+            Decimal('175.00'),
+        )
+        self.assertEqual(
+            PredictionData.objects.get(stock_symbol='AAPL', date=last_date + timedelta(days=365)).predicted_price,
+            Decimal('150.00'),
+        )
+
+    def test_unchanged_predictions_do_not_bump_the_data_version(self):
+        last_date = date(2024, 1, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            PredictionService.store_predictions_bulk({'AAPL': (last_date, np.full(5, 150.0))})
+        version = DataVersion.get('AAPL')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(PredictionService.store_predictions_bulk({'AAPL': (last_date, np.full(5, 150.001))}), 0)
+        self.assertEqual(DataVersion.get('AAPL'), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(PredictionService.store_predictions_bulk({'AAPL': (last_date, [150.0, 151.0])}), 1)
+        self.assertGreater(DataVersion.get('AAPL'), version)
+
+    def test_prediction_horizon_is_validated(self):
+        self.assertEqual(PredictionService.validate_horizon(None), 30)
+        self.assertEqual(PredictionService.validate_horizon(365), 365)
+        with self.assertRaises(ValueError):
+            PredictionService.validate_horizon(0)
+        with self.assertRaises(ValueError):
+            PredictionService.validate_horizon(100000)
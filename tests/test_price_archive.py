@@ -0,0 +1,101 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+import numpy as np
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from services.financial_data_service import FinancialDataService
+from services.price_archive import PriceArchive
+from services.price_series_repository import PriceSeriesRepository
+from stocks_app.models import StockData
+from tests.test_price_series_repository import create_rows, record
+
+
+class PriceArchiveTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        PriceSeriesRepository.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PRICE_ARCHIVE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_rebuild_writes_memory_mapped_columns(self):
+        create_rows('AAPL', 10)
+
+        self.assertEqual(PriceArchive.rebuild('AAPL'), 10)
+
+        columns = PriceArchive.load('AAPL')
+        self.assertIsInstance(columns['close'], np.memmap)
+        self.assertFalse(columns['close'].flags.writeable)
+        np.testing.assert_array_equal(columns['close'], np.arange(100, 110, dtype=np.float64))
+        self.assertEqual(columns['date'].dtype, np.int32)
+        self.assertEqual(int(columns['date'][0]), date(2024, 1, 1).toordinal())
+        self.assertEqual(columns['volume'].tolist(), [1000] * 10)
+        self.assertEqual(PriceArchive.pointer('AAPL')['last_date'], '2024-01-10')
+
+    def test_ingest_appends_new_rows_and_rebuilds_on_changes(self):
+        records = [record(date(2024, 1, 1) + timedelta(days=i), 100 + i) for i in range(5)]
+        FinancialDataService.bulk_store_stock_data('AAPL', records)
+        rebuilds, appends = PriceArchive.rebuilds, PriceArchive.appends
+
+        FinancialDataService.bulk_store_stock_data('AAPL', [record(date(2024, 1, 6), 200)])
+        self.assertEqual((PriceArchive.rebuilds, PriceArchive.appends), (rebuilds, appends + 1))
+        self.assertEqual(PriceArchive.load('AAPL')['close'].tolist(), [100, 101, 102, 103, 104, 200])
+
+        FinancialDataService.bulk_store_stock_data('AAPL', [record(date(2024, 1, 2), 300)])
+        self.assertEqual(PriceArchive.rebuilds, rebuilds + 1)
+        self.assertEqual(PriceArchive.load('AAPL')['close'].tolist(), [100, 300, 102, 103, 104, 200])
+        # Only the current generation is kept.
+        generations = [name for name in os.listdir(PriceArchive.symbol_dir('AAPL')) if name.isdigit()]
+        self.assertEqual(generations, [PriceArchive.pointer('AAPL')['generation']])
+
+    def test_repository_reads_archived_symbols_without_queries(self):
+        create_rows('AAPL', 10)
+        create_rows('MSFT', 5)
+        PriceArchive.rebuild('AAPL')
+
+        with CaptureQueriesContext(connection) as queries:
+            series = PriceSeriesRepository.get_many(['AAPL', 'MSFT'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('AAPL', queries[0]['sql'])
+        np.testing.assert_array_equal(series['AAPL'].close, np.arange(100, 110, dtype=np.float64))
+        self.assertEqual(len(series['MSFT']), 5)
+
+        PriceSeriesRepository.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(PriceSeriesRepository.get('AAPL')), 10)
+        self.assertEqual(len(queries), 0)
+
+    def test_row_saves_drop_the_symbol_from_the_archive(self):
+        create_rows('AAPL', 10)
+        PriceArchive.rebuild('AAPL')
+
+        row = StockData.objects.get(stock_symbol='AAPL', date=date(2024, 1, 3))
+        row.close_price = 500
+        row.save()
+
+        self.assertIsNone(PriceArchive.load('AAPL'))
+        self.assertEqual(PriceSeriesRepository.get('AAPL').close[2], 500)
+
+    def test_symbols_outside_the_archive_are_rejected(self):
+        self.assertIsNone(PriceArchive.load('../AAPL'))
+        self.assertIsNone(PriceArchive.symbol_dir('a/b'))
+
+    def test_build_price_archive_command(self):
+        create_rows('AAPL', 10)
+        create_rows('MSFT', 5)
+        out = StringIO()
+
+        call_command('build_price_archive', stdout=out)
+
+        self.assertIn('15 rows for 2/2 symbols', out.getvalue())
+        self.assertEqual(PriceArchive.archived_symbols(), ['AAPL', 'MSFT'])
+        with override_settings(PRICE_ARCHIVE_DIR=None), self.assertRaises(CommandError):
+            call_command('build_price_archive', stdout=StringIO())
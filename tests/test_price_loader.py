@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from django.test import TestCase
+from services.price_loader import PRICE_FIELDS, PriceLoader
+from stocks_app.models import StockData
+
+
+class PriceLoaderTest(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.prices = [Decimal(int(cents)) / 100 for cents in rng.integers(1, 10 ** 9, 500)]
+        self.prices[:4] = [Decimal('0.01'), Decimal('10.07'), Decimal('99999999.99'), Decimal('0.29')]
+        self.start = date(1999, 12, 28)
+        StockData.objects.bulk_create([
+            StockData(stock_symbol='AAPL', date=self.start + timedelta(days=i), open_price=price, close_price=price,
+                      high_price=price, low_price=price, volume=10 ** 10 + i)
+            for i, price in enumerate(self.prices)
+        ])
+
+    def test_columns_match_the_stored_decimals_and_dates(self):
+        columns = PriceLoader.load_many(['AAPL'], ['close_price', 'volume'])['AAPL']
+
+        self.assertEqual(columns['date'].dtype, np.int32)
+        self.assertEqual(columns['close_price'].dtype, np.int64)
+        expected_dates = [(self.start + timedelta(days=i)).toordinal() for i in range(len(self.prices))]
+        self.assertEqual(columns['date'].tolist(), expected_dates)
+        self.assertEqual(columns['close_price'].tolist(), [int(price * 100) for price in self.prices])
+        # Same floats as converting each Decimal, so series loaded either way compare equal.
+        self.assertEqual(PriceLoader.to_price(columns['close_price']).tolist(), [float(price) for price in self.prices])
+        self.assertEqual(columns['volume'][-1], 10 ** 10 + len(self.prices) - 1)
+
+    def test_symbols_are_split_and_missing_ones_omitted(self):
+        StockData.objects.create(stock_symbol='MSFT', date=self.start, open_price=1, close_price=2, high_price=3,
+                                 low_price=Decimal('0.5'), volume=1)
+
+        loaded = PriceLoader.load_many(['AAPL', 'MSFT', 'NONE'], PRICE_FIELDS)
+
+        self.assertEqual(set(loaded), {'AAPL', 'MSFT'})
+        self.assertEqual(len(loaded['AAPL']['date']), len(self.prices))
+        self.assertEqual({field: values.tolist() for field, values in loaded['MSFT'].items()}, {
+            'date': [self.start.toordinal()], 'open_price': [100], 'high_price': [300], 'low_price': [50],
+            'close_price': [200],
+        })
+        self.assertEqual(PriceLoader.load_many([]), {})
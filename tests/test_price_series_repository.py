@@ -0,0 +1,128 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from services.data_version import DataVersion
+from services.financial_data_service import FinancialDataService
+from services.price_series_repository import PriceSeriesRepository
+from stocks_app.models import StockData
+
+
+def create_rows(symbol, count, start=date(2024, 1, 1), price=100):
+    StockData.objects.bulk_create([
+        StockData(
+            stock_symbol=symbol, date=start + timedelta(days=i), open_price=price + i,
+            close_price=price + i, high_price=price + i, low_price=price + i, volume=1000,
+        )
+        for i in range(count)
+    ])
+
+
+def record(day, close):
+    close = Decimal(close)
+    return {'date': day, 'open_price': close, 'close_price': close, 'high_price': close,
+            'low_price': close, 'volume': 1000}
+
+
+class PriceSeriesRepositoryTest(TransactionTestCase):
+
+    def setUp(self):
+        # Flushing the test database between tests bumps no data versions.
+        cache.clear()
+        PriceSeriesRepository.clear()
+
+    def test_get_loads_once_and_serves_from_cache(self):
+        create_rows('AAPL', 10)
+
+        series = PriceSeriesRepository.get('AAPL')
+        with self.assertNumQueries(0):
+            cached = PriceSeriesRepository.get('AAPL')
+
+        self.assertIs(series, cached)
+        self.assertEqual(series.dates.dtype, 'int32')
+        self.assertEqual(series.close.dtype, 'float64')
+        self.assertEqual(series.last_date, date(2024, 1, 10))
+        self.assertEqual(series.tail(3).close.tolist(), [107.0, 108.0, 109.0])
+        self.assertIsNone(PriceSeriesRepository.get('NONE'))
+
+    def test_get_many_loads_missing_symbols_in_one_query(self):
+        create_rows('AAPL', 5)
+        create_rows('MSFT', 5)
+        PriceSeriesRepository.get('AAPL')
+
+        with self.assertNumQueries(1):
+            series = PriceSeriesRepository.get_many(['AAPL', 'MSFT', 'NONE'])
+
+        self.assertEqual(sorted(series), ['AAPL', 'MSFT'])
+
+    def test_ingest_appends_new_rows_and_invalidates_on_changes(self):
+        create_rows('AAPL', 5)
+        PriceSeriesRepository.get('AAPL')
+
+        FinancialDataService.bulk_store_stock_data('AAPL', [record(date(2024, 1, 6), '200.00')])
+        with self.assertNumQueries(0):
+            series = PriceSeriesRepository.get('AAPL')
+        self.assertEqual(series.close[-1], 200.0)
+        self.assertEqual(len(series), 6)
+
+        FinancialDataService.bulk_store_stock_data('AAPL', [record(date(2024, 1, 6), '201.00')])
+        with self.assertNumQueries(1):
+            series = PriceSeriesRepository.get('AAPL')
+        self.assertEqual(series.close[-1], 201.0)
+
+    def test_data_version_bump_reloads_the_series(self):
+        create_rows('AAPL', 5)
+        PriceSeriesRepository.get('AAPL')
+
+        # A write by another process only shows up here as a bumped version in the shared cache.
+        StockData.objects.filter(stock_symbol='AAPL').update(close_price=300)
+        DataVersion.bump('AAPL')
+
+        with self.assertNumQueries(1):
+            series = PriceSeriesRepository.get('AAPL')
+        self.assertEqual(series.close[-1], 300.0)
+
+    def test_shared_cache_serves_series_loaded_by_another_process(self):
+        create_rows('AAPL', 5)
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+            'BACKEND': 'services.cache_backends.SQLiteCache',
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        }}):
+            PriceSeriesRepository.get('AAPL')
+            shared_hits = PriceSeriesRepository.stats()['shared_hits']
+            # A fresh process starts with an empty in-process LRU.
+            PriceSeriesRepository.clear()
+            with self.assertNumQueries(0):
+                series = PriceSeriesRepository.get('AAPL')
+
+            self.assertEqual(series.close.tolist(), [100.0, 101.0, 102.0, 103.0, 104.0])
+            self.assertEqual(PriceSeriesRepository.stats()['shared_hits'], shared_hits + 1)
+
+            DataVersion.bump('AAPL')
+            PriceSeriesRepository.clear()
+            with self.assertNumQueries(1):
+                PriceSeriesRepository.get('AAPL')
+
+    def test_lru_eviction_respects_memory_budget(self):
+        for symbol in ['AAA', 'BBB', 'CCC']:
+            create_rows(symbol, 100)
+
+        with override_settings(PRICE_SERIES_CACHE_BYTES=2 * 100 * 12):
+            for symbol in ['AAA', 'BBB', 'CCC']:
+                PriceSeriesRepository.get(symbol)
+            stats = PriceSeriesRepository.stats()
+
+        self.assertEqual(stats['symbols'], 2)
+        self.assertLessEqual(stats['bytes'], stats['max_bytes'])
+        self.assertNotIn('AAA', PriceSeriesRepository._cache)
+
+    def test_reads_inside_transactions_bypass_the_cache(self):
+        create_rows('AAPL', 5)
+
+        with transaction.atomic():
+            PriceSeriesRepository.get('AAPL')
+
+        self.assertEqual(PriceSeriesRepository.stats()['symbols'], 0)
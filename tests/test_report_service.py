@@ -1,8 +1,32 @@
+import base64
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from services.data_version import DataVersion
 from services.report_service import ReportService
+from stocks_app.models import StockData, PredictionData
+
+PNG = b'\x89PNG fake chart'
+
+
+def summary(symbol, total_return=1):
+    cache.set(f"chart_{symbol}_{total_return}", PNG)
+    return {'symbol': symbol, 'version': DataVersion.get(symbol), 'total_return': total_return, 'max_drawdown': 0,
+            'trades_executed': 0, 'chart_key': f"chart_{symbol}_{total_return}"}
 
 class ReportServiceTest(TestCase):
 
+    def setUp(self):
+        cache.clear()
+        for counters in ReportService.cache_counters.values():
+            counters.update(dict.fromkeys(counters, 0))
+
     def test_generate_json_report(self):
         report = ReportService.generate_json_report('AAPL')
         self.assertIn('total_return', report)
@@ -13,3 +37,143 @@ class ReportServiceTest(TestCase):
         pdf_report = ReportService.generate_pdf_report('AAPL')
         self.assertIsNotNone(pdf_report)
         self.assertGreater(len(pdf_report), 0)
+
+    def test_concurrent_misses_share_one_build(self):
+        builds = []
+
+        def slow_build(symbol):
+            builds.append(symbol)
+            time.sleep(0.2)
+            return summary(symbol)
+
+        results = []
+        with patch.object(ReportService, 'build_report', side_effect=slow_build):
+            threads = [
+                threading.Thread(target=lambda: results.append(ReportService.generate_json_report('AAPL')))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(builds, ['AAPL'])
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(base64.b64decode(results[0]['graph']), PNG)
+        self.assertNotIn('chart_key', results[0])
+        self.assertNotIn('version', results[0])
+        self.assertEqual(ReportService.cache_stats()['report']['misses'], 1)
+        self.assertEqual(ReportService.cache_stats()['report']['waits'], 7)
+
+    def test_cache_counters_are_exact_across_threads(self):
+        def count():
+            for _ in range(10000):
+                ReportService.count('chart', 'hits')
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=count) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        self.assertEqual(ReportService.cache_stats()['chart']['hits'], 80000)
+
+    def test_value_stored_between_miss_and_lock_is_not_rebuilt(self):
+        cache.set('report_AAPL', 'built elsewhere')
+        get = cache.get
+        misses = []
+
+        def get_after_concurrent_build(key, *args, **kwargs):
+            # The first read misses, as if the other builder stored the value just after it.
+            if key == 'report_AAPL' and not misses:
+                misses.append(key)
+                return None
+            return get(key, *args, **kwargs)
+
+        build = Mock()
+        with patch.object(cache, 'get', side_effect=get_after_concurrent_build):
+            value = ReportService.get_or_build('report_AAPL', build)
+
+        self.assertEqual(value, 'built elsewhere')
+        build.assert_not_called()
+        self.assertEqual(ReportService.cache_stats()['report']['hits'], 1)
+        self.assertIsNone(cache.get('report_AAPL:building'))
+
+    def test_failed_build_is_not_cached_and_refresh_rebuilds(self):
+        with patch.object(ReportService, 'build_report', side_effect=ValueError("No stock data available")):
+            self.assertEqual(ReportService.generate_json_report('AAPL'), {'error': 'No stock data available'})
+
+        builds = [summary('AAPL', 1), summary('AAPL', 2)]
+        with patch.object(ReportService, 'build_report', side_effect=builds) as build:
+            self.assertEqual(ReportService.generate_json_report('AAPL')['total_return'], 1)
+            self.assertEqual(ReportService.generate_json_report('AAPL')['total_return'], 1)
+            self.assertEqual(ReportService.generate_json_report('AAPL', refresh=True)['total_return'], 2)
+            self.assertEqual(build.call_count, 2)
+
+    @patch.object(ReportService, 'ensure_data_ready', return_value={'total_return': 5.0, 'max_drawdown': 1.0,
+                                                                     'trades_executed': 3})
+    def test_json_and_pdf_reports_share_one_chart_render(self, ensure_data_ready):
+        start = date(2024, 1, 1)
+        for i in range(40):
+            StockData.objects.create(stock_symbol='AAPL', date=start + timedelta(days=i), open_price=100,
+                                     close_price=100 + i, high_price=100, low_price=100, volume=1000)
+            PredictionData.objects.create(stock_symbol='AAPL', date=start + timedelta(days=40 + i),
+                                          predicted_price=140 + i)
+
+        with patch.object(ReportService, 'generate_graph', wraps=ReportService.generate_graph) as render:
+            json_report = ReportService.generate_json_report('AAPL')
+            pdf_report = ReportService.generate_pdf_report('AAPL')
+            render.assert_called_once()
+
+        self.assertEqual(ensure_data_ready.call_count, 1)
+        self.assertEqual(json_report['total_return'], 5.0)
+        self.assertTrue(base64.b64decode(json_report['graph']).startswith(b'\x89PNG'))
+        self.assertTrue(pdf_report.startswith(b'%PDF'))
+
+    def test_warm_reports_command_prerenders_both_formats(self):
+        with patch.object(ReportService, 'build_report', return_value=summary('AAPL')), \
+                patch.object(ReportService, 'build_pdf_report', return_value=b'%PDF'):
+            out = StringIO()
+            call_command('warm_reports', 'aapl', stdout=out)
+
+        version = DataVersion.get('AAPL')
+        self.assertEqual(cache.get(f'report_AAPL_{version}')['symbol'], 'AAPL')
+        self.assertEqual(cache.get(f'pdf_report_AAPL_{version}'), b'%PDF')
+        self.assertIn('Warmed reports for 1/1 symbols', out.getvalue())
+
+    def test_data_version_bump_invalidates_only_that_symbol(self):
+        returns = iter([1, 1, 2])
+        with patch.object(ReportService, 'build_report', side_effect=lambda symbol: summary(symbol, next(returns))) \
+                as build:
+            self.assertEqual(ReportService.generate_json_report('AAPL')['total_return'], 1)
+            self.assertEqual(ReportService.generate_json_report('MSFT')['total_return'], 1)
+            old_key = f"report_AAPL_{DataVersion.get('AAPL')}"
+
+            with self.captureOnCommitCallbacks(execute=True):
+                StockData.objects.create(stock_symbol='AAPL', date=date(2024, 1, 2), open_price=100,
+                                         close_price=101, high_price=102, low_price=99, volume=1000)
+
+            self.assertEqual(ReportService.generate_json_report('AAPL')['total_return'], 2)
+            self.assertEqual(ReportService.generate_json_report('MSFT')['total_return'], 1)
+            self.assertEqual(build.call_count, 3)
+
+        self.assertIsNone(cache.get(old_key))
+        self.assertEqual(ReportService.cache_stats()['report'],
+                         {'hits': 1, 'misses': 2, 'rebuilds': 1, 'waits': 0})
+
+    def test_report_is_filed_under_the_version_its_build_produced(self):
+        def build(symbol):
+            with self.captureOnCommitCallbacks(execute=True):
+                PredictionData.objects.create(stock_symbol=symbol, date=date(2024, 2, 1), predicted_price=150)
+            return summary(symbol)
+
+        with patch.object(ReportService, 'build_report', side_effect=build) as build_report:
+            ReportService.generate_json_report('AAPL')
+            ReportService.generate_json_report('AAPL')
+            self.assertEqual(build_report.call_count, 1)
@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from services.model_registry import ModelRegistry
+from services.prediction_service import PredictionService
+from services.training_service import TrainingService
+from stocks_app.models import StockData
+
+
+@override_settings(MODEL_REGISTRY_CHECK_INTERVAL=0)
+class TrainingServiceTest(TestCase):
+
+    def setUp(self):
+        ModelRegistry.clear()
+        self.tmpdir = tempfile.mkdtemp()
+        self.model_dir = override_settings(MODEL_DIR=self.tmpdir)
+        self.model_dir.enable()
+        self.start = date(2024, 1, 1)
+        self.add_prices('AAPL', lambda i: 100 + 0.5 * i, 80)
+        self.add_prices('MSFT', lambda i: 300 - 0.25 * i, 80)
+        self.add_prices('TSLA', lambda i: 200 * (1 + 0.01 * i), 80)
+        self.add_prices('AMZN', lambda i: 100 * (1 + 0.01 * i), 80)
+        self.add_prices('TINY', lambda i: 10, 10)
+
+    def tearDown(self):
+        self.model_dir.disable()
+        shutil.rmtree(self.tmpdir)
+        ModelRegistry.clear()
+
+    def add_prices(self, symbol, price, count, offset=0):
+        StockData.objects.bulk_create([
+            StockData(stock_symbol=symbol, date=self.start + timedelta(days=i), open_price=price(i),
+                      close_price=round(price(i), 2), high_price=price(i), low_price=price(i), volume=1000)
+            for i in range(offset, offset + count)
+        ])
+
+    def test_per_symbol_models_are_versioned_and_used_for_predictions(self):
+        result = TrainingService.train(['aapl', 'MSFT', 'TINY', 'NONE'], history_days=60)
+
+        self.assertEqual(sorted(result['models']), ['AAPL', 'MSFT'])
+        self.assertEqual(sorted(result['skipped']), ['NONE', 'TINY'])
+
+        metadata_path = os.path.join(self.tmpdir, 'AAPL', f"{result['version']}.json")
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        self.assertEqual(metadata['symbols']['AAPL']['start_date'], str(self.start + timedelta(days=20)))
+        self.assertEqual(metadata['symbols']['AAPL']['end_date'], str(self.start + timedelta(days=79)))
+        self.assertAlmostEqual(metadata['metrics']['r2'], 1.0)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, metadata['artifact'])))
+        self.assertEqual(TrainingService.latest_pointer('AAPL')['version'], result['version'])
+
+        predictions = PredictionService.predict_many(['AAPL', 'MSFT'], days=3)['predictions']
+        np.testing.assert_allclose(predictions['AAPL'], 100 + 0.5 * np.arange(80, 83))
+        np.testing.assert_allclose(predictions['MSFT'], 300 - 0.25 * np.arange(80, 83))
+
+        # Rows ingested after training extend the model's day index instead of resetting it.
+        self.add_prices('AAPL', lambda i: 100 + 0.5 * i, 5, offset=80)
+        predictions = PredictionService.predict_stock_prices('AAPL', days=3)
+        np.testing.assert_allclose(predictions, 100 + 0.5 * np.arange(85, 88))
+
+    def test_cluster_model_is_shared_and_rescaled_per_symbol(self):
+        result = TrainingService.train(['AAPL', 'TSLA'], clusters={'ev': ['TSLA', 'AMZN']})
+
+        self.assertEqual(sorted(result['models']), ['AAPL', 'EV'])
+        tsla, amzn = TrainingService.latest_pointer('TSLA'), TrainingService.latest_pointer('AMZN')
+        self.assertEqual(tsla['artifact'], amzn['artifact'])
+        self.assertEqual(tsla['target'], 'relative')
+
+        predictions = PredictionService.predict_many(['TSLA', 'AMZN'], days=2)['predictions']
+        np.testing.assert_allclose(predictions['TSLA'], 200 * (1 + 0.01 * np.arange(80, 82)), rtol=1e-4)
+        np.testing.assert_allclose(predictions['AMZN'], 100 * (1 + 0.01 * np.arange(80, 82)), rtol=1e-4)
+
+    def test_parallel_fitting_matches_inline(self):
+        inline = TrainingService.train(['AAPL', 'MSFT'], processes=1)
+        with patch('services.training_service.TRAIN_PARALLEL_THRESHOLD', 0):
+            parallel = TrainingService.train(['AAPL', 'MSFT'], processes=2)
+
+        for symbol in ('AAPL', 'MSFT'):
+            self.assertEqual(inline['models'][symbol]['metrics'], parallel['models'][symbol]['metrics'])
+        self.assertEqual(TrainingService.latest_pointer('AAPL')['version'], parallel['version'])
+
+    def test_train_models_command(self):
+        out = StringIO()
+        call_command('train_models', 'AAPL', '--cluster', 'EV=TSLA,AMZN', stdout=out, stderr=StringIO())
+
+        self.assertIn('AAPL: symbol model for AAPL', out.getvalue())
+        self.assertIn('EV: cluster model for TSLA, AMZN', out.getvalue())
+        self.assertIn('Published 2 models', out.getvalue())
+
+    def test_combined_model_is_rebuilt_for_untrained_symbols(self):
+        out = StringIO()
+        call_command('train_models', '--combined', 'AAPL', 'AAPL', stdout=out)
+
+        self.assertIn('Published the combined model for AAPL', out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'combined_stock_price_model.npy')))
+        # AAPL has no model of its own, so predictions use the combined one on the window's day index.
+        predictions = PredictionService.predict_stock_prices('AAPL', days=2)
+        np.testing.assert_allclose(predictions, 100 + 0.5 * np.arange(80, 82))
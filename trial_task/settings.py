@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "stocks_app.middleware.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -140,6 +142,91 @@ SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "False") == "True"
 CSRF_COOKIE_SECURE = os.getenv("CSRF_COOKIE_SECURE", "False") == "True"
 X_FRAME_OPTIONS = 'DENY'
 
+# Cache for reports, data versions and price series. "locmem" is per process; "sqlite" is one file
+# shared by every process on the host; "redis" is shared across hosts (bound its memory with the
+# server's maxmemory and an allkeys-lru policy). Shared backends compress values of at least
+# CACHE_COMPRESS_MIN_BYTES with zlib (see services/cache_backends.py).
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 16 * 1024))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", 6))
+if CACHE_BACKEND == "sqlite":
+    CACHES = {"default": {
+        "BACKEND": "services.cache_backends.SQLiteCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / "cache" / "cache.sqlite3")),
+        "OPTIONS": {"MAX_BYTES": CACHE_MAX_BYTES},
+    }}
+elif CACHE_BACKEND == "redis":
+    CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+        "OPTIONS": {"serializer": "services.cache_backends.CompressedRedisSerializer"},
+    }}
+elif CACHE_BACKEND == "locmem":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+else:
+    raise ImproperlyConfigured(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}', expected locmem, sqlite or redis")
+
+# In-process price series cache shared by the services (see services/price_series_repository.py).
+PRICE_SERIES_CACHE_BYTES = int(os.getenv("PRICE_SERIES_CACHE_BYTES", 64 * 1024 * 1024))
+# Cached series are dropped when the symbol's data version moves. With a process-local cache backend,
+# other processes (e.g. the ingest command) write without bumping this process's versions, so series
+# are also reloaded after this many seconds.
+PRICE_SERIES_CACHE_TTL = int(os.getenv("PRICE_SERIES_CACHE_TTL", 60))
+
+# Optional columnar copy of the stock prices, one memory-mapped .npy file per column and symbol (see
+# services/price_archive.py). Kept in sync by ingestion and built with `manage.py build_price_archive`;
+# price series are then read from it instead of the table. Disabled when unset.
+PRICE_ARCHIVE_DIR = os.getenv("PRICE_ARCHIVE_DIR") or None
+
+# Indicator series precomputed by `manage.py build_indicators` and after each `manage.py ingest`, as
+# indicator:window pairs (sma, std, rsi); others are computed and stored on first read. Series read at
+# the current data version are also kept in a per-process LRU of INDICATOR_CACHE_BYTES.
+INDICATOR_PRESETS = [item.strip() for item in os.getenv("INDICATOR_PRESETS", "sma:50,sma:200,std:20,rsi:14").split(",") if item.strip()]
+INDICATOR_CACHE_BYTES = int(os.getenv("INDICATOR_CACHE_BYTES", 32 * 1024 * 1024))
+
+# Async views (fetch, backtest, predict, report) call Alpha Vantage through one pooled httpx client per
+# event loop and run ORM, backtest and rendering work on a bounded thread pool (see services/concurrency.py).
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 30))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 20))
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+
+# Worker processes of the pool shared by backtest sweeps (see services/backtesting_service.py), started on
+# first use and kept for the life of the server process.
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Rows fetched per round trip by the streaming export endpoint, and emitted per response chunk.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Request latency histograms are always recorded when METRICS_ENABLED; this fraction of requests also
+# records database query counts and time and the service spans (see services/metrics.py), served at /metrics.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", 0.1))
+
+# Trained model artifacts: the combined fallback model plus per-symbol and per-cluster versions (see services/training_service.py).
+MODEL_DIR = os.getenv("MODEL_DIR", str(BASE_DIR / "models"))
+# How often (seconds) a resident model's file is re-checked for changes (see services/model_registry.py).
+MODEL_REGISTRY_CHECK_INTERVAL = float(os.getenv("MODEL_REGISTRY_CHECK_INTERVAL", 2.0))
+MODEL_REGISTRY_MAX_MODELS = int(os.getenv("MODEL_REGISTRY_MAX_MODELS", 1000))
+
+# Prediction horizon (days) used when a request does not ask for one, and the largest allowed.
+PREDICTION_HORIZON_DAYS = int(os.getenv("PREDICTION_HORIZON_DAYS", 30))
+PREDICTION_MAX_HORIZON_DAYS = int(os.getenv("PREDICTION_MAX_HORIZON_DAYS", 3650))
+# On PostgreSQL, prediction writes with at least this many rows go through COPY instead of multi-row INSERTs.
+PREDICTION_COPY_THRESHOLD = int(os.getenv("PREDICTION_COPY_THRESHOLD", 1000))
+
+# Rendered reports are keyed by the symbol's data version, which every stock or prediction write bumps,
+# so by default they never expire on a shared cache backend and expire after 15 minutes on a
+# process-local one. Set REPORT_CACHE_TIMEOUT (seconds) to force a TTL. Concurrent misses on one report
+# wait up to REPORT_BUILD_WAIT seconds for a single build; a crashed builder's lock expires after
+# REPORT_BUILD_LOCK_TIMEOUT. Keep it above the longest build: a build that outlives its lock is
+# duplicated by the next caller (the lock itself is released by compare-and-delete on Redis and SQLite).
+REPORT_CACHE_TIMEOUT = int(os.environ["REPORT_CACHE_TIMEOUT"]) if os.getenv("REPORT_CACHE_TIMEOUT") else None
+REPORT_BUILD_LOCK_TIMEOUT = int(os.getenv("REPORT_BUILD_LOCK_TIMEOUT", 120))
+REPORT_BUILD_WAIT = float(os.getenv("REPORT_BUILD_WAIT", 60))
+# Symbols whose JSON and PDF reports are pre-rendered by `manage.py warm_reports` and after each `manage.py ingest`.
+REPORT_WARM_SYMBOLS = [symbol.strip().upper() for symbol in os.getenv("REPORT_WARM_SYMBOLS", "").split(",") if symbol.strip()]
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -159,6 +246,10 @@ LOGGING = {
             'level': os.getenv('DJANGO_LOG_LEVEL', 'DEBUG'),
             'propagate': True,
         },
+        # One line per SQL statement at DEBUG; query counts and time per view are in /metrics instead.
+        'django.db.backends': {
+            'level': os.getenv('DJANGO_DB_LOG_LEVEL', 'INFO'),
+        },
         'stocks_app': {
             'handlers': ['console', 'file'],
             'level': 'DEBUG',
@@ -17,9 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
+from stocks_app.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('stocks/', include('stocks_app.urls')),  # Include the
     path('', RedirectView.as_view(url='stocks/', permanent=False)),
 ]